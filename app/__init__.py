@@ -55,6 +55,14 @@ def create_app(config_name='development'):
 
         app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_CONTENT_LENGTH', 16777216))
         app.config['UPLOAD_FOLDER'] = os.path.join(basedir, '..', os.environ.get('UPLOAD_FOLDER', 'uploads'))
+        app.config['CSV_CHUNKSIZE'] = int(os.environ.get('CSV_CHUNKSIZE', 5000))
+        app.config['CSV_PARSER_ENGINE'] = os.environ.get('CSV_PARSER_ENGINE', 'c')
+        app.config['USER_CACHE_TTL'] = int(os.environ.get('USER_CACHE_TTL', 60))
+        app.config['IMPORT_JOB_TIMEOUT'] = int(os.environ.get('IMPORT_JOB_TIMEOUT', 3600))
+        app.config['IMPORT_ZIP_MAX_FILES'] = int(os.environ.get('IMPORT_ZIP_MAX_FILES', 200))
+        app.config['IMPORT_ZIP_MAX_SIZE'] = int(os.environ.get('IMPORT_ZIP_MAX_SIZE', 524288000))
+        app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:16384:8:1')
+        app.config['PASSWORD_HASH_CONCURRENCY'] = int(os.environ.get('PASSWORD_HASH_CONCURRENCY', 4))
         os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
 
@@ -75,13 +83,22 @@ def create_app(config_name='development'):
     with app.app_context():
         from . import models
 
+        #pamięć tożsamości zalogowanych użytkowników (load_user)
+        from . import identity
+        identity.init_app(app)
+
+        #polityka hashowania haseł (metoda, limit jednoczesnych hashowań)
+        from . import security
+        security.init_app(app)
+
         #potrzebne do stworzenia konta administratora w konsoli
         from . import commands
 
     return app
 
-#pobieranie użytkownika z bazy na podstawie ID zapisanego w sesji - wymagane przez Flask-Login
+#pobieranie użytkownika na podstawie ID zapisanego w sesji - wymagane przez Flask-Login
+#zwraca UserSnapshot z pamięci procesu (odświeżany z bazy po USER_CACHE_TTL sekundach lub po edycji użytkownika)
 @login_manager.user_loader
 def load_user(user_id):
-    from app.models import User
-    return User.query.get(int(user_id))
\ No newline at end of file
+    from app.identity import user_cache
+    return user_cache().get(int(user_id))
\ No newline at end of file
@@ -3,18 +3,25 @@ Blueprint dla panelu administratora.
 Obsługuje zarządzanie kierowcami, import CSV, faktury kosztowe.
 """
 
-from flask import render_template, request, flash, redirect, url_for, current_app
+from flask import render_template, stream_template, request, flash, redirect, url_for, current_app, jsonify, abort, Response, stream_with_context
 from flask_login import login_required, current_user
 from functools import wraps
 from app.blueprints.admin import admin_bp
 from app import db
-from app.models import User, BoltEarnings, UberEarnings, Expense
-from app.forms import AddDriverForm, CSVUploadForm, AddExpenseForm
+from app.models import User, BoltEarnings, UberEarnings, Expense, ImportJob, WeeklyReport
+from app.forms import AddDriverForm, ImportDriversForm, CSVUploadForm, AddExpenseForm, GenerateReportForm, RecomputeReportsForm
 import os
+from datetime import date, timedelta
 from werkzeug.utils import secure_filename
 from sqlalchemy.exc import IntegrityError
+from app import earnings, rollups, settlements, exports, fleet, onboarding
 
+#liczba wpisów każdego rodzaju wyświetlanych na stronie zarobków kierowcy (domyślna i maksymalna)
+EARNINGS_PAGE_SIZE = 50
+EARNINGS_MAX_PAGE_SIZE = 500
 
+#liczba kierowców na stronie panelu administratora
+DASHBOARD_PAGE_SIZE = 50
 
 
 def admin_required(f):
@@ -36,11 +43,21 @@ def admin_required(f):
 @admin_required
 def dashboard():
     """
-    Panel administratora
+    Panel administratora - lista kierowców ze statystykami (wyszukiwanie, sortowanie i stronicowanie w bazie).
+    Parametry: q (szukaj), sort (username / last_day / week_gross / carryover), dir (asc / desc), page
     """
-    
-    drivers = User.query.filter_by(role='driver').all()
-    return render_template('admin/dashboard.html', drivers=drivers)
+    search = request.args.get('q', '').strip()
+    sort = request.args.get('sort', 'username')
+    if sort not in fleet.SORT_KEYS:
+        sort = 'username'
+    descending = request.args.get('dir') == 'desc'
+    page = max(request.args.get('page', 1, type=int), 1)
+
+    #kierowcy ze statystykami i liczba wszystkich pasujących - jedno zapytanie
+    drivers, total = fleet.driver_list(search, sort, descending, page, DASHBOARD_PAGE_SIZE)
+    pages = max((total + DASHBOARD_PAGE_SIZE - 1) // DASHBOARD_PAGE_SIZE, 1)
+    return render_template('admin/dashboard.html', drivers=drivers, total=total, page=page, pages=pages,
+                           search=search, sort=sort, descending=descending)
 
 
 
@@ -63,7 +80,8 @@ def add_driver():
                 username=form.username.data,
                 role='driver',
                 uber_id=form.uber_id.data,
-                bolt_id=form.bolt_id.data
+                bolt_id=form.bolt_id.data,
+                bank_account=(form.bank_account.data or '').replace(' ', '') or None
             )
             new_driver.set_password(form.password.data)
             db.session.add(new_driver)
@@ -73,120 +91,262 @@ def add_driver():
         
         except IntegrityError:
             db.session.rollback()
-            flash('Użytkownik o tej nazwie już istnieje', 'danger')
+            flash('Użytkownik o tej nazwie lub identyfikatorze Uber / Bolt już istnieje', 'danger')
             return redirect(url_for('admin.dashboard'))
     
     return render_template('admin/add_driver.html', form=form)
 
-@admin_bp.route('/driver/<int:driver_id>/earnings', methods=['GET'])
+@admin_bp.route('/import-drivers', methods=['GET', 'POST'])
 @login_required
 @admin_required
-def driver_earnings(driver_id):
+def import_drivers():
     """
-    Wyświetla zarobki konkretnego kierowcy z możliwością filtrowania po dacie.
+    Zakładanie kont wielu kierowców z pliku CSV (username, password, bolt_id, uber_id).
+    Istniejący użytkownicy są pomijani, błędne wiersze wypisywane pod formularzem.
+    """
+    form = ImportDriversForm()
+    result = None
+    errors = []
+    if form.validate_on_submit():
+        try:
+            drivers, errors = onboarding.read_drivers(form.file.data.stream)
+            result = onboarding.import_drivers(drivers)
+            errors += result['errors']
+            flash(f"Utworzono konta kierowców: {result['created']}", 'success' if result['created'] else 'info')
+        except (ValueError, UnicodeDecodeError) as e:
+            flash(f'Błąd pliku: {e}', 'danger')
+        except IntegrityError:
+            db.session.rollback()
+            flash('Nazwa użytkownika lub identyfikator Uber / Bolt z pliku należy już do innego kierowcy - popraw plik i wyślij ponownie', 'danger')
+
+    return render_template('admin/import_drivers.html', form=form, result=result, errors=errors)
+
+def _earnings_driver(driver_id):
+    """
+    Kierowca dla widoków zarobków (None jeśli użytkownik nie jest kierowcą)
     """
     driver = User.query.get_or_404(driver_id)
     if driver.role != 'driver':
         flash('Ten użytkownik nie jest kierowcą', 'warning')
+        return None
+    return driver
+
+def _earnings_totals(driver_id, date_from, date_to):
+    """
+    Sumy do podsumowań na stronie zarobków (z sum narastających zestawień dziennych)
+    """
+    by_source = earnings.totals_by_source(driver_id, date_from, date_to)
+    return {
+        'bolt_total': by_source[BoltEarnings],
+        'uber_total': by_source[UberEarnings],
+        'expenses_total': by_source[Expense],
+    }
+
+@admin_bp.route('/driver/<int:driver_id>/earnings', methods=['GET'])
+@login_required
+@admin_required
+def driver_earnings(driver_id):
+    """
+    Wyświetla zarobki konkretnego kierowcy z możliwością filtrowania po dacie.
+    Każda tabela (Bolt, Uber, faktury) jest stronicowana osobno kursorem
+    (parametry bolt_after, uber_after, expenses_after), liczba wpisów na stronie - per_page.
+    """
+    driver = _earnings_driver(driver_id)
+    if driver is None:
         return redirect(url_for('admin.dashboard'))
 
     #pobierz parametry z query string (filtrowanie po dacie)
     date_from = request.args.get('date_from', '')
     date_to = request.args.get('date_to', '')
-
-    # query dla bolt
-    bolt_query = BoltEarnings.query.filter_by(user_id=driver_id)
-    if date_from:
-        bolt_query = bolt_query.filter(BoltEarnings.report_date >= date_from)
-    if date_to:
-        bolt_query = bolt_query.filter(BoltEarnings.report_date <= date_to)
-    bolt_earnings = bolt_query.order_by(BoltEarnings.report_date.desc()).all()
-
-    #query dla uber
-    uber_query = UberEarnings.query.filter_by(user_id=driver_id)
-    if date_from:
-        uber_query = uber_query.filter(UberEarnings.report_date >= date_from)
-    if date_to:
-        uber_query = uber_query.filter(UberEarnings.report_date <= date_to)
-    uber_earnings = uber_query.order_by(UberEarnings.report_date.desc()).all()
-
-    # Query dla faktur kosztowych
-    expenses_query = Expense.query.filter_by(user_id=driver_id)
-    if date_from:
-        expenses_query = expenses_query.filter(Expense.issue_date >= date_from)
-    if date_to:
-        expenses_query = expenses_query.filter(Expense.issue_date <= date_to)
-    expenses = expenses_query.order_by(Expense.issue_date.desc()).all()
-
-    #oblicz sumy
-    bolt_total = {
-        'gross': sum(float(e.net_income) for e in bolt_earnings),
-        'cash': sum(float(e.cash_collected) for e in bolt_earnings),
-        'vat': sum(float(e.vat_due) for e in bolt_earnings),
-        'actual': sum(float(e.actual_income) for e in bolt_earnings),
-    }
-    
-    uber_total = {
-        'gross': sum(float(e.gross_total) for e in uber_earnings),
-        'cash': sum(float(e.cash_collected) for e in uber_earnings),
-        'vat': sum(float(e.vat_due) for e in uber_earnings),
-        'actual': sum(float(e.actual_income) for e in uber_earnings),
-    }
-
-    # Suma faktur kosztowych
-    expenses_total = {
-        'net': sum(float(e.net_amount) for e in expenses),
-        'vat': sum(float(e.vat_amount) for e in expenses),
-        'vat_deductible': sum(float(e.vat_deductible) for e in expenses),
-        'deductible': sum(float(e.deductible_amount) for e in expenses),
-    }
+    per_page = request.args.get('per_page', EARNINGS_PAGE_SIZE, type=int)
+    per_page = max(1, min(per_page, EARNINGS_MAX_PAGE_SIZE))
+
+    #wiersze tylko dla wyświetlanej strony każdej tabeli
+    pages = {}
+    for key, Model in (('bolt', BoltEarnings), ('uber', UberEarnings), ('expenses', Expense)):
+        param = f'{key}_after'
+        after = earnings.parse_cursor(request.args.get(param))
+        rows, next_cursor = earnings.page(Model, driver_id, date_from, date_to, per_page, after)
+
+        args = request.args.to_dict()
+        args.pop(param, None)
+        pages[key] = {
+            'rows': rows,
+            'next_url': url_for('admin.driver_earnings', driver_id=driver_id, **args, **{param: next_cursor}) if next_cursor else None,
+            'first_url': url_for('admin.driver_earnings', driver_id=driver_id, **args) if after else None,
+        }
 
     return render_template(
         'admin/driver_earnings.html',
         driver=driver,
-        bolt_earnings=bolt_earnings,
-        uber_earnings=uber_earnings,
-        bolt_total=bolt_total,
-        uber_total=uber_total,
-        expenses=expenses,
-        expenses_total=expenses_total,
+        bolt_earnings=pages['bolt']['rows'],
+        uber_earnings=pages['uber']['rows'],
+        expenses=pages['expenses']['rows'],
+        pages=pages,
+        per_page=per_page,
+        date_from=date_from,
+        date_to=date_to,
+        **_earnings_totals(driver_id, date_from, date_to)
+    )
+
+@admin_bp.route('/driver/<int:driver_id>/earnings/all', methods=['GET'])
+@login_required
+@admin_required
+def driver_earnings_all(driver_id):
+    """
+    Wszystkie zarobki kierowcy z zakresu dat na jednej stronie.
+    Strona jest renderowana strumieniowo, a wiersze pobierane z bazy paczkami,
+    więc nawet wieloletnia historia nie jest trzymana w pamięci w całości.
+    """
+    driver = _earnings_driver(driver_id)
+    if driver is None:
+        return redirect(url_for('admin.dashboard'))
+
+    date_from = request.args.get('date_from', '')
+    date_to = request.args.get('date_to', '')
+
+    return stream_template(
+        'admin/driver_earnings_all.html',
+        driver=driver,
+        bolt_earnings=earnings.stream(BoltEarnings, driver_id, date_from, date_to),
+        uber_earnings=earnings.stream(UberEarnings, driver_id, date_from, date_to),
+        expenses=earnings.stream(Expense, driver_id, date_from, date_to),
         date_from=date_from,
-        date_to=date_to
+        date_to=date_to,
+        **_earnings_totals(driver_id, date_from, date_to)
     )
 
+@admin_bp.route('/driver/<int:driver_id>/timeline.json', methods=['GET'])
+@login_required
+@admin_required
+def driver_timeline(driver_id):
+    """
+    Oś czasu kierowcy (Bolt, Uber i faktury obok siebie) dla wykresu na stronie zarobków.
+    Bez podanego zakresu - ostatni rok. Rozdzielczość (resolution: day / month / year) jest dobierana
+    do długości zakresu, jeśli nie została podana.
+    Dane w układzie kolumnowym: {'resolution': ..., 'days': [początki okresów], 'bolt_gross': [...], ...}
+    """
+    User.query.get_or_404(driver_id)
+
+    resolution = request.args.get('resolution') or None
+    if resolution is not None and resolution not in earnings.RESOLUTION_MAX_POINTS:
+        abort(400)
+    try:
+        date_to = date.fromisoformat(request.args.get('date_to', '') or date.today().isoformat())
+        date_from = date.fromisoformat(request.args.get('date_from', '') or (date_to - timedelta(days=364)).isoformat())
+    except ValueError:
+        abort(400)
+
+    resolution, rows = earnings.series(driver_id, date_from, date_to, resolution)
+    data = {
+        'date_from': date_from.isoformat(),
+        'date_to': date_to.isoformat(),
+        'resolution': resolution,
+        'days': [row['day'].isoformat() for row in rows],
+    }
+    for key in earnings.TIMELINE_KEYS:
+        data[key] = [float(row[key]) for row in rows]
+    return jsonify(data)
+
+@admin_bp.route('/vat-monthly', methods=['GET'])
+@login_required
+@admin_required
+def vat_monthly():
+    """
+    Miesięczne zestawienie VAT kierowców za wybrany rok (parametr year, domyślnie bieżący) - dla księgowości
+    """
+    year = request.args.get('year', date.today().year, type=int)
+    rows = earnings.monthly_vat(year)
+    return render_template('admin/vat_monthly.html', year=year, rows=rows)
+
 @admin_bp.route('/upload-csv', methods=['GET', 'POST'])
 @login_required
 @admin_required
 def upload_csv():
     """
     Uniwersalny import CSV - automatycznie rozpoznaje platformę (Bolt/Uber).
+    Plik trafia do kolejki, import wykonuje w tle proces roboczy (flask import-worker).
     """
     form = CSVUploadForm()
     if request.method == 'POST' and form.validate_on_submit():
-        file = form.file.data
-        if not file:
+        files = [f for f in form.file.data if f and f.filename]
+        if not files:
             flash('Nie wybrano pliku', 'warning')
             return redirect(request.url)
         
+        from app.import_jobs import enqueue_batch, ArchiveLimitError
         try:
-            # Automatyczne rozpoznanie i przetwarzania
-            from app.csv_processor import CSVProcessor
-            processor = CSVProcessor(file, file.filename)
-            result = processor.process()
-
-            platform_name = 'Bolt' if result['platform'] == 'bolt' else 'Uber'
-            flash(
-                f"Zaimportowano {platform_name}: {result['created']} nowych, "
-                f"{result['updated']} zaktualizowanych, {result['skipped']} pominiętych",
-                "success"
-            )
-        except ValueError as e:
-            flash(f'Błąd: {str(e)}', 'danger')
+            batch_id, jobs, errors = enqueue_batch(files, user_id=current_user.id, force=form.force.data)
+
+            for error in errors:
+                flash(f'Pominięto: {error}', 'warning')
+
+            if len(jobs) == 1:
+                flash(f"Plik {jobs[0].filename} został dodany do kolejki importu", "success")
+                return redirect(url_for('admin.import_job', job_id=jobs[0].id))
+            if jobs:
+                flash(f"Dodano do kolejki importu plików: {len(jobs)}", "success")
+                return redirect(url_for('admin.import_batch', batch_id=batch_id))
+        except ArchiveLimitError as e:
+            #cała paczka odrzucona - błąd pod polem pliku
+            form.file.errors.append(str(e))
+            jobs = ImportJob.query.order_by(ImportJob.id.desc()).limit(10).all()
+            return render_template('admin/upload_csv.html', form=form, jobs=jobs), 400
         except Exception as e:
             flash(f'Błąd podczas importu: {str(e)}', 'danger')
 
         return redirect(url_for('admin.upload_csv'))
-    return render_template('admin/upload_csv.html', form=form)
+
+    jobs = ImportJob.query.order_by(ImportJob.id.desc()).limit(10).all()
+    return render_template('admin/upload_csv.html', form=form, jobs=jobs)
+
+@admin_bp.route('/import-jobs/<int:job_id>')
+@login_required
+@admin_required
+def import_job(job_id):
+    """
+    Strona z postępem importu (odświeżana przez import_job_status)
+    """
+    job = ImportJob.query.get_or_404(job_id)
+    return render_template('admin/import_job.html', job=job)
+
+@admin_bp.route('/import-jobs/<int:job_id>/status')
+@login_required
+@admin_required
+def import_job_status(job_id):
+    """
+    Postęp importu w formacie JSON (odpytywany przez stronę zadania)
+    """
+    job = ImportJob.query.get_or_404(job_id)
+    return jsonify(job.to_dict())
+
+@admin_bp.route('/import-batches/<batch_id>')
+@login_required
+@admin_required
+def import_batch(batch_id):
+    """
+    Postęp i łączne podsumowanie paczki plików wysłanych razem
+    """
+    from app.import_jobs import batch_summary
+
+    jobs = ImportJob.query.filter_by(batch_id=batch_id).order_by(ImportJob.id).all()
+    if not jobs:
+        abort(404)
+    return render_template('admin/import_batch.html', batch_id=batch_id, summary=batch_summary(jobs))
+
+@admin_bp.route('/import-batches/<batch_id>/status')
+@login_required
+@admin_required
+def import_batch_status(batch_id):
+    """
+    Postęp paczki importów w formacie JSON
+    """
+    from app.import_jobs import batch_summary
+
+    jobs = ImportJob.query.filter_by(batch_id=batch_id).order_by(ImportJob.id).all()
+    if not jobs:
+        abort(404)
+    return jsonify(batch_summary(jobs))
 
 @admin_bp.route('/add-expense', methods=['GET', 'POST'])
 @login_required
@@ -242,8 +402,123 @@ def add_expense():
         )
 
         db.session.add(expense)
+        db.session.flush()
+
+        #zestawienie dnia faktury w tej samej transakcji
+        rollups.refresh([(expense.user_id, expense.issue_date)])
         db.session.commit()
 
         flash(f'Faktura {expense.document_number} została dodana', 'success')
         return redirect(url_for('admin.dashboard'))
-    return render_template('admin/add_expense.html', form=form)
\ No newline at end of file
+    return render_template('admin/add_expense.html', form=form)
+
+
+@admin_bp.route('/generate-reports', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def generate_reports():
+    """
+    Generowanie raportów tygodniowych - dla jednego kierowcy lub całej floty naraz (settlements.generate).
+    Raporty za ten sam zakres dat są zastępowane.
+    """
+    form = GenerateReportForm()
+    drivers = User.query.filter_by(role='driver').order_by(User.username).all()
+    form.driver_id.choices = [(GenerateReportForm.ALL_DRIVERS, 'Wszyscy kierowcy')] + [(d.id, d.username) for d in drivers]
+
+    if not form.is_submitted():
+        #domyślnie poprzedni tydzień (poniedziałek - niedziela)
+        monday = date.today() - timedelta(days=date.today().weekday() + 7)
+        form.date_from.data, form.date_to.data = monday, monday + timedelta(days=6)
+        form.report_name.data = settlements.default_report_name(monday)
+
+    if form.validate_on_submit():
+        single = form.driver_id.data != GenerateReportForm.ALL_DRIVERS
+        count = settlements.generate(
+            form.date_from.data, form.date_to.data, form.report_name.data,
+            user_ids=[form.driver_id.data] if single else None,
+            settlement_fee=form.settlement_fee.data,
+            contract_fee=form.contract_fee.data,
+            fuel_amounts={form.driver_id.data: form.fuel_amount.data} if single else None,
+        )
+        if count:
+            flash(f'Wygenerowano raportów: {count}', 'success')
+        else:
+            flash('Brak zarobków w wybranym zakresie dat - nie wygenerowano raportów', 'warning')
+        return redirect(url_for('admin.weekly_reports', date_from=form.date_from.data, date_to=form.date_to.data))
+
+    return render_template('admin/generate_reports.html', form=form)
+
+
+@admin_bp.route('/reports', methods=['GET'])
+@login_required
+@admin_required
+def weekly_reports():
+    """
+    Lista raportów tygodniowych za zakres dat (domyślnie ostatnio wygenerowany zakres)
+    """
+    try:
+        date_from = date.fromisoformat(request.args['date_from']) if request.args.get('date_from') else None
+        date_to = date.fromisoformat(request.args['date_to']) if request.args.get('date_to') else None
+    except ValueError:
+        abort(400)
+    if not (date_from and date_to):
+        last = WeeklyReport.query.order_by(WeeklyReport.date_to.desc()).first()
+        date_from, date_to = (last.date_from, last.date_to) if last else (None, None)
+
+    reports = []
+    if date_from and date_to:
+        reports = (
+            db.session.query(WeeklyReport, User.username)
+            .join(User, User.id == WeeklyReport.user_id)
+            .filter(WeeklyReport.date_from == date_from, WeeklyReport.date_to == date_to)
+            .order_by(User.username)
+            .all()
+        )
+    stale_count = WeeklyReport.query.filter_by(is_stale=True).count()
+    return render_template('admin/weekly_reports.html', reports=reports, date_from=date_from, date_to=date_to,
+                           stale_count=stale_count, recompute_form=RecomputeReportsForm())
+
+
+@admin_bp.route('/reports/recompute', methods=['POST'])
+@login_required
+@admin_required
+def recompute_reports():
+    """
+    Przelicza nieaktualne raporty tygodniowe (settlements.recompute)
+    """
+    if RecomputeReportsForm().validate_on_submit():
+        count = settlements.recompute()
+        flash(f'Przeliczono raportów: {count}', 'success')
+    return redirect(url_for('admin.weekly_reports', date_from=request.form.get('date_from'), date_to=request.form.get('date_to')))
+
+
+@admin_bp.route('/export', methods=['GET'])
+@login_required
+@admin_required
+def export():
+    """
+    Eksport całej floty za zakres dat jako plik wysyłany strumieniowo.
+    Parametry: kind (settlements / earnings / bank), format (csv / xlsx), date_from, date_to
+    """
+    kind = request.args.get('kind', 'settlements')
+    file_format = request.args.get('format', 'csv')
+    if kind not in exports.KINDS or file_format not in exports.FORMATS:
+        abort(400)
+    try:
+        date_from = date.fromisoformat(request.args.get('date_from', ''))
+        date_to = date.fromisoformat(request.args.get('date_to', ''))
+    except ValueError:
+        abort(400)
+
+    try:
+        data = exports.stream(kind, file_format, date_from, date_to)
+    except exports.StaleReportsError as e:
+        abort(400, description=str(e))
+
+    filename = exports.filename(kind, file_format, date_from, date_to)
+    return Response(
+        stream_with_context(data),
+        mimetype=exports.FORMATS[file_format],
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
@@ -36,6 +36,11 @@ def login():
         user = User.query.filter_by(username=form.username.data).first()
 
         if user and user.check_password(form.password.data):
+            #hash według starej polityki - zapisz według bieżącej (hasło jest znane tylko teraz)
+            if user.password_needs_rehash():
+                user.set_password(form.password.data)
+                db.session.commit()
+
             login_user(user)
             if user.role == 'admin':
                 return redirect(url_for('admin.dashboard'))
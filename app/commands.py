@@ -1,5 +1,6 @@
 import click
 from flask import current_app as app
+from sqlalchemy.exc import IntegrityError
 from app import db
 from app.models import User
 
@@ -27,3 +28,169 @@ def create_admin(username, password):
     db.session.add(admin)
     db.session.commit()
     print(f"Administrator {username} został pomyślnie utworzony.")
+
+
+@app.cli.command("import-drivers")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--workers", type=int, default=None, help="Liczba procesów hashujących hasła")
+def import_drivers(path, workers):
+    """
+    Zakłada konta wielu kierowców z pliku CSV (username, password, bolt_id, uber_id).
+    Istniejący użytkownicy i kierowcy z identyfikatorem Uber / Bolt innego kierowcy są pomijani.
+    Użycie za pomocą komendy:
+        flask import-drivers PLIK
+        (przykład: flask import-drivers flota_partnera.csv --workers 4)
+    """
+    from app.onboarding import read_drivers, import_drivers as create_drivers
+
+    with open(path, 'rb') as file:
+        try:
+            drivers, errors = read_drivers(file)
+        except (ValueError, UnicodeDecodeError) as e:
+            raise click.ClickException(f"Błąd pliku: {e}")
+
+    for error in errors:
+        print(f"Pominięto - {error}")
+    try:
+        result = create_drivers(drivers, workers=workers)
+    except IntegrityError:
+        db.session.rollback()
+        raise click.ClickException(
+            "Nazwa użytkownika lub identyfikator Uber / Bolt z pliku należy już do innego kierowcy - popraw plik i uruchom ponownie"
+        )
+    for username in result['existing']:
+        print(f"Pominięto - użytkownik {username} już istnieje")
+    for error in result['errors']:
+        print(f"Pominięto - {error}")
+    print(f"Utworzono konta kierowców: {result['created']}")
+
+
+@app.cli.command("import-worker")
+@click.option("--interval", default=2.0, show_default=True, help="Co ile sekund sprawdzać kolejkę")
+@click.option("--once", is_flag=True, help="Wykonaj oczekujące zadania i zakończ")
+def import_worker(interval, once):
+    """
+    Proces roboczy importu CSV - wykonuje zadania dodane przez formularz uploadu.
+    Można uruchomić kilka procesów równolegle.
+    Użycie za pomocą komendy:
+        flask import-worker
+        (przykład: flask import-worker --once)
+    """
+    from app.import_jobs import run_worker
+
+    processed = run_worker(interval=interval, once=once)
+    print(f"Wykonano zadań importu: {processed}")
+
+
+@app.cli.command("import-dir")
+@click.argument("paths", nargs=-1, required=True, type=click.Path(exists=True))
+@click.option("--workers", type=int, default=None, help="Liczba procesów wczytujących pliki")
+@click.option("--force", is_flag=True, help="Importuj ponownie pliki, które już były zaimportowane")
+def import_dir(paths, workers, force):
+    """
+    Importuje wiele plików CSV naraz - katalogi, pliki CSV lub archiwa ZIP.
+    Pliki są wczytywane równolegle, każdy zapisywany w osobnej transakcji.
+    Użycie za pomocą komendy:
+        flask import-dir ŚCIEŻKA [ŚCIEŻKA...]
+        (przykład: flask import-dir eksporty/wrzesien.zip --workers 4)
+    """
+    from app.import_jobs import import_files, ArchiveLimitError
+
+    try:
+        results = import_files(paths, workers=workers, force=force)
+    except ArchiveLimitError as e:
+        raise click.ClickException(str(e))
+    totals = {'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0}
+
+    for filename, result in results.items():
+        if 'error' in result:
+            print(f"{filename}: błąd - {result['error']}")
+            continue
+        if result['duplicate']:
+            print(f"{filename}: plik był już zaimportowany - pominięto")
+            continue
+        for key in totals:
+            totals[key] += result[key]
+        print(f"{filename}: {result['created']} nowych, {result['updated']} zaktualizowanych, "
+              f"{result['unchanged']} bez zmian, {result['skipped']} pominiętych")
+
+    print(f"Razem ({len(results)} plików): {totals['created']} nowych, "
+          f"{totals['updated']} zaktualizowanych, {totals['unchanged']} bez zmian, {totals['skipped']} pominiętych")
+
+
+@app.cli.command("rebuild-rollups")
+def rebuild_rollups():
+    """
+    Odbudowuje dzienne zestawienia kierowców (DriverDailyRollup) od zera z surowych wpisów,
+    a z nich zestawienia miesięczne i roczne (DriverPeriodRollup).
+    Potrzebne po migracji lub po ręcznych zmianach w bazie - import CSV i dodanie faktury
+    aktualizują zestawienia same.
+    Użycie za pomocą komendy:
+        flask rebuild-rollups
+    """
+    from app.rollups import rebuild
+
+    rows = rebuild()
+    print(f"Odbudowano zestawienia dzienne: {rows} wierszy")
+
+
+@app.cli.command("generate-weekly-reports")
+@click.argument("date_from", type=click.DateTime(formats=["%Y-%m-%d"]))
+@click.argument("date_to", type=click.DateTime(formats=["%Y-%m-%d"]))
+@click.option("--name", default=None, help="Nazwa raportów (domyślnie według tygodnia, np. Tydzień 40/2024)")
+@click.option("--settlement-fee", is_flag=True, help="Dolicz opłatę za rozliczenie")
+@click.option("--contract-fee", is_flag=True, help="Dolicz umowę zlecenie")
+def generate_weekly_reports(date_from, date_to, name, settlement_fee, contract_fee):
+    """
+    Generuje raporty tygodniowe za zakres dat dla wszystkich kierowców z zarobkami w tym zakresie.
+    Raporty za ten sam zakres dat są zastępowane.
+    Użycie za pomocą komendy:
+        flask generate-weekly-reports DATA_OD DATA_DO
+        (przykład: flask generate-weekly-reports 2025-01-06 2025-01-12 --settlement-fee)
+    """
+    from app.settlements import generate
+
+    if date_to < date_from:
+        print("Data końcowa nie może być wcześniejsza niż początkowa")
+        return
+
+    count = generate(date_from.date(), date_to.date(), name, settlement_fee=settlement_fee, contract_fee=contract_fee)
+    print(f"Wygenerowano raportów: {count}")
+
+
+@app.cli.command("recompute-reports")
+def recompute_reports():
+    """
+    Przelicza nieaktualne raporty tygodniowe - po spóźnionym imporcie lub korekcie wpisów z ich zakresu.
+    Przeliczane są tylko nieaktualne raporty i raporty, do których zmienił się przeniesiony VAT.
+    Użycie za pomocą komendy:
+        flask recompute-reports
+    """
+    from app.settlements import recompute
+
+    count = recompute()
+    print(f"Przeliczono raportów: {count}")
+
+
+@app.cli.command("export")
+@click.argument("kind", type=click.Choice(["settlements", "earnings", "bank"]))
+@click.argument("date_from", type=click.DateTime(formats=["%Y-%m-%d"]))
+@click.argument("date_to", type=click.DateTime(formats=["%Y-%m-%d"]))
+@click.option("--format", "file_format", type=click.Choice(["csv", "xlsx"]), default="csv", show_default=True)
+@click.option("--output", "-o", type=click.File("wb"), default="-", help="Plik wynikowy (domyślnie standardowe wyjście)")
+def export(kind, date_from, date_to, file_format, output):
+    """
+    Eksportuje rozliczenia, zarobki dzienne lub listę przelewów całej floty za zakres dat (CSV lub XLSX).
+    Plik jest zapisywany kawałkami w trakcie czytania z bazy.
+    Użycie za pomocą komendy:
+        flask export RODZAJ DATA_OD DATA_DO
+        (przykład: flask export bank 2025-01-06 2025-01-12 -o przelewy.csv)
+    """
+    from app.exports import stream, StaleReportsError
+
+    try:
+        chunks = stream(kind, file_format, date_from.date(), date_to.date())
+    except StaleReportsError as e:
+        raise click.ClickException(str(e))
+    for chunk in chunks:
+        output.write(chunk)
@@ -3,13 +3,32 @@ Moduł do przetwarzania plików CSV z platform Uber i Bolt.
 Automatycznie rozpoznaje typ platformy i przetwarza dane.
 """
 
-from app import db
-from app.models import User, BoltEarnings, UberEarnings
+from app import db, rollups
+from app.models import User, DriverPlatformAccount, BoltEarnings, UberEarnings, ImportedFile
+from sqlalchemy import insert, update
 import pandas as pd
+import codecs
+import csv
+import hashlib
+import importlib.util
 import re
+from collections import Counter
 from datetime import datetime
 from decimal import Decimal
 
+
+def file_digest(file, block_size=1024 * 1024):
+    """
+    Skrót SHA-256 zawartości pliku liczony strumieniowo (bez wczytywania całego pliku).
+    Po obliczeniu plik wraca na początek.
+    """
+    digest = hashlib.sha256()
+    for block in iter(lambda: file.read(block_size), b''):
+        digest.update(block)
+    file.seek(0)
+    return digest.hexdigest()
+
+
 class CSVProcessorConfig:
     """
     Konfiguracja dla różnych platform.
@@ -58,16 +77,39 @@ class CSVProcessor:
     Procesor plików CSV - rozpoznaje platformę i przetwarza dane
     """
 
-    def __init__(self, file, filename):
+    #liczba rekordów zapisywanych jednym poleceniem (executemany)
+    BATCH_SIZE = 500
+
+    #rozpoznawanie formatu pliku: rozmiar próbki, liczba linii, dozwolone separatory
+    SNIFF_BYTES = 64 * 1024
+    SNIFF_LINES = 50
+    DELIMITERS = ',;\t|'
+
+    #kodowanie eksportów zapisanych w Excelu (Windows)
+    FALLBACK_ENCODING = 'cp1250'
+
+    #kolumny potrzebne do wyszukania kierowcy
+    LOOKUP_COLUMNS = ['platform_id', 'driver_name', 'first_name', 'last_name']
+
+    #kolumny modelu wyliczane z danych CSV
+    RECORD_COLUMNS = ['gross_total', 'expenses_total', 'net_income', 'cash_collected', 'vat_due', 'actual_income']
+
+    def __init__(self, file, filename, chunksize=None, engine='c'):
         """
         Args:
             file: FileStorage object z formularza
             filename: nazwa pliku
+            chunksize: liczba wierszy czytanych naraz (tryb strumieniowy), None = cały plik
+            engine: parser CSV - 'c' lub 'pyarrow' (opcjonalny, tylko bez chunksize)
         """
         self.file = file
         self.filename = filename
+        self.chunksize = chunksize
+        self.engine = engine
+        self.progress = {'rows_parsed': 0, 'rows_matched': 0, 'rows_written': 0}
         self.platform = self._detect_platform()
         self.config = self._get_config()
+        self._user_index = None
 
     def _detect_platform(self):
         """
@@ -126,17 +168,113 @@ class CSVProcessor:
         # Fallback
         return datetime.utcnow().date()
     
-    def _load_csv(self):
+    @property
+    def report_date(self):
         """
-        Wczytuje CSV do DataFrame
+        Data raportu z nazwy pliku
         """
+        return self._extract_date_from_filename()
 
-        try:
-            df = pd.read_csv(self.file, sep=None, engine='python', encoding='utf-8-sig')
-        except Exception:
-            self.file.seek(0)
-            df = pd.read_csv(self.file, sep=',', engine='python', encoding='utf-8-sig')
-        return df
+    def _sniff_format(self):
+        """
+        Rozpoznaje kodowanie, separator i nagłówek na podstawie początku pliku (SNIFF_BYTES).
+
+        Returns:
+            tuple: (kodowanie, separator, lista nazw kolumn z nagłówka)
+        """
+        head = self.file.read(self.SNIFF_BYTES)
+        self.file.seek(0)
+
+        if head.startswith(codecs.BOM_UTF8):
+            encoding = 'utf-8-sig'
+        else:
+            try:
+                codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+                encoding = 'utf-8'
+            except UnicodeDecodeError:
+                encoding = self.FALLBACK_ENCODING
+
+        sample = codecs.getincrementaldecoder(encoding)(errors='ignore').decode(head, final=False)
+        lines = [line for line in sample.splitlines() if line.strip()]
+        if len(head) == self.SNIFF_BYTES and len(lines) > 1:
+            # ostatnia linia może być ucięta w połowie
+            lines = lines[:-1]
+        lines = lines[:self.SNIFF_LINES]
+
+        delimiter = self._detect_delimiter(lines)
+        header = next(csv.reader(lines[:1], delimiter=delimiter), [])
+        return encoding, delimiter, header
+
+    def _detect_delimiter(self, lines):
+        """
+        Wybiera separator, przy którym najwięcej linii próbki ma tę samą liczbę pól (większą niż 1),
+        przy remisie - ten z większą liczbą pól. Pojedyncza niespójna linia (np. ucięta lub ze
+        stopką eksportu) nie dyskwalifikuje separatora.
+        Nagłówki Bolt zawierają '|', więc sama częstość znaków nie wystarcza.
+        """
+        best_delimiter, best_score = ',', (0, 1)
+        for delimiter in self.DELIMITERS:
+            field_counts = Counter(len(fields) for fields in csv.reader(lines, delimiter=delimiter))
+            field_counts.pop(1, None)
+            if not field_counts:
+                continue
+            fields, consistent = max(field_counts.items(), key=lambda item: (item[1], item[0]))
+            if (consistent, fields) > best_score:
+                best_delimiter, best_score = delimiter, (consistent, fields)
+        return best_delimiter
+
+    def _parser_engine(self, chunksize):
+        """
+        Zwraca silnik parsera pandas: 'pyarrow' jeśli wybrany i zainstalowany
+        (nie obsługuje chunksize), w przeciwnym razie 'c'
+        """
+        if self.engine == 'pyarrow' and chunksize is None and importlib.util.find_spec('pyarrow'):
+            return 'pyarrow'
+        return 'c'
+
+    def _load_csv(self, chunksize=None):
+        """
+        Wczytuje CSV do DataFrame - jedno przejście szybkiego parsera.
+        Czytane są tylko kolumny z konfiguracji platformy, kolumny liczbowe od razu jako float.
+
+        Args:
+            chunksize: liczba wierszy w jednym fragmencie - wtedy zwraca iterator DataFrame
+        """
+
+        encoding, delimiter, header = self._sniff_format()
+        column_mapping = self.config['column_mapping']
+        numeric_columns = self.config['numeric_columns']
+
+        usecols = [col for col in header if col in column_mapping]
+        if not usecols:
+            raise ValueError(
+                f"Plik {self.filename} nie zawiera żadnej z kolumn eksportu {self.platform} "
+                f"(oczekiwane np.: {', '.join(list(column_mapping)[:3])})"
+            )
+        dtype = {
+            col: 'float64' if column_mapping[col] in numeric_columns else str
+            for col in usecols
+        }
+
+        return pd.read_csv(
+            self.file,
+            sep=delimiter,
+            engine=self._parser_engine(chunksize),
+            encoding=encoding,
+            usecols=usecols,
+            dtype=dtype,
+            chunksize=chunksize
+        )
+
+    def _iter_chunks(self):
+        """
+        Zwraca kolejne fragmenty pliku jako DataFrame.
+        Bez ustawionego chunksize cały plik jest jednym fragmentem.
+        """
+        if self.chunksize:
+            yield from self._load_csv(chunksize=self.chunksize)
+        else:
+            yield self._load_csv()
 
     def _map_columns(self, df):
         """
@@ -158,199 +296,318 @@ class CSVProcessor:
                 df[col] = 0.0
         return df
     
-    def _find_user(self, row):
+    @staticmethod
+    def _normalize_name(name):
+        """
+        Normalizuje nazwę kierowcy do porównań (białe znaki, wielkość liter)
+        """
+        return ' '.join(str(name).split()).casefold()
+
+    def _build_user_index(self):
+        """
+        Buduje indeks użytkowników w pamięci - jedno zapytanie SELECT na cały import:
+        użytkownicy złączeni z ich kontami na platformie pliku (DriverPlatformAccount, także poprzednimi).
+
+        Returns:
+            dict: {'platform_id': {id konta na platformie: User}, 'name': {znormalizowana nazwa: User}}
+        """
+        by_platform_id, by_name = {}, {}
+        query = (
+            db.select(User, DriverPlatformAccount.external_id)
+            .outerjoin(DriverPlatformAccount, db.and_(
+                DriverPlatformAccount.user_id == User.id,
+                DriverPlatformAccount.platform == self.config['platform']
+            ))
+            .order_by(User.id)
+        )
+
+        for user, external_id in db.session.execute(query):
+            if external_id:
+                by_platform_id[external_id] = user
+            by_name.setdefault(self._normalize_name(user.username), user)
+
+        return {'platform_id': by_platform_id, 'name': by_name}
+
+    @property
+    def user_index(self):
+        """
+        Indeks użytkowników budowany leniwie przy pierwszym użyciu
         """
-        Znajduje użytkownika w bazie na podstawie danych z CSV
+        if self._user_index is None:
+            self._user_index = self._build_user_index()
+        return self._user_index
+
+    def _find_account(self, row):
+        """
+        Znajduje użytkownika i konto na platformie na podstawie danych z CSV (z indeksu w pamięci)
 
         Args:
             row: wiersz DataFrame
         Returns:
-            User lub None
+            tuple: (User lub None, id dopasowanego konta lub None - przy dopasowaniu po nazwie)
         """
 
-        user = None
-        lookup_field = self.config['user_lookup_field']
+        index = self.user_index
 
-        # Szukaj po platform_id (bolt_id lub uber_id)
+        # Szukaj po platform_id (konto Bolt lub Uber)
         if 'platform_id' in row and str(row['platform_id']).strip():
             platform_id_value = str(row['platform_id']).strip()
-            if platform_id_value.lower() != 'nan':
-                user = User.query.filter_by(**{lookup_field: platform_id_value}).first()
+            if platform_id_value.lower() != 'nan' and platform_id_value in index['platform_id']:
+                return index['platform_id'][platform_id_value], platform_id_value
+
+        user = None
 
         # Fallback dla Bolt: szukaj po nazwie kierowcy
-        if user is None and self.platform == 'bolt' and 'driver_name' in row:
-            driver_name = str(row['driver_name']).strip()
+        if self.platform == 'bolt' and 'driver_name' in row:
+            driver_name = self._normalize_name(row['driver_name'])
             if driver_name:
-                user = User.query.filter_by(username=driver_name).first()
+                user = index['name'].get(driver_name)
 
         # Fallback dla Uber: szukaj po imię + nazwisko
-        if user is None and self.platform == 'uber':
+        if self.platform == 'uber':
             if 'first_name' in row and 'last_name' in row:
-                full_name = f"{row['first_name']} {row['last_name']}".strip()
-                user = User.query.filter_by(username=full_name).first()
+                full_name = self._normalize_name(f"{row['first_name']} {row['last_name']}")
+                user = index['name'].get(full_name)
+
+        return user, None
 
-        return user
+    def _find_user(self, row):
+        """
+        Znajduje użytkownika na podstawie danych z CSV (z indeksu w pamięci)
+
+        Args:
+            row: wiersz DataFrame
+        Returns:
+            User lub None
+        """
+        return self._find_account(row)[0]
     
-    def _calculate_bolt_vat(self, row):
+    def _compute_values(self, df):
         """
-        Oblicza VAT dla Bolt
+        Wylicza wartości rekordów dla całego DataFrame naraz (operacje na kolumnach).
+        Bolt: VAT 8% od przejazdów, 23% od kampanii, zwrotów i anulowań, pomniejszony o 23% opłat.
+        Uber: VAT to suma podatków z raportu, opłaty i pobrana gotówka jako wartości bezwzględne.
+
+        Returns:
+            DataFrame: kolumny RECORD_COLUMNS, ten sam indeks co df
         """
 
-        vat_due = (
-            row.get("brutto_app", 0.0) * 0.08 +
-            row.get("brutto_cash", 0.0) * 0.08 +
-            row.get("campaign", 0.0) * 0.23 +
-            row.get("refunds", 0.0) * 0.23 +
-            row.get("cancellations", 0.0) * 0.23
-        ) - row.get("expenses_total", 0.0) * 0.23
+        values = pd.DataFrame(index=df.index)
 
-        return vat_due
-    
-    def _calculate_uber_vat(self, row):
+        if self.platform == 'bolt':
+            values['gross_total'] = df['gross_total']
+            values['expenses_total'] = df['expenses_total']
+            values['net_income'] = df['net_income']
+            values['cash_collected'] = df['cash_collected']
+            values['vat_due'] = (
+                df['brutto_app'] * 0.08 +
+                df['brutto_cash'] * 0.08 +
+                df['campaign'] * 0.23 +
+                df['refunds'] * 0.23 +
+                df['cancellations'] * 0.23
+            ) - df['expenses_total'] * 0.23
+        else:
+            values['gross_total'] = df['gross_net_income']
+            values['expenses_total'] = (df['service_fee'] + df['tax_on_service_fee']).abs()
+            values['net_income'] = df['gross_net_income']
+            values['cash_collected'] = df['cash_collected'].abs()
+            values['vat_due'] = df['tax_on_fee'] + df['tax_general'] + df['tax_on_service_fee']
+
+        values['actual_income'] = values['net_income'] - values['vat_due']
+        return values[self.RECORD_COLUMNS].astype(float)
+
+    def _fetch_existing(self, report_date, user_ids=None):
         """
-        Oblicza VAT dla Uber
+        Pobiera istniejące rekordy z dnia raportu jednym zapytaniem
+
+        Args:
+            report_date: data raportu
+            user_ids: opcjonalnie - tylko dla podanych kierowców
+        Returns:
+            dict: {user_id: (id rekordu, odcisk wartości source_hash)}
         """
+        Model = self.config['model']
+        query = db.select(Model.user_id, Model.id, Model.source_hash).filter_by(report_date=report_date)
+        if user_ids is not None:
+            query = query.where(Model.user_id.in_(user_ids))
+        rows = db.session.execute(query)
+        return {user_id: (record_id, source_hash) for user_id, record_id, source_hash in rows}
 
-        vat_due = (
-            float(row.get("tax_on_fee", 0.0)) +
-            float(row.get("tax_general", 0.0)) +
-            float(row.get("tax_on_service_fee", 0.0))
-        )
+    def _write_batches(self, inserts, updates):
+        """
+        Zapisuje nowe i zmienione rekordy paczkami (executemany zamiast pojedynczych zapytań)
 
-        return vat_due
-    
-    def _create_bolt_record(self, user, row, report_date):
+        Args:
+            inserts: lista słowników z wartościami nowych rekordów
+            updates: lista słowników z wartościami zmienionych rekordów (z kluczem 'id')
         """
-        Tworzy rekord BoltEarnings
+        Model = self.config['model']
+
+        for start in range(0, len(inserts), self.BATCH_SIZE):
+            db.session.execute(insert(Model), inserts[start:start + self.BATCH_SIZE])
+
+        for start in range(0, len(updates), self.BATCH_SIZE):
+            db.session.execute(update(Model), updates[start:start + self.BATCH_SIZE])
+
+    def _prepare_chunk(self, chunk):
         """
+        Mapuje kolumny fragmentu i wylicza wartości rekordów (bez dostępu do bazy).
 
-        vat_due = self._calculate_bolt_vat(row)
-        net_income = float(row.get("net_income", 0.0))
-        actual_income = net_income - vat_due
+        Returns:
+            DataFrame: kolumny do wyszukania kierowcy (LOOKUP_COLUMNS) + RECORD_COLUMNS + source_hash
+        """
+        df = self._map_columns(chunk)
+        lookup_columns = [col for col in self.LOOKUP_COLUMNS if col in df.columns]
+        computed = self._compute_values(df)
+        computed['source_hash'] = self._fingerprint(computed)
+        return pd.concat([df[lookup_columns], computed], axis=1)
 
-        return BoltEarnings(
-            user_id=user.id,
-            bolt_id=user.bolt_id,
-            report_date=report_date,
-            gross_total=float(row.get("gross_total", 0.0)),
-            expenses_total=float(row.get("expenses_total", 0.0)),
-            net_income=net_income,
-            cash_collected=float(row.get("cash_collected", 0.0)),
-            vat_due=vat_due,
-            actual_income=actual_income
-        )
-    
-    def _create_uber_record(self, user, row, report_date):
+    def _fingerprint(self, computed):
         """
-        Tworzy rekord UberEarnings
+        Odcisk wartości rekordu (16 znaków hex) liczony dla całego fragmentu naraz.
+        Liczony z wartości zaokrąglonych do groszy - tak jak zapisuje je baza,
+        więc rekord z tym samym odciskiem nie wymaga UPDATE.
         """
+        hashes = pd.util.hash_pandas_object(computed[self.RECORD_COLUMNS].round(2), index=False)
+        return hashes.map('{:016x}'.format)
 
-        gross_total = float(row.get("gross_net_income", 0.0))
-        expenses_total = abs(
-            float(row.get("service_fee", 0.0)) +
-            float(row.get("tax_on_service_fee", 0.0))
-        )
-        net_income = float(row.get("gross_net_income", 0.0))
-        cash_collected = abs(float(row.get("cash_collected", 0.0)))
-        vat_due = self._calculate_uber_vat(row)
-        actual_income = net_income - vat_due
-
-        return UberEarnings(
-            user_id=user.id,
-            uber_id=user.uber_id,
-            report_date=report_date,
-            gross_total=gross_total,
-            expenses_total=expenses_total,
-            net_income=net_income,
-            cash_collected=cash_collected,
-            vat_due=vat_due,
-            actual_income=actual_income
-        )
-    
-    def _update_record(self, existing, row):
+    def prepare(self):
         """
-        Aktualizuje istniejący rekord
+        Wczytuje i przelicza cały plik bez dostępu do bazy danych,
+        dzięki czemu można to zrobić w osobnym procesie (flask import-dir).
+        Wynik przekazuje się do process(prepared=...).
+
+        Returns:
+            DataFrame: jak z _prepare_chunk
         """
+        return self._prepare_chunk(self._load_csv())
 
-        if self.platform == 'bolt':
-            vat_due = self._calculate_bolt_vat(row)
-            net_income = float(row.get("net_income", 0.0))
-            
-            existing.gross_total = float(row.get("gross_total", 0.0))
-            existing.expenses_total = float(row.get("expenses_total", 0.0))
-            existing.net_income = net_income
-            existing.cash_collected = float(row.get("cash_collected", 0.0))
-            existing.vat_due = vat_due
-            existing.actual_income = net_income - vat_due
-            
-        elif self.platform == 'uber':
-            gross_total = float(row.get("gross_net_income", 0.0))
-            expenses_total = abs(
-                float(row.get("service_fee", 0.0)) +
-                float(row.get("tax_on_service_fee", 0.0))
-            )
-            net_income = float(row.get("gross_net_income", 0.0))
-            cash_collected = abs(float(row.get("cash_collected", 0.0)))
-            vat_due = self._calculate_uber_vat(row)
-            
-            existing.gross_total = gross_total
-            existing.expenses_total = expenses_total
-            existing.net_income = net_income
-            existing.cash_collected = cash_collected
-            existing.vat_due = vat_due
-            existing.actual_income = net_income - vat_due
-
-    def process(self):
+    def _process_chunk(self, df, report_date, existing, stats):
+        """
+        Przetwarza jeden fragment pliku: wyszukuje kierowców i zapisuje rekordy paczkami.
+
+        Args:
+            df: przygotowany fragment CSV (z _prepare_chunk)
+            report_date: data raportu
+            existing: {user_id: (id rekordu, source_hash)} - uzupełniany o rekordy zapisane w tym fragmencie
+            stats: słownik z licznikami created/updated/unchanged/skipped (aktualizowany w miejscu)
+        """
+
+        lookup_field = self.config['user_lookup_field']
+        inserts, updates = {}, {}
+
+        # Wartości są już wyliczone dla całego fragmentu, w pętli tylko je odczytujemy
+        for row in df.to_dict('records'):
+            user, platform_id = self._find_account(row)
+
+            if user is None:
+                stats['skipped'] += 1
+                continue
+
+            self.progress['rows_matched'] += 1
+            values = {col: row[col] for col in self.RECORD_COLUMNS}
+            values['source_hash'] = row['source_hash']
+
+            if user.id in existing:
+                record_id, source_hash = existing[user.id]
+                if user.id not in updates and source_hash == values['source_hash']:
+                    # te same dane co w bazie - bez UPDATE
+                    stats['unchanged'] += 1
+                else:
+                    # zaktualizuj istniejący
+                    updates[user.id] = {'id': record_id, **values}
+                    stats['updated'] += 1
+            elif user.id in inserts:
+                # kierowca powtórzony w pliku - ostatni wiersz wygrywa
+                inserts[user.id].update(values)
+                stats['updated'] += 1
+            else:
+                # Utwórz nowy rekord
+                inserts[user.id] = {
+                    'user_id': user.id,
+                    lookup_field: platform_id or getattr(user, lookup_field),
+                    'report_date': report_date,
+                    **values
+                }
+                stats['created'] += 1
+
+        self._write_batches(list(inserts.values()), list(updates.values()))
+        self.progress['rows_written'] += len(inserts) + len(updates)
+
+        # zestawienia dzienne tylko dla kierowców, których wpisy się zmieniły
+        rollups.refresh((user_id, report_date) for user_id in [*inserts, *updates])
+
+        # zapisane rekordy muszą być widoczne jako istniejące dla kolejnych fragmentów
+        for user_id, record in updates.items():
+            existing[user_id] = (record['id'], record['source_hash'])
+        if inserts:
+            existing.update(self._fetch_existing(report_date, user_ids=list(inserts)))
+
+    def process(self, progress=None, prepared=None, force=False, digest=None):
         """
         Główna metoda przetwarzania CSV.
+        Istniejące rekordy z dnia raportu są pobierane jednym zapytaniem,
+        a zapis odbywa się paczkami (upsert po user_id + report_date).
+        Przy ustawionym chunksize plik jest czytany i zapisywany fragmentami,
+        więc zużycie pamięci nie zależy od rozmiaru pliku.
+        Plik identyczny z już zaimportowanym (ten sam skrót SHA-256, platforma i data raportu z nazwy)
+        jest pomijany, chyba że ustawiono force. Rekordy, których wartości się nie zmieniły
+        (ten sam source_hash), nie są aktualizowane.
+
+        Args:
+            progress: opcjonalna funkcja wywoływana po każdym fragmencie
+                      ze słownikiem {'rows_parsed', 'rows_matched', 'rows_written'}
+            prepared: dane z prepare() - plik nie jest wtedy ponownie wczytywany
+            force: importuj ponownie nawet jeśli plik był już zaimportowany
+            digest: skrót pliku policzony wcześniej (wymagany razem z prepared)
 
         returns:
-        dict: {'created': int, 'updated': int, 'skipped': int, 'platform': str}
+        dict: {'created': int, 'updated': int, 'unchanged': int, 'skipped': int,
+               'platform': str, 'duplicate': bool}
         """
 
-        # Wczytaj i przekształć dane
-        df = self._load_csv()
-        df = self._map_columns(df)
-        report_date = self._extract_date_from_filename()
-        df["report_date"] = report_date
+        if digest is None:
+            digest = file_digest(self.file)
+
+        report_date = self.report_date
+        imported = ImportedFile.find(digest, self.platform, report_date)
+        if imported is not None and not force:
+            return {
+                'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0,
+                'platform': self.platform, 'duplicate': True
+            }
+
+        existing = self._fetch_existing(report_date)
 
         # Statystyki
-        created, updated, skipped = 0, 0, 0
-        Model = self.config['model']
+        stats = {'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0}
 
-        # Przetwórz każdy wiersz
-        for _, row in df.iterrows():
-            user = self._find_user(row)
+        if prepared is not None:
+            chunks = [prepared]
+        else:
+            chunks = (self._prepare_chunk(chunk) for chunk in self._iter_chunks())
 
-            if user is None:
-                skipped += 1
-                continue
+        for chunk in chunks:
+            self.progress['rows_parsed'] += len(chunk)
+            self._process_chunk(chunk, report_date, existing, stats)
 
-            # sprawdź czy rekord istnieje
-            existing = Model.query.filter_by(
-                user_id=user.id,
-                report_date=report_date
-            ).first()
+            # zapis fragmentu trafia do bazy, sesja nie trzyma żadnych obiektów wierszy
+            db.session.flush()
 
-            if existing is None:
-                # Utwórz nowy rekord
-                if self.platform == 'bolt':
-                    record = self._create_bolt_record(user, row, report_date)
-                else:
-                    record = self._create_uber_record(user, row, report_date)
+            if progress is not None:
+                progress(dict(self.progress))
+
+        # zapamiętaj plik w rejestrze (przy wymuszonym imporcie - zaktualizuj wpis)
+        if imported is None:
+            imported = ImportedFile(sha256=digest, platform=self.platform, report_date=report_date)
+            db.session.add(imported)
+        imported.filename = self.filename
+        imported.created = stats['created']
+        imported.updated = stats['updated']
+        imported.unchanged = stats['unchanged']
+        imported.skipped = stats['skipped']
+        imported.imported_at = datetime.utcnow()
 
-                db.session.add(record)
-                created += 1
-            else:
-                # zaktualizuj istniejący
-                self._update_record(existing, row)
-                updated += 1
-        
         db.session.commit()
 
-        return {
-            'created': created,
-            'updated': updated,
-            'skipped': skipped,
-            'platform': self.platform
-        }
\ No newline at end of file
+        return {**stats, 'platform': self.platform, 'duplicate': False}
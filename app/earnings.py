@@ -0,0 +1,322 @@
+"""
+Zapytania dla widoku zarobków kierowcy.
+Sumy z dowolnego zakresu dat to różnica dwóch sum narastających z dziennych zestawień
+(DriverDailyRollup), oś czasu to odczyt zestawień (dziennych, miesięcznych lub rocznych - zależnie od
+długości zakresu), a wiersze ORM są pobierane tylko dla wyświetlanej strony.
+Stronicowanie jest kursorowe (keyset) po (data, id) - kolejne strony nie używają OFFSET,
+więc koszt strony nie zależy od tego, jak daleko w historii kierowcy się znajduje.
+"""
+
+from datetime import date
+from decimal import Decimal
+from sqlalchemy import or_, and_
+from app import db
+from app.models import User, BoltEarnings, UberEarnings, Expense, DriverDailyRollup, DriverPeriodRollup
+
+
+#kolumny sumowane w podsumowaniach: klucz w szablonie -> kolumna
+#dla Bolt "zarobek" to zarobki netto (po prowizji), dla Uber - zarobki ogółem
+TOTAL_COLUMNS = {
+    BoltEarnings: {
+        'gross': BoltEarnings.net_income,
+        'cash': BoltEarnings.cash_collected,
+        'vat': BoltEarnings.vat_due,
+        'actual': BoltEarnings.actual_income,
+    },
+    UberEarnings: {
+        'gross': UberEarnings.gross_total,
+        'cash': UberEarnings.cash_collected,
+        'vat': UberEarnings.vat_due,
+        'actual': UberEarnings.actual_income,
+    },
+    Expense: {
+        'net': Expense.net_amount,
+        'vat': Expense.vat_amount,
+        'vat_deductible': Expense.vat_deductible,
+        'deductible': Expense.deductible_amount,
+    },
+}
+
+#kolumna z datą, po której filtrowany jest zakres
+DATE_COLUMNS = {
+    BoltEarnings: BoltEarnings.report_date,
+    UberEarnings: UberEarnings.report_date,
+    Expense: Expense.issue_date,
+    DriverDailyRollup: DriverDailyRollup.day,
+}
+
+
+#prefiks kolumn osi czasu i zestawień dziennych dla każdej tabeli (np. bolt_gross, expenses_vat_deductible)
+TIMELINE_PREFIXES = {
+    BoltEarnings: 'bolt',
+    UberEarnings: 'uber',
+    Expense: 'expenses',
+}
+
+TIMELINE_KEYS = [f"{TIMELINE_PREFIXES[Model]}_{key}" for Model, columns in TOTAL_COLUMNS.items() for key in columns]
+
+#rozdzielczości osi czasu od najdrobniejszej i największa liczba punktów, przy której jest jeszcze używana
+#(zakres dłuższy niż 366 dni -> miesiące, dłuższy niż 120 miesięcy -> lata)
+RESOLUTION_MAX_POINTS = {
+    'day': 366,
+    'month': 120,
+    'year': None,
+}
+
+
+def _filter_range(query, Model, driver_id, date_from=None, date_to=None):
+    """
+    Zawęża zapytanie do kierowcy i zakresu dat (puste daty = bez ograniczenia)
+    """
+    date_column = DATE_COLUMNS[Model]
+    query = query.where(Model.user_id == driver_id)
+    if date_from:
+        query = query.where(date_column >= date_from)
+    if date_to:
+        query = query.where(date_column <= date_to)
+    return query
+
+
+def _cumulative(driver_id, day=None, before=False):
+    """
+    Sumy narastające kierowcy z ostatniego dnia <= day (before=True: < day), bez day - z ostatniego dnia.
+    Jedno zapytanie po indeksie (user_id, day) - koszt nie zależy od długości historii.
+
+    Returns:
+        dict: {klucz z TIMELINE_KEYS: Decimal} (0 gdy brak wcześniejszych dni)
+    """
+    columns = [getattr(DriverDailyRollup, f"cum_{key}") for key in TIMELINE_KEYS]
+    query = db.select(*columns).where(DriverDailyRollup.user_id == driver_id)
+    if day:
+        query = query.where(DriverDailyRollup.day < day if before else DriverDailyRollup.day <= day)
+    row = db.session.execute(query.order_by(DriverDailyRollup.day.desc()).limit(1)).first()
+    if row is None:
+        return dict.fromkeys(TIMELINE_KEYS, Decimal('0'))
+    return dict(zip(TIMELINE_KEYS, row))
+
+
+def range_totals(driver_id, date_from=None, date_to=None):
+    """
+    Sumy wszystkich kolumn zestawień kierowcy w zakresie dat jako różnica sum narastających:
+    cum(ostatni dzień <= date_to) - cum(ostatni dzień < date_from).
+    Dwa odczyty po indeksie niezależnie od szerokości zakresu.
+
+    Args:
+        driver_id: id kierowcy
+        date_from, date_to: zakres dat (włącznie), puste = bez ograniczenia
+    Returns:
+        dict: {klucz z TIMELINE_KEYS: Decimal}
+    """
+    if date_from and date_to and str(date_from) > str(date_to):
+        return dict.fromkeys(TIMELINE_KEYS, Decimal('0'))
+
+    end = _cumulative(driver_id, date_to)
+    if not date_from:
+        return end
+    start = _cumulative(driver_id, date_from, before=True)
+    return {key: end[key] - start[key] for key in TIMELINE_KEYS}
+
+
+def totals_by_source(driver_id, date_from=None, date_to=None):
+    """
+    Sumy w zakresie dat rozbite na Bolt, Uber i faktury (klucze jak w TOTAL_COLUMNS)
+
+    Returns:
+        dict: {Model: {klucz: Decimal}}
+    """
+    combined = range_totals(driver_id, date_from, date_to)
+    return {
+        Model: {key: combined[f"{TIMELINE_PREFIXES[Model]}_{key}"] for key in columns}
+        for Model, columns in TOTAL_COLUMNS.items()
+    }
+
+
+def totals(Model, driver_id, date_from=None, date_to=None):
+    """
+    Sumy dla kierowcy w zakresie dat dla jednej tabeli
+
+    Args:
+        Model: BoltEarnings, UberEarnings lub Expense
+        driver_id: id kierowcy
+        date_from, date_to: zakres dat (włącznie), puste = bez ograniczenia
+    Returns:
+        dict: {klucz: Decimal} według TOTAL_COLUMNS (0 gdy brak wpisów)
+    """
+    return totals_by_source(driver_id, date_from, date_to)[Model]
+
+
+def parse_cursor(value):
+    """
+    Odczytuje kursor strony z parametru URL ("RRRR-MM-DD.id")
+
+    Returns:
+        tuple: (date, id) lub None dla pustego / błędnego kursora (pierwsza strona)
+    """
+    try:
+        day, row_id = value.split('.')
+        return date.fromisoformat(day), int(row_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _cursor(Model, row):
+    """
+    Kursor wskazujący na wiersz (ostatni wiersz strony)
+    """
+    return f"{getattr(row, DATE_COLUMNS[Model].key).isoformat()}.{row.id}"
+
+
+def page(Model, driver_id, date_from=None, date_to=None, limit=50, after=None):
+    """
+    Strona wpisów kierowcy w zakresie dat, od najnowszej daty.
+    Pobierany jest jeden wiersz więcej niż limit - tylko po to, by wiedzieć, czy jest następna strona.
+
+    Args:
+        Model: BoltEarnings, UberEarnings lub Expense
+        driver_id: id kierowcy
+        date_from, date_to: zakres dat (włącznie), puste = bez ograniczenia
+        limit: liczba wpisów na stronie
+        after: kursor (date, id) ostatniego wpisu poprzedniej strony, None = pierwsza strona
+    Returns:
+        tuple: (lista obiektów Model, kursor następnej strony lub None)
+    """
+    date_column = DATE_COLUMNS[Model]
+    query = _filter_range(db.select(Model), Model, driver_id, date_from, date_to)
+    if after is not None:
+        after_date, after_id = after
+        query = query.where(or_(date_column < after_date, and_(date_column == after_date, Model.id < after_id)))
+    query = query.order_by(date_column.desc(), Model.id.desc()).limit(limit + 1)
+
+    rows = db.session.execute(query).scalars().all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, _cursor(Model, rows[-1])
+    return rows, None
+
+
+def stream(Model, driver_id, date_from=None, date_to=None, batch_size=500):
+    """
+    Wszystkie wpisy kierowcy w zakresie dat, pobierane z bazy paczkami (yield_per).
+    Do renderowania strumieniowego - w pamięci jest tylko jedna paczka naraz.
+
+    Returns:
+        iterator obiektów Model od najnowszej daty
+    """
+    date_column = DATE_COLUMNS[Model]
+    query = _filter_range(db.select(Model), Model, driver_id, date_from, date_to)
+    query = query.order_by(date_column.desc(), Model.id.desc()).execution_options(yield_per=batch_size)
+    yield from db.session.execute(query).scalars()
+
+
+def timeline(driver_id, date_from=None, date_to=None):
+    """
+    Dzienna oś czasu kierowcy: jeden wiersz na dzień, kolumny Bolt, Uber i faktur obok siebie.
+    Jedno zapytanie po zestawieniach dziennych (wiersz zestawienia to już połączone trzy tabele).
+
+    Returns:
+        list: słowniki {'day': date, 'bolt_gross': Decimal, ..., 'expenses_deductible': Decimal}
+              posortowane rosnąco po dniu (tylko dni z jakimkolwiek wpisem)
+    """
+    columns = [getattr(DriverDailyRollup, key).label(key) for key in TIMELINE_KEYS]
+    query = _filter_range(db.select(DriverDailyRollup.day, *columns), DriverDailyRollup, driver_id, date_from, date_to)
+    return [row._asdict() for row in db.session.execute(query.order_by(DriverDailyRollup.day))]
+
+
+def _period_count(date_from, date_to, resolution):
+    """
+    Liczba dni / miesięcy / lat, w które wypada zakres dat (włącznie)
+    """
+    if resolution == 'day':
+        return (date_to - date_from).days + 1
+    if resolution == 'month':
+        return (date_to.year - date_from.year) * 12 + date_to.month - date_from.month + 1
+    return date_to.year - date_from.year + 1
+
+
+def pick_resolution(date_from, date_to):
+    """
+    Najdrobniejsza rozdzielczość, w której zakres ma nie więcej punktów niż RESOLUTION_MAX_POINTS
+    - im dłuższy zakres, tym grubsze zestawienia są czytane, więc koszt nie rośnie z historią
+
+    Returns:
+        str: 'day', 'month' lub 'year'
+    """
+    for resolution, max_points in RESOLUTION_MAX_POINTS.items():
+        if max_points is None or _period_count(date_from, date_to, resolution) <= max_points:
+            return resolution
+
+
+def series(driver_id, date_from, date_to, resolution=None):
+    """
+    Oś czasu kierowcy w rozdzielczości dziennej, miesięcznej lub rocznej.
+    Okresy w całości w zakresie są czytane z DriverPeriodRollup, okresy na brzegach zakresu
+    (przycięte przez date_from / date_to) - z sum narastających, więc sumy zawsze dotyczą dokładnie zakresu.
+
+    Args:
+        driver_id: id kierowcy
+        date_from, date_to: zakres dat (date, włącznie)
+        resolution: 'day', 'month', 'year' lub None (dobór według pick_resolution)
+    Returns:
+        tuple: (rozdzielczość, lista słowników {'day': początek okresu (przycięty do zakresu), 'bolt_gross': ..., ...})
+               posortowana rosnąco, tylko okresy z jakimkolwiek wpisem
+    """
+    resolution = resolution or pick_resolution(date_from, date_to)
+    if resolution == 'day':
+        return resolution, timeline(driver_id, date_from, date_to)
+    if date_from > date_to:
+        return resolution, []
+
+    first = DriverPeriodRollup.start_of(date_from, resolution)
+    last = DriverPeriodRollup.start_of(date_to, resolution)
+    columns = [getattr(DriverPeriodRollup, key).label(key) for key in TIMELINE_KEYS]
+    query = (
+        db.select(DriverPeriodRollup.period_start.label('day'), *columns)
+        .where(
+            DriverPeriodRollup.user_id == driver_id,
+            DriverPeriodRollup.period == resolution,
+            DriverPeriodRollup.period_start.between(first, last)
+        )
+        .order_by(DriverPeriodRollup.period_start)
+    )
+    rows = {row.day: row._asdict() for row in db.session.execute(query)}
+
+    #okresy przycięte przez zakres - tylko ich część z zakresu
+    for start in {first, last}:
+        end = DriverPeriodRollup.end_of(start, resolution)
+        clipped_from, clipped_to = max(start, date_from), min(end, date_to)
+        if (clipped_from, clipped_to) == (start, end):
+            continue
+        rows.pop(start, None)
+        values = range_totals(driver_id, clipped_from, clipped_to)
+        if any(values.values()):
+            rows[clipped_from] = {'day': clipped_from, **values}
+
+    return resolution, [rows[day] for day in sorted(rows)]
+
+
+def monthly_vat(year):
+    """
+    Miesięczne zestawienie VAT wszystkich kierowców za rok (dla księgowości), z zestawień miesięcznych
+
+    Returns:
+        list: słowniki {'user_id', 'username', 'month': date, 'vat_due', 'vat_deductible', 'vat_balance'}
+              posortowane po kierowcy i miesiącu; vat_due = VAT Bolt + Uber, vat_balance = vat_due - vat_deductible
+    """
+    start = date(year, 1, 1)
+    vat_due = (DriverPeriodRollup.bolt_vat + DriverPeriodRollup.uber_vat).label('vat_due')
+    query = (
+        db.select(
+            DriverPeriodRollup.user_id, User.username, DriverPeriodRollup.period_start.label('month'),
+            vat_due, DriverPeriodRollup.expenses_vat_deductible.label('vat_deductible')
+        )
+        .join(User, User.id == DriverPeriodRollup.user_id)
+        .where(
+            DriverPeriodRollup.period == 'month',
+            DriverPeriodRollup.period_start.between(start, DriverPeriodRollup.end_of(start, 'year'))
+        )
+        .order_by(User.username, DriverPeriodRollup.period_start)
+    )
+    return [
+        {**row._asdict(), 'vat_balance': row.vat_due - row.vat_deductible}
+        for row in db.session.execute(query)
+    ]
@@ -0,0 +1,308 @@
+"""
+Eksport rozliczeń i zarobków całej floty za zakres dat - CSV lub XLSX, strumieniowo.
+Wiersze są czytane z bazy paczkami (yield_per), a plik jest wysyłany kawałkami w trakcie czytania -
+pamięć nie zależy od liczby wierszy, a pierwsze bajty trafiają do klienta od razu.
+
+XLSX jest składany ręcznie (zipfile + minimalny SpreadsheetML): biblioteki XLSX budują cały plik
+przed zapisem, więc nie da się z nich wysyłać pliku w trakcie generowania.
+
+Układy (KINDS):
+- settlements: raporty tygodniowe (wszystkie kwoty raportu)
+- earnings: dzienne zestawienia kierowców (Bolt, Uber, faktury)
+- bank: lista przelewów - odbiorca, rachunek, kwota do wypłaty, tytuł (tylko kwoty > 0)
+
+Eksport rozliczeń i przelewów jest odrzucany (StaleReportsError), dopóki w zakresie są raporty nieaktualne
+(WeeklyReport.is_stale) - kwoty do wypłaty trzeba najpierw przeliczyć (flask recompute-reports).
+"""
+
+import csv
+import io
+import zipfile
+from datetime import date
+from decimal import Decimal
+from itertools import chain
+from xml.sax.saxutils import escape
+from app import db
+from app.models import User, WeeklyReport, DriverDailyRollup
+from app.earnings import TIMELINE_KEYS
+
+#formaty plików: typ MIME
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+#co ile wierszy wysyłany jest kolejny kawałek pliku (i pobierana paczka z bazy)
+BATCH_SIZE = 1000
+
+#kolumny raportu tygodniowego w eksporcie rozliczeń
+SETTLEMENT_COLUMNS = (
+    'total_gross', 'total_cash', 'total_vat_calculated', 'total_vat', 'vat_carryover', 'total_actual',
+    'expenses_net', 'expenses_vat', 'expenses_vat_deductible', 'expenses_deductible',
+    'settlement_fee', 'contract_fee', 'fuel_amount', 'final_amount',
+)
+
+
+#układy z kwotami raportów tygodniowych - wymagają aktualnych raportów
+REPORT_KINDS = ('settlements', 'bank')
+
+
+class StaleReportsError(ValueError):
+    """
+    W zakresie eksportu są raporty nieaktualne (po spóźnionym imporcie lub korekcie)
+    """
+
+    def __init__(self, count):
+        self.count = count
+        super().__init__(
+            f"W zakresie eksportu są nieaktualne raporty tygodniowe ({count}) - "
+            "przelicz je najpierw (Przelicz nieaktualne raporty / flask recompute-reports)"
+        )
+
+
+def _report_range(date_from, date_to):
+    """
+    Warunek raportów tygodniowych mieszczących się w zakresie dat
+    """
+    return db.and_(WeeklyReport.date_from >= date_from, WeeklyReport.date_to <= date_to)
+
+
+def check_stale(kind, date_from, date_to):
+    """
+    Sprawdza, czy eksport nie zawierałby kwot z nieaktualnych raportów
+
+    Raises:
+        StaleReportsError: w zakresie są raporty z is_stale (dla układów REPORT_KINDS)
+    """
+    if kind not in REPORT_KINDS:
+        return
+    count = db.session.execute(
+        db.select(db.func.count(WeeklyReport.id)).where(_report_range(date_from, date_to), WeeklyReport.is_stale == db.true())
+    ).scalar()
+    if count:
+        raise StaleReportsError(count)
+
+
+def _settlements(date_from, date_to):
+    """
+    Raporty tygodniowe mieszczące się w zakresie dat
+    """
+    header = ('kierowca', 'raport', 'data_od', 'data_do', *SETTLEMENT_COLUMNS)
+    query = (
+        db.select(
+            User.username, WeeklyReport.report_name, WeeklyReport.date_from, WeeklyReport.date_to,
+            *[getattr(WeeklyReport, column) for column in SETTLEMENT_COLUMNS]
+        )
+        .join(User, User.id == WeeklyReport.user_id)
+        .where(_report_range(date_from, date_to))
+        .order_by(WeeklyReport.date_from, User.username)
+    )
+    return header, query
+
+
+def _earnings(date_from, date_to):
+    """
+    Dzienne zestawienia kierowców z zakresu dat
+    """
+    header = ('kierowca', 'dzien', *TIMELINE_KEYS)
+    query = (
+        db.select(User.username, DriverDailyRollup.day, *[getattr(DriverDailyRollup, key) for key in TIMELINE_KEYS])
+        .join(User, User.id == DriverDailyRollup.user_id)
+        .where(DriverDailyRollup.day.between(date_from, date_to))
+        .order_by(User.username, DriverDailyRollup.day)
+    )
+    return header, query
+
+
+def _bank(date_from, date_to):
+    """
+    Przelewy do wykonania: raporty z zakresu z dodatnią kwotą do wypłaty
+    """
+    header = ('nazwa_odbiorcy', 'rachunek_odbiorcy', 'kwota', 'tytul')
+    query = (
+        db.select(
+            User.username, db.func.coalesce(User.bank_account, ''), WeeklyReport.final_amount,
+            ('Wypłata - ' + WeeklyReport.report_name)
+        )
+        .join(User, User.id == WeeklyReport.user_id)
+        .where(_report_range(date_from, date_to), WeeklyReport.final_amount > 0)
+        .order_by(User.username, WeeklyReport.date_from)
+    )
+    return header, query
+
+
+#układy eksportu: funkcja zwracająca (nagłówek, zapytanie)
+KINDS = {
+    'settlements': _settlements,
+    'earnings': _earnings,
+    'bank': _bank,
+}
+
+
+def rows(kind, date_from, date_to):
+    """
+    Nagłówek i wiersze eksportu - wiersze czytane z bazy paczkami (yield_per)
+
+    Args:
+        kind: klucz z KINDS
+        date_from, date_to: zakres dat (date, włącznie)
+    Returns:
+        tuple: (krotka nazw kolumn, iterator krotek wartości)
+    Raises:
+        StaleReportsError: w zakresie są nieaktualne raporty (rozliczenia, przelewy)
+    """
+    check_stale(kind, date_from, date_to)
+    header, query = KINDS[kind](date_from, date_to)
+    result = db.session.execute(query.execution_options(yield_per=BATCH_SIZE))
+    return header, (tuple(row) for row in result)
+
+
+def _csv_value(value):
+    if isinstance(value, Decimal):
+        return f"{value:.2f}"
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def stream_csv(header, data):
+    """
+    Plik CSV (separator ';', UTF-8 z BOM - poprawnie otwierany w polskim Excelu) kawałkami co BATCH_SIZE wierszy
+
+    Returns:
+        iterator bajtów
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=';')
+    buffer.write('\ufeff')
+    writer.writerow(header)
+    for index, row in enumerate(data, start=1):
+        writer.writerow([_csv_value(value) for value in row])
+        if index % BATCH_SIZE == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+##########################
+###   XLSX STRUMIENIOWO
+##########################
+
+_XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Eksport" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_TAIL = '</sheetData></worksheet>'
+
+
+class _Sink(io.RawIOBase):
+    """
+    Strumień bez przewijania, do którego zipfile zapisuje archiwum - zapisane bajty są odbierane przez drain()
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _xlsx_cell(value):
+    if isinstance(value, (Decimal, int, float)) and not isinstance(value, bool):
+        return f'<c><v>{value}</v></c>'
+    if isinstance(value, date):
+        value = value.isoformat()
+    return f'<c t="inlineStr"><is><t>{escape(str(value if value is not None else ""))}</t></is></c>'
+
+
+def stream_xlsx(header, data):
+    """
+    Plik XLSX (jeden arkusz, liczby jako liczby) kawałkami co BATCH_SIZE wierszy.
+    Archiwum ZIP jest zapisywane bez przewijania (deskryptory danych po każdym pliku),
+    więc początek pliku można wysłać, zanim powstanie koniec.
+
+    Returns:
+        iterator bajtów
+    """
+    sink = _Sink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_PARTS.items():
+            archive.writestr(name, content)
+        yield sink.drain()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(_SHEET_HEAD.encode('utf-8'))
+            for index, row in enumerate(chain([header], data), start=1):
+                cells = ''.join(_xlsx_cell(value) for value in row)
+                sheet.write(f'<row r="{index}">{cells}</row>'.encode('utf-8'))
+                if index % BATCH_SIZE == 0:
+                    yield sink.drain()
+            sheet.write(_SHEET_TAIL.encode('utf-8'))
+    yield sink.drain()
+
+
+def stream(kind, file_format, date_from, date_to):
+    """
+    Plik eksportu kawałkami
+
+    Args:
+        kind: klucz z KINDS
+        file_format: klucz z FORMATS
+        date_from, date_to: zakres dat (date, włącznie)
+    Returns:
+        iterator bajtów
+    Raises:
+        StaleReportsError: w zakresie są nieaktualne raporty (sprawdzane przed wysłaniem pierwszego kawałka)
+    """
+    header, data = rows(kind, date_from, date_to)
+    if file_format == 'xlsx':
+        return stream_xlsx(header, data)
+    return stream_csv(header, data)
+
+
+def filename(kind, file_format, date_from, date_to):
+    """
+    Nazwa pliku eksportu (np. settlements_2025-01-06_2025-01-12.csv)
+    """
+    return f"{kind}_{date_from.isoformat()}_{date_to.isoformat()}.{file_format}"
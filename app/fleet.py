@@ -0,0 +1,97 @@
+"""
+Lista kierowców w panelu administratora ze statystykami - jednym zapytaniem.
+Statystyki są podzapytaniami skorelowanymi po indeksach (user_id, ...) tabel zestawień i raportów,
+a liczba wszystkich pasujących kierowców (do stronicowania) to COUNT(*) OVER () w tym samym zapytaniu
+(osobne zapytanie tylko dla strony za końcem listy).
+Nie są ładowane relacje kierowcy (bolt_earnings, uber_earnings, expenses).
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal
+from sqlalchemy import or_
+from app import db
+from app.models import User, DriverDailyRollup, WeeklyReport
+
+
+def _stats_columns(week_start, today):
+    """
+    Podzapytania statystyk kierowcy (skorelowane z User.id)
+    """
+    last_day = (
+        db.select(db.func.max(DriverDailyRollup.day))
+        .where(DriverDailyRollup.user_id == User.id)
+        .scalar_subquery()
+        .label('last_day')
+    )
+    week_gross = db.func.coalesce(
+        db.select(db.func.sum(DriverDailyRollup.bolt_gross + DriverDailyRollup.uber_gross))
+        .where(DriverDailyRollup.user_id == User.id, DriverDailyRollup.day.between(week_start, today))
+        .scalar_subquery(),
+        0
+    ).label('week_gross')
+    #VAT do przeniesienia jest wyświetlany jako min(kwota, 0) - sortowanie po tej samej wartości
+    carryover = db.func.coalesce(
+        db.select(db.case((WeeklyReport.vat_carryover < 0, WeeklyReport.vat_carryover), else_=0))
+        .where(WeeklyReport.user_id == User.id)
+        .order_by(WeeklyReport.date_to.desc(), WeeklyReport.id.desc())
+        .limit(1)
+        .scalar_subquery(),
+        0
+    ).label('carryover')
+    return {'last_day': last_day, 'week_gross': week_gross, 'carryover': carryover}
+
+
+#kolumny, po których można sortować listę (klucz w URL -> kolumna lub statystyka)
+SORT_KEYS = ('username', 'last_day', 'week_gross', 'carryover')
+
+
+def driver_list(search='', sort='username', descending=False, page=1, per_page=50, today=None):
+    """
+    Strona listy kierowców ze statystykami (jedno zapytanie)
+
+    Args:
+        search: fragment nazwy użytkownika, Uber ID lub Bolt ID (puste = wszyscy)
+        sort: klucz z SORT_KEYS
+        descending: sortowanie malejące
+        page, per_page: numer strony (od 1) i liczba kierowców na stronie
+        today: dzień odniesienia dla zarobków tygodnia (domyślnie dziś)
+    Returns:
+        tuple: (lista słowników {'id', 'username', 'uber_id', 'bolt_id', 'last_day', 'week_gross', 'carryover'},
+                liczba wszystkich pasujących kierowców)
+    """
+    today = today or date.today()
+    stats = _stats_columns(today - timedelta(days=today.weekday()), today)
+    total = db.func.count().over().label('total')
+
+    filters = [User.role == 'driver']
+    if search:
+        #% i _ wpisane przez administratora to zwykłe znaki, nie symbole wieloznaczne
+        escaped = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        pattern = f"%{escaped}%"
+        filters.append(or_(*(column.ilike(pattern, escape='\\') for column in (User.username, User.uber_id, User.bolt_id))))
+    query = db.select(User.id, User.username, User.uber_id, User.bolt_id, *stats.values(), total).where(*filters)
+
+    order = User.username if sort not in stats else stats[sort]
+    order = order.desc() if descending else order.asc()
+    query = query.order_by(order, User.id).limit(per_page).offset((max(page, 1) - 1) * per_page)
+
+    rows = db.session.execute(query).all()
+    drivers = [
+        {
+            'id': row.id,
+            'username': row.username,
+            'uber_id': row.uber_id,
+            'bolt_id': row.bolt_id,
+            'last_day': row.last_day,
+            'week_gross': Decimal(row.week_gross),
+            'carryover': Decimal(row.carryover),
+        }
+        for row in rows
+    ]
+    if rows:
+        return drivers, rows[0].total
+
+    #strona za końcem listy nie ma wierszy z COUNT(*) OVER () - liczba kierowców osobnym zapytaniem
+    if page > 1:
+        return drivers, db.session.execute(db.select(db.func.count(User.id)).where(*filters)).scalar()
+    return drivers, 0
@@ -1,6 +1,6 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, PasswordField, SubmitField, FileField, SelectField, DecimalField, DateField, TextAreaField, BooleanField
-from wtforms.validators import DataRequired, Length, NumberRange, Optional, ValidationError
+from wtforms import StringField, PasswordField, SubmitField, FileField, MultipleFileField, SelectField, DecimalField, DateField, TextAreaField, BooleanField
+from wtforms.validators import DataRequired, InputRequired, Length, NumberRange, Optional, ValidationError
 from datetime import date, timedelta
 
 ##########################
@@ -15,8 +15,16 @@ class AddDriverForm(FlaskForm):
     password = PasswordField('Hasło', validators=[DataRequired(), Length(min=6)])
     uber_id = StringField('Uber driver ID')
     bolt_id = StringField('Bolt driver ID')
+    bank_account = StringField('Numer rachunku (wypłaty)', validators=[Optional(), Length(max=42)]) #IBAN ze spacjami
     submit = SubmitField('Dodaj kierowcę')
 
+class ImportDriversForm(FlaskForm):
+    """
+    Formularz zakładania kont wielu kierowców z pliku CSV (username, password, bolt_id, uber_id)
+    """
+    file = FileField('Plik CSV z kierowcami', validators=[DataRequired()])
+    submit = SubmitField('Załóż konta')
+
 class DriverLoginForm(FlaskForm):
     """
     Formularz logowania - dla admina i kierowcy
@@ -27,9 +35,11 @@ class DriverLoginForm(FlaskForm):
 
 class CSVUploadForm(FlaskForm):
     """
-    Formularz uploadu pliku CSV z zarobkami kierowców - bolt
+    Formularz uploadu plików CSV z zarobkami kierowców (Bolt / Uber).
+    Można wybrać kilka plików naraz lub archiwum ZIP z plikami CSV.
     """
-    file = FileField("Plik CSV", validators=[DataRequired()])
+    file = MultipleFileField("Plik CSV (kilka plików lub archiwum ZIP)", validators=[DataRequired()])
+    force = BooleanField("Wymuś ponowny import plików, które już były zaimportowane")
     submit = SubmitField("Wyślij")
 
 class AddExpenseForm(FlaskForm):
@@ -57,9 +67,11 @@ class AddExpenseForm(FlaskForm):
         
 class GenerateReportForm(FlaskForm):
     """
-    Formularz generowania raportu tygodniowego
+    Formularz generowania raportu tygodniowego (jednego kierowcy lub wszystkich - driver_id = ALL_DRIVERS)
     """
-    driver_id = SelectField('Kierowca', coerce=int, validators=[DataRequired()])
+    ALL_DRIVERS = 0
+
+    driver_id = SelectField('Kierowca', coerce=int, validators=[InputRequired()])
     report_name = StringField('Nazwa raportu', validators=[DataRequired(), Length(max=128)],
                               render_kw={"placeholder": "np. Tydzień 40/2024"})
     date_from = DateField('Data od', format='%Y-%m-%d', validators=[DataRequired()])
@@ -79,4 +91,18 @@ class GenerateReportForm(FlaskForm):
         Data końcowa musi być >= data początkowa
         """
         if field.data < self.date_from.data:
-            raise ValidationError('Data końcowa nie może być wcześniejsza niż początkowa')
\ No newline at end of file
+            raise ValidationError('Data końcowa nie może być wcześniejsza niż początkowa')
+
+    def validate_fuel_amount(self, field):
+        """
+        Paliwo można wpisać tylko przy raporcie jednego kierowcy
+        """
+        if field.data and self.driver_id.data == self.ALL_DRIVERS:
+            raise ValidationError('Kwotę paliwa można wpisać tylko dla jednego kierowcy')
+
+
+class RecomputeReportsForm(FlaskForm):
+    """
+    Przycisk przeliczenia nieaktualnych raportów tygodniowych
+    """
+    submit = SubmitField('Przelicz nieaktualne')
@@ -0,0 +1,145 @@
+"""
+Podręczna pamięć tożsamości zalogowanych użytkowników dla Flask-Login (user_loader).
+Zamiast pobierać wiersz User przy każdym żądaniu, load_user zwraca lekki UserSnapshot
+(id, nazwa, rola, identyfikatory platform) trzymany w pamięci procesu przez USER_CACHE_TTL sekund.
+
+Pamięć jest osobna dla każdej instancji aplikacji (app.extensions['user_cache']).
+Zmiana lub usunięcie użytkownika przez ORM usuwa jego wpis po zatwierdzeniu transakcji: identyfikatory
+zmienionych użytkowników są zbierane przy flush (after_flush), a wpisy usuwane w after_commit
+(po rollback zebrane identyfikatory są porzucane). Usunięcie wcześniej - przy flush - pozwalałoby
+równoległemu żądaniu wczytać i zapamiętać na cały TTL jeszcze niezatwierdzony, stary wiersz.
+Zmiany z pominięciem ORM (np. UPDATE w konsoli bazy) są widoczne najpóźniej po upływie TTL.
+"""
+
+import threading
+import time
+from flask import current_app, has_app_context
+from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import db
+from app.models import User
+
+#domyślny czas ważności wpisu (sekundy)
+DEFAULT_TTL = 60
+
+
+class UserSnapshot(UserMixin):
+    """
+    Tożsamość zalogowanego użytkownika bez połączenia z sesją bazy - tylko pola używane
+    przy sprawdzaniu uprawnień i w szablonach (current_user)
+    """
+
+    __slots__ = ('id', 'username', 'role', 'uber_id', 'bolt_id')
+
+    def __init__(self, id, username, role, uber_id=None, bolt_id=None):
+        self.id = id
+        self.username = username
+        self.role = role
+        self.uber_id = uber_id
+        self.bolt_id = bolt_id
+
+    @classmethod
+    def load(cls, user_id):
+        """
+        Pobiera tożsamość z bazy (tylko potrzebne kolumny)
+
+        Returns:
+            UserSnapshot lub None, jeśli użytkownik nie istnieje
+        """
+        row = db.session.execute(
+            db.select(User.id, User.username, User.role, User.uber_id, User.bolt_id).where(User.id == user_id)
+        ).first()
+        return cls(*row) if row else None
+
+    def __repr__(self):
+        return f'<UserSnapshot {self.username} ({self.role})>'
+
+
+class UserCache:
+    """
+    Pamięć tożsamości {user_id: (UserSnapshot, czas wygaśnięcia)} bezpieczna dla wątków
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        #licznik unieważnień - tożsamość wczytana przed unieważnieniem nie jest zapamiętywana
+        self._generation = 0
+
+    def get(self, user_id):
+        """
+        Tożsamość użytkownika - z pamięci lub z bazy (po wygaśnięciu / przy pierwszym żądaniu)
+
+        Returns:
+            UserSnapshot lub None, jeśli użytkownik nie istnieje
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            generation = self._generation
+        if entry and entry[1] > now:
+            return entry[0]
+
+        snapshot = UserSnapshot.load(user_id)
+        if snapshot is not None and self.ttl > 0:
+            with self._lock:
+                if generation == self._generation:
+                    self._entries[user_id] = (snapshot, now + self.ttl)
+        return snapshot
+
+    def invalidate(self, user_id=None):
+        """
+        Usuwa wpis użytkownika (None = wszystkie wpisy)
+        """
+        with self._lock:
+            self._generation += 1
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+
+def init_app(app):
+    """
+    Tworzy pamięć tożsamości aplikacji (czas ważności: USER_CACHE_TTL, 0 = wyłączona)
+    """
+    app.extensions['user_cache'] = UserCache(app.config.get('USER_CACHE_TTL', DEFAULT_TTL))
+
+
+def user_cache():
+    """
+    Pamięć tożsamości bieżącej aplikacji
+    """
+    return current_app.extensions['user_cache']
+
+
+#identyfikatory użytkowników zmienionych w bieżącej transakcji sesji (session.info)
+_PENDING_KEY = 'user_cache_invalidate'
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_users(session, flush_context):
+    #edycja / usunięcie użytkownika - wpis zostanie usunięty dopiero po commit
+    changed = {
+        instance.id for instance in (*session.dirty, *session.deleted)
+        if isinstance(instance, User) and instance.id is not None
+    }
+    if changed:
+        session.info.setdefault(_PENDING_KEY, set()).update(changed)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_users(session):
+    #zmiany zatwierdzone - następne żądanie pobierze aktualną tożsamość
+    changed = session.info.pop(_PENDING_KEY, None)
+    if changed and has_app_context() and 'user_cache' in current_app.extensions:
+        for user_id in changed:
+            user_cache().invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changed_users(session):
+    #zmiany wycofane - wpisy w pamięci nadal są aktualne
+    session.info.pop(_PENDING_KEY, None)
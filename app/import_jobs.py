@@ -0,0 +1,417 @@
+"""
+Kolejka importów CSV wykonywanych w tle oraz import wielu plików naraz.
+Plik z formularza jest zapisywany na dysk i dodawany jako zadanie (ImportJob),
+a proces roboczy (flask import-worker) pobiera zadania z tabeli i je wykonuje.
+Kilka procesów roboczych może działać równolegle - zadanie przejmuje tylko jeden z nich.
+Archiwa ZIP są rozpakowywane - każdy plik CSV z archiwum to osobne zadanie.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from werkzeug.utils import secure_filename
+from app import db
+from app.models import ImportJob, ImportedFile
+from app.csv_processor import CSVProcessor, file_digest
+
+
+class DuplicateImportError(ValueError):
+    """
+    Plik o identycznej zawartości był już zaimportowany
+    """
+
+    def __init__(self, imported):
+        self.imported = imported
+        super().__init__(
+            f"Plik {imported.filename} był już zaimportowany "
+            f"{imported.imported_at.strftime('%Y-%m-%d %H:%M')} - zaznacz wymuszenie, aby zaimportować ponownie"
+        )
+
+
+class ArchiveLimitError(ValueError):
+    """
+    Archiwum ZIP przekracza limit liczby plików CSV lub ich łącznego rozmiaru po rozpakowaniu
+    """
+
+
+def _spool_folder():
+    """
+    Katalog na pliki oczekujące na import
+    """
+    folder = os.path.join(current_app.config['UPLOAD_FOLDER'], 'imports')
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def enqueue_import(file, filename, user_id=None, batch_id=None, force=False):
+    """
+    Zapisuje plik na dysk i dodaje zadanie importu do kolejki.
+    Skrót zawartości jest liczony podczas zapisu - plik identyczny
+    z już zaimportowanym nie trafia do kolejki (chyba że force).
+
+    Args:
+        file: FileStorage z formularza lub plik otwarty w trybie binarnym
+        filename: oryginalna nazwa pliku
+        user_id: administrator dodający plik
+        batch_id: identyfikator paczki plików wysłanych razem
+        force: importuj ponownie nawet jeśli plik był już zaimportowany
+    Returns:
+        ImportJob
+    Raises:
+        ValueError: jeśli nie można rozpoznać platformy z nazwy pliku
+        DuplicateImportError: jeśli identyczny plik był już zaimportowany
+    """
+    # rozpoznanie platformy od razu - błędny plik nie trafia do kolejki
+    processor = CSVProcessor(file, filename)
+    platform = processor.platform
+
+    file_path = os.path.join(_spool_folder(), f"{uuid.uuid4().hex}_{secure_filename(filename)}")
+    digest = hashlib.sha256()
+    source = getattr(file, 'stream', file)
+    with open(file_path, 'wb') as out:
+        for block in iter(lambda: source.read(1024 * 1024), b''):
+            digest.update(block)
+            out.write(block)
+
+    imported = ImportedFile.find(digest.hexdigest(), platform, processor.report_date)
+    if imported is not None and not force:
+        os.remove(file_path)
+        raise DuplicateImportError(imported)
+
+    job = ImportJob(
+        filename=filename,
+        file_path=file_path,
+        platform=platform,
+        batch_id=batch_id,
+        force=force,
+        created_by=user_id
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def _is_zip(filename):
+    """
+    Czy plik jest archiwum ZIP (po rozszerzeniu)
+    """
+    return filename.lower().endswith('.zip')
+
+
+def _zip_csv_members(archive):
+    """
+    Pliki CSV z archiwum ZIP (bez katalogów i plików systemowych macOS)
+    """
+    for member in archive.infolist():
+        name = os.path.basename(member.filename)
+        if member.is_dir() or member.filename.startswith('__MACOSX/') or not name.lower().endswith('.csv'):
+            continue
+        yield member, name
+
+
+def check_archive(archive, name):
+    """
+    Sprawdza archiwum przed rozpakowaniem: liczba plików CSV (IMPORT_ZIP_MAX_FILES) i ich łączny rozmiar
+    po rozpakowaniu (IMPORT_ZIP_MAX_SIZE, bajty). MAX_CONTENT_LENGTH ogranicza tylko spakowany upload,
+    a małe archiwum może po rozpakowaniu zająć cały dysk.
+    Rozmiar pochodzi z katalogu archiwum (ZipInfo.file_size) - przy odczycie zipfile nie zwraca więcej danych.
+
+    Raises:
+        ArchiveLimitError: przekroczony limit
+    """
+    members = [member for member, _ in _zip_csv_members(archive)]
+    max_files = current_app.config.get('IMPORT_ZIP_MAX_FILES', 200)
+    max_size = current_app.config.get('IMPORT_ZIP_MAX_SIZE', 500 * 1024 * 1024)
+    if len(members) > max_files:
+        raise ArchiveLimitError(f"{name}: liczba plików CSV w archiwum {len(members)} (limit {max_files})")
+    size = sum(member.file_size for member in members)
+    if size > max_size:
+        raise ArchiveLimitError(
+            f"{name}: pliki CSV po rozpakowaniu zajmują {size // (1024 * 1024)} MB (limit {max_size // (1024 * 1024)} MB)"
+        )
+
+
+def enqueue_batch(files, user_id=None, force=False):
+    """
+    Dodaje do kolejki wiele plików naraz (z formularza), rozpakowując archiwa ZIP.
+    Błąd jednego pliku (np. nieznana platforma, duplikat) nie przerywa pozostałych.
+
+    Args:
+        files: lista FileStorage
+        user_id: administrator dodający pliki
+        force: importuj ponownie pliki, które już były zaimportowane
+    Returns:
+        tuple: (batch_id, lista ImportJob, lista komunikatów błędów)
+    Raises:
+        ArchiveLimitError: archiwum przekracza limity - cała paczka jest odrzucana przed rozpakowaniem
+    """
+    batch_id = uuid.uuid4().hex
+    jobs, errors = [], []
+
+    #limity archiwów sprawdzane przed zapisem czegokolwiek na dysk
+    for file in files:
+        if file and file.filename and _is_zip(file.filename):
+            try:
+                with zipfile.ZipFile(file.stream) as archive:
+                    check_archive(archive, file.filename)
+            except zipfile.BadZipFile:
+                pass
+            file.stream.seek(0)
+
+    for file in files:
+        if not file or not file.filename:
+            continue
+
+        try:
+            if _is_zip(file.filename):
+                with zipfile.ZipFile(file.stream) as archive:
+                    for member, name in _zip_csv_members(archive):
+                        try:
+                            with archive.open(member) as member_file:
+                                jobs.append(enqueue_import(member_file, name, user_id, batch_id, force))
+                        except ValueError as e:
+                            errors.append(str(e))
+            else:
+                jobs.append(enqueue_import(file, file.filename, user_id, batch_id, force))
+        except (ValueError, zipfile.BadZipFile) as e:
+            errors.append(f"{file.filename}: {e}")
+
+    return batch_id, jobs, errors
+
+
+def batch_summary(jobs):
+    """
+    Łączne podsumowanie paczki zadań
+
+    Returns:
+        dict: {'jobs': [...], 'totals': {'created', 'updated', 'unchanged', 'skipped'}, 'finished': bool}
+    """
+    return {
+        'jobs': [job.to_dict() for job in jobs],
+        'totals': {key: sum(getattr(job, key) for job in jobs) for key in ('created', 'updated', 'unchanged', 'skipped')},
+        'finished': all(job.is_finished for job in jobs)
+    }
+
+
+def _claimable():
+    """
+    Warunek zadania do przejęcia: oczekujące albo wykonywane bez znaku życia (heartbeat_at)
+    dłużej niż IMPORT_JOB_TIMEOUT - proces roboczy, który je przejął, przestał działać.
+    Proces roboczy odnawia heartbeat_at po każdym zapisanym fragmencie pliku,
+    więc długi, ale postępujący import nie jest przejmowany.
+    """
+    stale_before = datetime.utcnow() - timedelta(seconds=current_app.config.get('IMPORT_JOB_TIMEOUT', 3600))
+    return db.or_(
+        ImportJob.status == 'queued',
+        db.and_(ImportJob.status == 'running', ImportJob.heartbeat_at < stale_before)
+    )
+
+
+def claim_next_job():
+    """
+    Przejmuje najstarsze oczekujące zadanie albo zadanie porzucone przez proces roboczy
+    (status 'running' bez znaku życia dłużej niż IMPORT_JOB_TIMEOUT sekund).
+    Zmiana statusu jest warunkowa (ten sam warunek co przy wyborze), więc przy kilku procesach
+    roboczych to samo zadanie nie zostanie wykonane dwa razy.
+
+    Returns:
+        ImportJob lub None
+    """
+    while True:
+        job_id = db.session.execute(
+            db.select(ImportJob.id).where(_claimable()).order_by(ImportJob.id).limit(1)
+        ).scalar()
+        if job_id is None:
+            return None
+
+        now = datetime.utcnow()
+        claimed = db.session.execute(
+            db.update(ImportJob)
+            .where(ImportJob.id == job_id, _claimable())
+            .values(status='running', started_at=now, heartbeat_at=now, error=None)
+        ).rowcount
+        db.session.commit()
+
+        if claimed:
+            return db.session.get(ImportJob, job_id)
+
+
+def run_import_job(job):
+    """
+    Wykonuje import dla zadania i zapisuje jego wynik.
+    Postęp jest zapisywany po każdym fragmencie pliku (razem z zapisanymi wierszami i znakiem
+    życia heartbeat_at), więc strona z postępem widzi go na bieżąco, a inny proces roboczy nie przejmie zadania.
+
+    Przy błędzie zapisane już fragmenty zostają w bazie (zadanie ma status failed z komunikatem).
+    Upsert jest idempotentny, a plik trafia do ImportedFile dopiero po udanym imporcie,
+    więc ponowne wysłanie tego samego pliku dokończy import. Plik z kolejki jest usuwany
+    zawsze po zakończeniu zadania - zadanie przejęte ponownie po awarii procesu roboczego
+    wykonuje się od początku z pliku, który wtedy jeszcze jest na dysku.
+    """
+
+    def save_progress(progress):
+        job.rows_parsed = progress['rows_parsed']
+        job.rows_matched = progress['rows_matched']
+        job.rows_written = progress['rows_written']
+        job.heartbeat_at = datetime.utcnow()
+        db.session.commit()
+
+    try:
+        with open(job.file_path, 'rb') as file:
+            processor = CSVProcessor(
+                file,
+                job.filename,
+                chunksize=current_app.config.get('CSV_CHUNKSIZE'),
+                engine=current_app.config.get('CSV_PARSER_ENGINE', 'c')
+            )
+            result = processor.process(progress=save_progress, force=job.force)
+    except Exception as e:
+        db.session.rollback()
+        job.status = 'failed'
+        job.error = str(e)
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        return job
+    finally:
+        try:
+            os.remove(job.file_path)
+        except FileNotFoundError:
+            pass
+
+    job.created = result['created']
+    job.updated = result['updated']
+    job.unchanged = result['unchanged']
+    job.skipped = result['skipped']
+    job.status = 'duplicate' if result['duplicate'] else 'done'
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+    return job
+
+
+def run_worker(interval=2.0, once=False):
+    """
+    Pętla procesu roboczego: pobiera i wykonuje kolejne zadania.
+
+    Args:
+        interval: co ile sekund sprawdzać kolejkę, gdy jest pusta
+        once: wykonaj wszystkie oczekujące zadania i zakończ
+    Returns:
+        int: liczba wykonanych zadań
+    """
+    processed = 0
+    while True:
+        job = claim_next_job()
+        if job is not None:
+            run_import_job(job)
+            processed += 1
+            continue
+
+        if once:
+            return processed
+        time.sleep(interval)
+
+
+##########################
+###   IMPORT WIELU PLIKÓW Z DYSKU (flask import-dir)
+##########################
+
+def collect_csv_paths(paths, extract_dir):
+    """
+    Zbiera pliki CSV z podanych ścieżek: katalogów, plików CSV i archiwów ZIP.
+    Pliki z archiwów są rozpakowywane do extract_dir.
+
+    Returns:
+        list: pary (źródło, ścieżka do pliku CSV) - źródło to ścieżka pliku
+        lub "archiwum.zip/ścieżka w archiwum" (posortowane w obrębie katalogu)
+    Raises:
+        ArchiveLimitError: archiwum przekracza limity (sprawdzane przed rozpakowaniem)
+    """
+    csv_paths = []
+    for path in paths:
+        if os.path.isdir(path):
+            entries = sorted(os.path.join(path, name) for name in os.listdir(path))
+            csv_paths.extend(collect_csv_paths([e for e in entries if os.path.isfile(e)], extract_dir))
+        elif _is_zip(path):
+            with zipfile.ZipFile(path) as archive:
+                check_archive(archive, path)
+                for member, name in _zip_csv_members(archive):
+                    target_dir = tempfile.mkdtemp(dir=extract_dir)
+                    target = os.path.join(target_dir, name)
+                    with archive.open(member) as source, open(target, 'wb') as out:
+                        shutil.copyfileobj(source, out)
+                    csv_paths.append((f"{path}/{member.filename}", target))
+        elif path.lower().endswith('.csv'):
+            csv_paths.append((path, path))
+    return csv_paths
+
+
+def prepare_file(path, engine='c'):
+    """
+    Wczytuje i przelicza plik w procesie z puli (bez dostępu do bazy).
+
+    Returns:
+        DataFrame z CSVProcessor.prepare()
+    """
+    with open(path, 'rb') as file:
+        return CSVProcessor(file, os.path.basename(path), engine=engine).prepare()
+
+
+def import_files(paths, workers=None, force=False):
+    """
+    Importuje wiele plików: wczytywanie i obliczenia równolegle w puli procesów,
+    zapis każdego pliku w osobnej transakcji w bieżącym procesie - w kolejności plików
+    (przy kilku eksportach tych samych dni wygrywa późniejszy plik, jak przy imporcie po kolei).
+    Pliki już zaimportowane (ten sam skrót) nie są nawet wczytywane, chyba że force.
+
+    Args:
+        paths: katalogi, pliki CSV lub archiwa ZIP
+        workers: liczba procesów w puli (domyślnie liczba rdzeni)
+        force: importuj ponownie pliki, które już były zaimportowane
+    Returns:
+        dict: {źródło pliku (ścieżka, dla plików z archiwum "archiwum.zip/ścieżka w archiwum"):
+               wynik jak z CSVProcessor.process lub {'error': komunikat}} w kolejności importu
+    """
+    engine = current_app.config.get('CSV_PARSER_ENGINE', 'c')
+    results = {}
+
+    with tempfile.TemporaryDirectory() as extract_dir:
+        csv_paths = collect_csv_paths(paths, extract_dir)
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = []
+            for source, path in csv_paths:
+                try:
+                    processor = CSVProcessor(None, os.path.basename(path))
+                    with open(path, 'rb') as file:
+                        digest = file_digest(file)
+                except ValueError as e:
+                    results[source] = {'error': str(e)}
+                    continue
+
+                if not force and ImportedFile.find(digest, processor.platform, processor.report_date) is not None:
+                    results[source] = {
+                        'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0,
+                        'platform': processor.platform, 'duplicate': True
+                    }
+                    continue
+
+                results[source] = None
+                futures.append((source, processor, digest, pool.submit(prepare_file, path, engine)))
+
+            #wczytywanie równolegle, zapis w kolejności plików
+            for source, processor, digest, future in futures:
+                try:
+                    prepared = future.result()
+                    results[source] = processor.process(prepared=prepared, force=force, digest=digest)
+                except Exception as e:
+                    db.session.rollback()
+                    results[source] = {'error': str(e)}
+
+    return results
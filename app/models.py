@@ -1,8 +1,8 @@
-from app import db
+from app import db, security
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import event
 from decimal import Decimal
-from datetime import datetime
+from datetime import date, datetime, timedelta
 
 ##########################
 ###   MODEL UŻYTKOWNIKA
@@ -15,39 +15,138 @@ class User(UserMixin, db.Model):
     - username: login do systemu
     - password_hash: hasło (hashowane)
     - role: rola użytkownika (admin lub driver)
-    - uber_id: identyfikator kierowcy Uber
-    - bolt_id: identyfikator kierowcy Bolt
+    - uber_id: identyfikator bieżącego konta kierowcy Uber
+    - bolt_id: identyfikator bieżącego konta kierowcy Bolt
+      (wszystkie konta kierowcy, także poprzednie: DriverPlatformAccount - uzupełniane przy zapisie)
+    - bank_account: numer rachunku do wypłat (eksport przelewów)
     """
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), index=True, unique=True, nullable=False)
     password_hash = db.Column(db.String(128))
     role = db.Column(db.String(20), nullable=False, default='driver')
-    uber_id = db.Column(db.String(128), nullable=True)
-    bolt_id = db.Column(db.String(128), nullable=True)
+    uber_id = db.Column(db.String(128), nullable=True, index=True)
+    bolt_id = db.Column(db.String(128), nullable=True, index=True)
+    bank_account = db.Column(db.String(34), nullable=True) #IBAN, maks. 34 znaki
 
     #relacja: jeden użytkownik może mieć wiele wpisów w tabeli BoltEarnings
     bolt_earnings = db.relationship("BoltEarnings", backref="user", lazy=True)
     uber_earnings = db.relationship("UberEarnings", backref="user", lazy=True)
     expenses = db.relationship("Expense", backref="user", lazy=True)
 
-    #metody do obsługi haseł
+    #metody do obsługi haseł (polityka hashowania: app/security.py)
     def set_password(self, password):
         """
         Ustawia hash hasła dla użytkownika.
         """
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = security.policy().hash(password)
 
     def check_password(self, password):
         """
         Sprawdza poprawność podanego hasła.
         """
-        return check_password_hash(self.password_hash, password)
+        return security.policy().verify(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        """
+        Hash hasła zapisany według innej metody niż bieżąca polityka (przeliczany przy logowaniu).
+        """
+        return security.policy().needs_rehash(self.password_hash)
     
     def __repr__(self):
         return f'<User {self.username} ({self.role})>'
 
 
 
+##########################
+###   MODEL KONT KIEROWCY NA PLATFORMACH
+##########################
+
+class DriverPlatformAccount(db.Model):
+    """
+    Konto kierowcy na platformie - kierowca może mieć kilka kont na tej samej platformie
+    (np. po zmianie konta Bolt), a każde konto należy do jednego kierowcy.
+    Import CSV dopasowuje wiersze do kierowców po (platform, external_id) - także po poprzednich kontach.
+    Pola:
+    - platform: bolt lub uber
+    - external_id: identyfikator kierowcy na platformie
+    - user_id: powiązanie z użytkownikiem (User)
+    - valid_from: od kiedy konto jest używane
+    - valid_to: do kiedy konto było używane (puste = konto bieżące, to samo co User.bolt_id / uber_id)
+    """
+
+    PLATFORMS = ('bolt', 'uber')
+
+    id = db.Column(db.Integer, primary_key=True)
+    platform = db.Column(db.String(20), nullable=False)
+    external_id = db.Column(db.String(128), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    valid_from = db.Column(db.Date, nullable=False, default=date.today)
+    valid_to = db.Column(db.Date, nullable=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('platform', 'external_id', name='uq_driver_platform_account_platform_external_id'),
+        db.Index('ix_driver_platform_account_user_id', 'user_id'),
+    )
+
+    @staticmethod
+    def sync(connection, user_id, platform, external_id, day=None):
+        """
+        Ustawia bieżące konto kierowcy na platformie: poprzednie bieżące konto dostaje datę końca,
+        a podane konto jest dodawane (lub ponownie otwierane). Puste external_id zamyka bieżące konto.
+
+        Args:
+            connection: połączenie z bazą (także wewnątrz flush - zdarzenia modelu User)
+            user_id: id kierowcy
+            platform: bolt lub uber
+            external_id: identyfikator konta na platformie
+            day: data zmiany (domyślnie dziś)
+        Raises:
+            IntegrityError: konto należy już do innego kierowcy
+        """
+        table = DriverPlatformAccount.__table__
+        day = day or date.today()
+        external_id = (external_id or '').strip()
+
+        connection.execute(
+            table.update()
+            .where(table.c.user_id == user_id, table.c.platform == platform,
+                   table.c.external_id != external_id, table.c.valid_to.is_(None))
+            .values(valid_to=day)
+        )
+        if not external_id:
+            return
+
+        owner = connection.execute(
+            db.select(table.c.user_id).where(table.c.platform == platform, table.c.external_id == external_id)
+        ).scalar()
+        if owner == user_id:
+            connection.execute(
+                table.update()
+                .where(table.c.platform == platform, table.c.external_id == external_id)
+                .values(valid_to=None)
+            )
+        else:
+            #nowe konto (jeśli należy do innego kierowcy - naruszenie unikalności (platform, external_id))
+            connection.execute(
+                table.insert().values(platform=platform, external_id=external_id, user_id=user_id, valid_from=day)
+            )
+
+    def __repr__(self):
+        return f"<DriverPlatformAccount {self.platform}:{self.external_id} user_id={self.user_id}>"
+
+
+@event.listens_for(User, 'after_insert')
+@event.listens_for(User, 'after_update')
+def _sync_platform_accounts(mapper, connection, target):
+    #zapis User.bolt_id / uber_id przez ORM aktualizuje konta kierowcy
+    state = db.inspect(target)
+    for platform in DriverPlatformAccount.PLATFORMS:
+        field = f'{platform}_id'
+        if state.attrs[field].history.has_changes():
+            DriverPlatformAccount.sync(connection, target.id, platform, getattr(target, field))
+
+
+
 ##########################
 ###   MODEL ZAROBKÓW BOLT
 ##########################
@@ -65,6 +164,7 @@ class BoltEarnings(db.Model):
     - cash_collected: pobrana gotówka
     - vat_due: należny vat (wyliczany według wzoru)
     - actual_income: faktyczny zarobek - net_income - vat_due
+    - source_hash: odcisk wartości z pliku CSV (wykrywanie zmian przy ponownym imporcie)
     """
     id = db.Column(db.Integer, primary_key=True)
 
@@ -83,6 +183,17 @@ class BoltEarnings(db.Model):
     vat_due = db.Column(db.Numeric(10, 2), nullable=False, default=0) #należny vat
     actual_income = db.Column(db.Numeric(10, 2), nullable=False, default=0) #rzeczywisty zarobek
 
+    #odcisk wartości z CSV - ponowny import bez zmian nie wykonuje UPDATE
+    source_hash = db.Column(db.String(16), nullable=True)
+
+    #jeden wpis na kierowcę i dzień - wymagane przez upsert w CSVProcessor
+    #unikalny indeks (user_id, report_date) obsługuje też zapytania o zakres dat kierowcy,
+    #a indeks po samej dacie - pobieranie istniejących wpisów przy imporcie pliku z danego dnia
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'report_date', name='uq_bolt_earnings_user_date'),
+        db.Index('ix_bolt_earnings_report_date', 'report_date'),
+    )
+
     def __repr__(self):
         return f"<Bolt Earnings {self.user_id} {self.report_date}>"
     
@@ -104,6 +215,7 @@ class UberEarnings(db.Model):
     - cash_collected: pobrana gotówka
     - vat_due: należny vat (wyliczany według wzoru)
     - actual_income: faktyczny zarobek - net_income - vat_due
+    - source_hash: odcisk wartości z pliku CSV (wykrywanie zmian przy ponownym imporcie)
     """
     id = db.Column(db.Integer, primary_key=True)
 
@@ -122,6 +234,17 @@ class UberEarnings(db.Model):
     vat_due = db.Column(db.Numeric(10, 2), nullable=False, default=0) #należny vat
     actual_income = db.Column(db.Numeric(10, 2), nullable=False, default=0) #rzeczywisty zarobek
 
+    #odcisk wartości z CSV - ponowny import bez zmian nie wykonuje UPDATE
+    source_hash = db.Column(db.String(16), nullable=True)
+
+    #jeden wpis na kierowcę i dzień - wymagane przez upsert w CSVProcessor
+    #unikalny indeks (user_id, report_date) obsługuje też zapytania o zakres dat kierowcy,
+    #a indeks po samej dacie - pobieranie istniejących wpisów przy imporcie pliku z danego dnia
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'report_date', name='uq_uber_earnings_user_date'),
+        db.Index('ix_uber_earnings_report_date', 'report_date'),
+    )
+
     def __repr__(self):
         return f"<Uber Earnings {self.user_id} {self.report_date}>"
     
@@ -167,6 +290,11 @@ class Expense(db.Model):
     #metadata
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
+    #faktury kierowcy z zakresu dat
+    __table_args__ = (
+        db.Index('ix_expense_user_issue_date', 'user_id', 'issue_date'),
+    )
+
     def __repr__(self):
         return f"<Wydatek {self.document_number} user_id={self.user_id} vat_deductible={self.vat_deductible}>"
     
@@ -214,6 +342,9 @@ class WeeklyReport(db.Model):
 
     Podsumowanie:
     - final_amount: końcowa kwota do wypłaty
+
+    - is_stale: raport nieaktualny - po wygenerowaniu zmieniły się wpisy z jego zakresu
+      albo VAT przeniesiony z poprzedniego raportu (przeliczenie: flask recompute-reports)
     """
 
     id = db.Column(db.Integer, primary_key=True)
@@ -252,6 +383,15 @@ class WeeklyReport(db.Model):
     # końcowa kwota
     final_amount = db.Column(db.Numeric(10, 2), nullable=False, default=0)
 
+    #raport do przeliczenia
+    is_stale = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+
+    #raporty kierowcy po dacie końcowej (ostatni raport, przeniesienie VAT)
+    __table_args__ = (
+        db.Index('ix_weekly_report_user_date_to', 'user_id', 'date_to'),
+        db.Index('ix_weekly_report_is_stale', 'is_stale'),
+    )
+
     def __repr__(self):
         return f"<WeeklyReport {self.report_name} user_id{self.user_id} final={self.final_amount}>"
     
@@ -270,15 +410,337 @@ class WeeklyReport(db.Model):
         return self.total_actual - self.total_cash
     
     @classmethod
-    def get_last_vat_carryover(cls, user_id):
+    def get_last_vat_carryovers(cls, user_ids, before=None):
+        """
+        Pobiera VAT do przeniesienia z ostatniego raportu wielu kierowców jednym zapytaniem:
+        ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY date_to DESC) po indeksie (user_id, date_to)
+
+        Args:
+            user_ids: id kierowców
+            before: tylko raporty kończące się przed tą datą (np. poprzedni raport przy generowaniu kolejnego)
+        Returns:
+            dict: {user_id: Decimal} dla każdego z podanych kierowców - kwota ujemna lub 0
+        """
+        user_ids = list(user_ids)
+        carryovers = dict.fromkeys(user_ids, Decimal('0'))
+        if not user_ids:
+            return carryovers
+
+        position = db.func.row_number().over(
+            partition_by=cls.user_id, order_by=(cls.date_to.desc(), cls.id.desc())
+        ).label('position')
+        ranked = db.select(cls.user_id, cls.vat_carryover, position).where(cls.user_id.in_(user_ids))
+        if before is not None:
+            ranked = ranked.where(cls.date_to < before)
+        ranked = ranked.subquery()
+
+        query = db.select(ranked.c.user_id, ranked.c.vat_carryover).where(ranked.c.position == 1)
+        for user_id, carryover in db.session.execute(query):
+            carryovers[user_id] = min(carryover, Decimal('0'))
+        return carryovers
+
+    @classmethod
+    def mark_stale(cls, cells):
+        """
+        Oznacza jako nieaktualne raporty kierowców obejmujące podane dni - jednym UPDATE (executemany),
+        bez commit (w transakcji zmiany wpisów)
+
+        Args:
+            cells: lista par (user_id, day)
+        """
+        if not cells:
+            return
+        table = cls.__table__
+        db.session.execute(
+            db.update(table)
+            .where(
+                table.c.user_id == db.bindparam('stale_user_id'),
+                table.c.date_from <= db.bindparam('stale_day'),
+                table.c.date_to >= db.bindparam('stale_day'),
+                table.c.is_stale == db.false()
+            )
+            .values(is_stale=True),
+            [{'stale_user_id': user_id, 'stale_day': day} for user_id, day in cells]
+        )
+
+    @classmethod
+    def get_last_vat_carryover(cls, user_id, before=None):
         """
         Pobiera VAT do przeniesienia z ostatniego raportu kierowcy
 
         Returns:
             Decimal: kwota VAT do przeniesienia (ujemna lub 0)
         """
-        last_report = cls.query.filter_by(user_id=user_id).order_by(cls.date_to.desc()).first()
+        return cls.get_last_vat_carryovers([user_id], before)[user_id]
+
+
+##########################
+###   MODEL ZESTAWIEŃ DZIENNYCH
+##########################
+
+class DriverDailyRollup(db.Model):
+    """
+    Dzienne zestawienie kierowcy - sumy z BoltEarnings, UberEarnings i Expense dla jednego dnia.
+    Aktualizowane przy imporcie CSV i dodaniu faktury (tylko zmienione dni kierowców),
+    odbudowywane w całości przez flask rebuild-rollups. Widoki sum czytają z tej tabeli
+    zamiast z surowych wpisów.
+
+    Pola:
+    - user_id, day: kierowca i dzień (jeden wiersz na kierowcę i dzień)
+    - bolt_gross, bolt_cash, bolt_vat, bolt_actual: Bolt - zarobek (netto), gotówka, VAT, faktyczny zarobek
+    - uber_gross, uber_cash, uber_vat, uber_actual: Uber - zarobek (ogółem), gotówka, VAT, faktyczny zarobek
+    - expenses_net, expenses_vat, expenses_vat_deductible, expenses_deductible: faktury kosztowe z tego dnia
+    - cum_*: sumy narastające powyższych kolumn - suma z dowolnego zakresu dat to różnica dwóch wierszy
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+
+    #Bolt
+    bolt_gross = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    bolt_cash = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    bolt_vat = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    bolt_actual = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+
+    #Uber
+    uber_gross = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    uber_cash = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    uber_vat = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    uber_actual = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+
+    #faktury kosztowe
+    expenses_net = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    expenses_vat = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    expenses_vat_deductible = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    expenses_deductible = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+
+    #sumy narastające (od pierwszego dnia kierowcy do tego dnia włącznie)
+    #suma z zakresu A..B = cum(ostatni dzień <= B) - cum(ostatni dzień < A)
+    cum_bolt_gross = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    cum_bolt_cash = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    cum_bolt_vat = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    cum_bolt_actual = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    cum_uber_gross = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    cum_uber_cash = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    cum_uber_vat = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    cum_uber_actual = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    cum_expenses_net = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    cum_expenses_vat = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    cum_expenses_vat_deductible = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    cum_expenses_deductible = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'day', name='uq_driver_daily_rollup_user_day'),
+    )
+
+    def __repr__(self):
+        return f"<DriverDailyRollup {self.user_id} {self.day}>"
+
+
+##########################
+###   MODEL ZESTAWIEŃ MIESIĘCZNYCH I ROCZNYCH
+##########################
+
+class DriverPeriodRollup(db.Model):
+    """
+    Zestawienie kierowcy za miesiąc lub rok - sumy z dziennych zestawień (DriverDailyRollup) okresu.
+    Aktualizowane razem z zestawieniami dziennymi (tylko okresy ze zmienionymi dniami),
+    odbudowywane przez flask rebuild-rollups. Wykresy wieloletnie i miesięczne zestawienia VAT
+    czytają z tej tabeli zamiast z setek dziennych wierszy.
+
+    Pola:
+    - user_id: kierowca
+    - period: 'month' lub 'year'
+    - period_start: pierwszy dzień miesiąca / roku
+    - bolt_*, uber_*, expenses_*: sumy jak w DriverDailyRollup
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    period = db.Column(db.String(5), nullable=False)
+    period_start = db.Column(db.Date, nullable=False)
+
+    #Bolt
+    bolt_gross = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    bolt_cash = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    bolt_vat = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    bolt_actual = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+
+    #Uber
+    uber_gross = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    uber_cash = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    uber_vat = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    uber_actual = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+
+    #faktury kosztowe
+    expenses_net = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    expenses_vat = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    expenses_vat_deductible = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    expenses_deductible = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'period', 'period_start', name='uq_driver_period_rollup_user_period_start'),
+        #zestawienie VAT wszystkich kierowców za miesiące roku
+        db.Index('ix_driver_period_rollup_period_start', 'period', 'period_start'),
+    )
+
+    @staticmethod
+    def start_of(day, period):
+        """
+        Pierwszy dzień miesiąca ('month') lub roku ('year'), do którego należy dzień
+        """
+        if period == 'year':
+            return day.replace(month=1, day=1)
+        return day.replace(day=1)
+
+    @staticmethod
+    def end_of(start, period):
+        """
+        Ostatni dzień okresu zaczynającego się w start
+        """
+        if period == 'year':
+            return start.replace(month=12, day=31)
+        next_month = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+        return next_month - timedelta(days=1)
+
+    def __repr__(self):
+        return f"<DriverPeriodRollup {self.user_id} {self.period} {self.period_start}>"
+
+
+##########################
+###   MODEL ZADAŃ IMPORTU CSV
+##########################
+
+class ImportJob(db.Model):
+    """
+    Zadanie importu pliku CSV wykonywane w tle przez proces roboczy (flask import-worker)
+
+    Pola:
+    - filename: oryginalna nazwa pliku (na jej podstawie rozpoznawana jest platforma)
+    - file_path: ścieżka do pliku zapisanego na dysku
+    - platform: bolt lub uber
+    - status: queued, running, done, failed lub duplicate (plik już zaimportowany)
+    - force: import mimo że identyczny plik był już zaimportowany
+    - rows_parsed: liczba wczytanych wierszy
+    - rows_matched: liczba wierszy z rozpoznanym kierowcą
+    - rows_written: liczba zapisanych rekordów
+    - created, updated, unchanged, skipped: wynik importu (jak z CSVProcessor.process)
+    - error: komunikat błędu (dla statusu failed)
+    - heartbeat_at: ostatni znak życia procesu roboczego (przejęcie zadania i każdy zapisany fragment)
+    - created_by: administrator, który dodał plik
+    - batch_id: identyfikator paczki plików wysłanych razem (wiele plików / ZIP)
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    #plik
+    filename = db.Column(db.String(256), nullable=False)
+    file_path = db.Column(db.String(512), nullable=False)
+    platform = db.Column(db.String(20), nullable=False)
+    batch_id = db.Column(db.String(32), nullable=True, index=True)
+
+    #stan zadania
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)
+    error = db.Column(db.Text, nullable=True)
+    force = db.Column(db.Boolean, nullable=False, default=False)
+
+    #postęp
+    rows_parsed = db.Column(db.Integer, nullable=False, default=0)
+    rows_matched = db.Column(db.Integer, nullable=False, default=0)
+    rows_written = db.Column(db.Integer, nullable=False, default=0)
+
+    #wynik
+    created = db.Column(db.Integer, nullable=False, default=0)
+    updated = db.Column(db.Integer, nullable=False, default=0)
+    unchanged = db.Column(db.Integer, nullable=False, default=0)
+    skipped = db.Column(db.Integer, nullable=False, default=0)
+
+    #metadata
+    created_by = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<ImportJob {self.id} {self.filename} {self.status}>"
+
+    @property
+    def is_finished(self):
+        """
+        Czy zadanie zostało zakończone (sukcesem, błędem lub jako duplikat)
+        """
+        return self.status in ('done', 'failed', 'duplicate')
+
+    def to_dict(self):
+        """
+        Stan zadania do endpointu z postępem (JSON)
+        """
+        return {
+            'id': self.id,
+            'filename': self.filename,
+            'platform': self.platform,
+            'status': self.status,
+            'error': self.error,
+            'rows_parsed': self.rows_parsed,
+            'rows_matched': self.rows_matched,
+            'rows_written': self.rows_written,
+            'created': self.created,
+            'updated': self.updated,
+            'unchanged': self.unchanged,
+            'skipped': self.skipped,
+            'finished': self.is_finished
+        }
+
+
+
+##########################
+###   MODEL REJESTRU ZAIMPORTOWANYCH PLIKÓW
+##########################
+
+class ImportedFile(db.Model):
+    """
+    Rejestr zaimportowanych plików CSV - pozwala rozpoznać ponowny upload tego samego pliku.
+    Plik jest ten sam, gdy zgadza się skrót zawartości, platforma i data raportu - data pochodzi
+    z nazwy pliku, więc ta sama zawartość pod nazwą z inną datą to osobny import.
+
+    Pola:
+    - sha256: skrót zawartości pliku (liczony strumieniowo)
+    - filename: nazwa pliku
+    - platform: bolt lub uber
+    - report_date: data raportu
+    - created, updated, unchanged, skipped: wynik ostatniego importu
+    - imported_at: kiedy plik został (ostatnio) zaimportowany
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+    sha256 = db.Column(db.String(64), nullable=False, index=True)
+    filename = db.Column(db.String(256), nullable=False)
+    platform = db.Column(db.String(20), nullable=False)
+    report_date = db.Column(db.Date, nullable=False)
+
+    #wynik importu
+    created = db.Column(db.Integer, nullable=False, default=0)
+    updated = db.Column(db.Integer, nullable=False, default=0)
+    unchanged = db.Column(db.Integer, nullable=False, default=0)
+    skipped = db.Column(db.Integer, nullable=False, default=0)
+
+    imported_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('sha256', 'platform', 'report_date', name='uq_imported_file_sha256_platform_report_date'),
+    )
+
+    def __repr__(self):
+        return f"<ImportedFile {self.filename} {self.sha256[:12]}>"
+
+    @classmethod
+    def find(cls, sha256, platform, report_date):
+        """
+        Wpis rejestru dla pliku o tej zawartości, platformie i dacie raportu
 
-        if last_report and last_report.vat_carryover < 0:
-            return float(last_report.vat_carryover)
-        return 0.0
\ No newline at end of file
+        Returns:
+            ImportedFile lub None, jeśli taki plik nie był zaimportowany
+        """
+        return cls.query.filter_by(sha256=sha256, platform=platform, report_date=report_date).first()
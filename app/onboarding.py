@@ -0,0 +1,179 @@
+"""
+Zakładanie kont wielu kierowców naraz z pliku CSV (np. przejęcie floty partnera).
+Kolumny: username, password (hasło początkowe), bolt_id, uber_id - separator ',' lub ';', pierwszy wiersz to nagłówek.
+
+Hasła są hashowane równolegle w puli procesów (hashowanie scrypt to prawie cały koszt zakładania konta),
+istniejące nazwy użytkowników są sprawdzane jednym zapytaniem, a nowe konta (i ich konta na platformach)
+zapisywane wstawieniem paczkowym.
+Liczba procesów domyślnie równa się limitowi jednoczesnych hashowań (PASSWORD_HASH_CONCURRENCY),
+więc szczyt pamięci jest taki sam jak przy logowaniu.
+"""
+
+import csv
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+from app import db, security
+from app.models import User, DriverPlatformAccount
+
+REQUIRED_COLUMNS = ('username', 'password')
+OPTIONAL_COLUMNS = ('bolt_id', 'uber_id')
+
+#ograniczenia jak w formularzu dodawania kierowcy (AddDriverForm)
+USERNAME_LENGTH = (4, 64)
+PASSWORD_MIN_LENGTH = 6
+
+
+def read_drivers(file):
+    """
+    Wczytuje i sprawdza wiersze pliku CSV z kierowcami
+
+    Args:
+        file: plik otwarty w trybie binarnym (lub FileStorage z formularza)
+    Returns:
+        tuple: (lista słowników {'username', 'password', 'bolt_id', 'uber_id'}, lista błędów)
+    Raises:
+        ValueError: brak wymaganych kolumn w nagłówku
+    """
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    header = text.readline()
+    delimiter = ';' if ';' in header else ','
+    fieldnames = [name.strip().lower() for name in next(csv.reader([header], delimiter=delimiter), [])]
+    reader = csv.DictReader(text, fieldnames=fieldnames, delimiter=delimiter)
+    missing = [column for column in REQUIRED_COLUMNS if column not in reader.fieldnames]
+    if missing:
+        raise ValueError(f"Brak kolumn w pliku: {', '.join(missing)}")
+
+    drivers, errors, seen = [], [], set()
+    for line, row in enumerate(reader, start=2):
+        username = (row.get('username') or '').strip()
+        password = row.get('password') or ''
+        if not username and not password:
+            continue
+        if not USERNAME_LENGTH[0] <= len(username) <= USERNAME_LENGTH[1]:
+            errors.append(f"Wiersz {line}: nazwa użytkownika musi mieć od {USERNAME_LENGTH[0]} do {USERNAME_LENGTH[1]} znaków")
+            continue
+        if len(password) < PASSWORD_MIN_LENGTH:
+            errors.append(f"Wiersz {line}: hasło użytkownika {username} musi mieć co najmniej {PASSWORD_MIN_LENGTH} znaków")
+            continue
+        if username in seen:
+            errors.append(f"Wiersz {line}: użytkownik {username} powtarza się w pliku")
+            continue
+        seen.add(username)
+        drivers.append({
+            'username': username,
+            'password': password,
+            **{column: (row.get(column) or '').strip() or None for column in OPTIONAL_COLUMNS},
+        })
+    return drivers, errors
+
+
+def hash_passwords(passwords, method, workers=None):
+    """
+    Hashuje hasła równolegle w puli procesów
+
+    Args:
+        passwords: lista haseł
+        method: metoda hashowania (PASSWORD_HASH_METHOD)
+        workers: liczba procesów (domyślnie limit jednoczesnych hashowań polityki haseł, najwyżej liczba rdzeni)
+    Returns:
+        list: hashe w kolejności haseł
+    """
+    if not passwords:
+        return []
+    workers = workers or min(security.policy().concurrency or os.cpu_count() or 1, os.cpu_count() or 1)
+    if workers == 1:
+        return [generate_password_hash(password, method) for password in passwords]
+    with ProcessPoolExecutor(max_workers=min(workers, len(passwords))) as pool:
+        return list(pool.map(generate_password_hash, passwords, [method] * len(passwords), chunksize=8))
+
+
+def _platform_id_conflicts(drivers):
+    """
+    Sprawdza identyfikatory Bolt / Uber nowych kierowców: zajęte przez konta na platformach
+    (jedno zapytanie do DriverPlatformAccount) albo powtórzone w pliku
+
+    Returns:
+        tuple: (kierowcy bez konfliktów, lista błędów)
+    """
+    ids = {
+        platform: {driver[f'{platform}_id'] for driver in drivers if driver[f'{platform}_id']}
+        for platform in DriverPlatformAccount.PLATFORMS
+    }
+    conditions = [
+        db.and_(DriverPlatformAccount.platform == platform, DriverPlatformAccount.external_id.in_(external_ids))
+        for platform, external_ids in ids.items() if external_ids
+    ]
+    taken = set()
+    if conditions:
+        taken = set(db.session.execute(
+            db.select(DriverPlatformAccount.platform, DriverPlatformAccount.external_id).where(db.or_(*conditions))
+        ).tuples())
+
+    valid, errors, seen = [], [], set()
+    for driver in drivers:
+        accounts = [
+            (platform, driver[f'{platform}_id'])
+            for platform in DriverPlatformAccount.PLATFORMS if driver[f'{platform}_id']
+        ]
+        conflict = next((account for account in accounts if account in taken), None)
+        repeated = next((account for account in accounts if account in seen), None)
+        if conflict:
+            errors.append(f"Użytkownik {driver['username']}: identyfikator {conflict[0]} {conflict[1]} należy już do innego kierowcy")
+        elif repeated:
+            errors.append(f"Użytkownik {driver['username']}: identyfikator {repeated[0]} {repeated[1]} powtarza się w pliku")
+        else:
+            seen.update(accounts)
+            valid.append(driver)
+    return valid, errors
+
+
+def import_drivers(drivers, workers=None):
+    """
+    Zakłada konta kierowców, których nazwy użytkownika jeszcze nie istnieją. Zapis z commit.
+    Kierowcy z identyfikatorem Bolt / Uber należącym do innego kierowcy lub powtórzonym w pliku
+    są pomijani z opisem błędu.
+
+    Args:
+        drivers: wiersze z read_drivers
+        workers: liczba procesów hashujących hasła
+    Returns:
+        dict: {'created': liczba nowych kont, 'existing': lista pominiętych istniejących nazw,
+               'errors': lista błędów pominiętych kierowców}
+    """
+    usernames = [driver['username'] for driver in drivers]
+    existing = set(db.session.execute(db.select(User.username).where(User.username.in_(usernames))).scalars())
+    new, errors = _platform_id_conflicts([driver for driver in drivers if driver['username'] not in existing])
+
+    hashes = hash_passwords([driver['password'] for driver in new], security.policy().method, workers)
+    if new:
+        user_ids = db.session.execute(insert(User).returning(User.id, sort_by_parameter_order=True), [
+            {
+                'username': driver['username'],
+                'password_hash': pwhash,
+                'role': 'driver',
+                'bolt_id': driver['bolt_id'],
+                'uber_id': driver['uber_id'],
+            }
+            for driver, pwhash in zip(new, hashes)
+        ]).scalars().all()
+
+        #konta na platformach (wstawienie paczkowe pomija zdarzenia modelu User)
+        accounts = [
+            {'platform': platform, 'external_id': driver[f'{platform}_id'], 'user_id': user_id, 'valid_from': date.today()}
+            for driver, user_id in zip(new, user_ids)
+            for platform in DriverPlatformAccount.PLATFORMS
+            if driver[f'{platform}_id']
+        ]
+        if accounts:
+            db.session.execute(insert(DriverPlatformAccount), accounts)
+        db.session.commit()
+
+    return {
+        'created': len(new),
+        'existing': [username for username in usernames if username in existing],
+        'errors': errors,
+    }
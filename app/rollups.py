@@ -0,0 +1,266 @@
+"""
+Dzienne zestawienia kierowców (DriverDailyRollup).
+Wiersz zestawienia jest zawsze przeliczany w całości z surowych wpisów danego dnia
+(BoltEarnings, UberEarnings, Expense), więc odświeżenie jest idempotentne.
+Odświeżane są tylko dni kierowców, których dotyczy zmiana - w tej samej transakcji co zmiana.
+
+Każdy wiersz ma też sumy narastające (cum_*). Zmiana dnia z przeszłości (np. spóźniony import)
+przesuwa sumy narastające późniejszych dni kierowcy o różnicę - jednym UPDATE na kierowcę.
+
+Zestawienia miesięczne i roczne (DriverPeriodRollup) są sumami zestawień dziennych okresu
+i są przeliczane razem z nimi - tylko okresy, w których zmienił się któryś dzień kierowcy.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+from sqlalchemy import func, literal, union_all, insert, update, delete, bindparam
+from sqlalchemy.orm import aliased
+from app import db
+from app.models import DriverDailyRollup, DriverPeriodRollup, WeeklyReport
+from app.earnings import TOTAL_COLUMNS, DATE_COLUMNS, TIMELINE_PREFIXES, TIMELINE_KEYS
+
+
+#kolumna sumy narastającej dla każdej kolumny zestawienia
+CUM_KEYS = {key: f"cum_{key}" for key in TIMELINE_KEYS}
+
+#okresy zestawień od najdrobniejszego - rok jest sumą miesięcy, miesiąc sumą dni
+PERIODS = ('month', 'year')
+
+
+def _daily_sums(user_ids=None, day=None):
+    """
+    Zapytanie z sumami surowych wpisów pogrupowanymi po (kierowca, dzień):
+    UNION ALL trzech tabel (brakujące kolumny = 0) i GROUP BY.
+
+    Args:
+        user_ids: tylko podani kierowcy (None = wszyscy)
+        day: tylko podany dzień (None = wszystkie)
+    Returns:
+        Select z kolumnami user_id, day i TIMELINE_KEYS
+    """
+    parts = []
+    for Model, columns in TOTAL_COLUMNS.items():
+        date_column = DATE_COLUMNS[Model]
+        own = {f"{TIMELINE_PREFIXES[Model]}_{key}": column for key, column in columns.items()}
+        query = db.select(
+            Model.user_id.label('user_id'),
+            date_column.label('day'),
+            *[own[key].label(key) if key in own else literal(0, db.Numeric(10, 2)).label(key) for key in TIMELINE_KEYS]
+        )
+        if user_ids is not None:
+            query = query.where(Model.user_id.in_(user_ids))
+        if day is not None:
+            query = query.where(date_column == day)
+        parts.append(query)
+
+    rows = union_all(*parts).subquery()
+    sums = [func.sum(rows.c[key]).label(key) for key in TIMELINE_KEYS]
+    return db.select(rows.c.user_id, rows.c.day, *sums).group_by(rows.c.user_id, rows.c.day)
+
+
+def _cumulative_before(user_ids, day):
+    """
+    Sumy narastające z ostatniego dnia przed podanym dniem - dla wielu kierowców jednym zapytaniem
+    (MAX(day) po indeksie (user_id, day) dla każdego kierowcy)
+
+    Returns:
+        dict: {user_id: {klucz: Decimal}} - kierowcy bez wcześniejszych dni nie występują
+    """
+    earlier = aliased(DriverDailyRollup)
+    last_day = (
+        db.select(func.max(earlier.day))
+        .where(earlier.user_id == DriverDailyRollup.user_id, earlier.day < day)
+        .scalar_subquery()
+    )
+    query = db.select(DriverDailyRollup.user_id, *[getattr(DriverDailyRollup, cum) for cum in CUM_KEYS.values()]).where(
+        DriverDailyRollup.user_id.in_(user_ids), DriverDailyRollup.day == last_day
+    )
+    return {row.user_id: {key: getattr(row, cum) for key, cum in CUM_KEYS.items()} for row in db.session.execute(query)}
+
+
+def _refresh_day(day, user_ids):
+    """
+    Przelicza zestawienia jednego dnia dla podanych kierowców i przesuwa sumy narastające późniejszych dni
+
+    Returns:
+        list: id kierowców, których zestawienie dnia się zmieniło
+    """
+    zero = {key: Decimal('0') for key in TIMELINE_KEYS}
+
+    new = {
+        row.user_id: {key: Decimal(getattr(row, key) or 0) for key in TIMELINE_KEYS}
+        for row in db.session.execute(_daily_sums(user_ids, day))
+    }
+    #wiersze jako krotki (nie obiekty ORM) - zapis niżej idzie z pominięciem sesji
+    columns = [getattr(DriverDailyRollup, name) for name in ('id', 'user_id', *TIMELINE_KEYS, *CUM_KEYS.values())]
+    old = {
+        row.user_id: row
+        for row in db.session.execute(
+            db.select(*columns).where(DriverDailyRollup.day == day, DriverDailyRollup.user_id.in_(user_ids))
+        )
+    }
+    previous = _cumulative_before([user_id for user_id in new if user_id not in old], day)
+
+    inserts, updates, deletes, shifts = [], [], [], []
+    for user_id in user_ids:
+        values = new.get(user_id)
+        row = old.get(user_id)
+
+        if row is not None:
+            before = {key: getattr(row, key) for key in TIMELINE_KEYS}
+            delta = {key: (values or zero)[key] - before[key] for key in TIMELINE_KEYS}
+            if values is None:
+                deletes.append(row.id)
+            elif any(delta.values()):
+                updates.append({
+                    'id': row.id, **values,
+                    **{cum: getattr(row, cum) + delta[key] for key, cum in CUM_KEYS.items()}
+                })
+        elif values is not None:
+            delta = values
+            start = previous.get(user_id, zero)
+            inserts.append({
+                'user_id': user_id, 'day': day, **values,
+                **{cum: start[key] + values[key] for key, cum in CUM_KEYS.items()}
+            })
+        else:
+            continue
+
+        if any(delta.values()):
+            shifts.append({'shift_user_id': user_id, **{f"shift_{key}": delta[key] for key in TIMELINE_KEYS}})
+
+    if deletes:
+        db.session.execute(delete(DriverDailyRollup).where(DriverDailyRollup.id.in_(deletes)))
+    if inserts:
+        db.session.execute(insert(DriverDailyRollup), inserts)
+    if updates:
+        db.session.execute(update(DriverDailyRollup), updates)
+    if shifts:
+        table = DriverDailyRollup.__table__
+        db.session.execute(
+            update(table)
+            .where(table.c.user_id == bindparam('shift_user_id'), table.c.day > day)
+            .values({cum: table.c[cum] + bindparam(f"shift_{key}") for key, cum in CUM_KEYS.items()}),
+            shifts
+        )
+    return [shift['shift_user_id'] for shift in shifts]
+
+
+def _period_sums(period, start, user_ids):
+    """
+    Sumy okresu dla podanych kierowców: miesiąc z zestawień dziennych, rok z miesięcznych
+    (najwyżej 31 / 12 wierszy na kierowcę)
+
+    Returns:
+        Select z kolumnami user_id i TIMELINE_KEYS (tylko kierowcy z wierszami w okresie)
+    """
+    end = DriverPeriodRollup.end_of(start, period)
+    if period == 'month':
+        source, conditions = DriverDailyRollup, [DriverDailyRollup.day.between(start, end)]
+    else:
+        source, conditions = DriverPeriodRollup, [
+            DriverPeriodRollup.period == 'month', DriverPeriodRollup.period_start.between(start, end)
+        ]
+    sums = [func.sum(getattr(source, key)).label(key) for key in TIMELINE_KEYS]
+    return (
+        db.select(source.user_id, *sums)
+        .where(source.user_id.in_(user_ids), *conditions)
+        .group_by(source.user_id)
+    )
+
+
+def _refresh_period(period, start, user_ids):
+    """
+    Przelicza zestawienia jednego okresu dla podanych kierowców (usunięcie starych wierszy i zapis nowych)
+    """
+    rows = [
+        {'user_id': row.user_id, 'period': period, 'period_start': start, **{key: getattr(row, key) for key in TIMELINE_KEYS}}
+        for row in db.session.execute(_period_sums(period, start, user_ids))
+    ]
+    db.session.execute(delete(DriverPeriodRollup).where(
+        DriverPeriodRollup.period == period,
+        DriverPeriodRollup.period_start == start,
+        DriverPeriodRollup.user_id.in_(user_ids)
+    ))
+    if rows:
+        db.session.execute(insert(DriverPeriodRollup), rows)
+
+
+def refresh(cells):
+    """
+    Przelicza zestawienia podanych dni kierowców w bieżącej transakcji (bez commit).
+    Dla każdego dnia: odczyt nowych sum z surowych wpisów, zapis różnic paczkami
+    i przesunięcie sum narastających późniejszych dni o różnicę.
+    Następnie przeliczane są miesiące i lata, do których należą zmienione dni.
+    Raporty tygodniowe obejmujące dni, w których coś się zmieniło, są oznaczane jako nieaktualne.
+    Dzień (okres), w którym kierowca nie ma już żadnych wpisów, nie ma wiersza zestawienia.
+
+    Args:
+        cells: iterowalne par (user_id, day)
+    """
+    by_day = defaultdict(set)
+    for user_id, day in cells:
+        by_day[day].add(user_id)
+
+    changed = []
+    for day in sorted(by_day):
+        changed += [(user_id, day) for user_id in _refresh_day(day, list(by_day[day]))]
+
+    for period in PERIODS:
+        by_start = defaultdict(set)
+        for day, user_ids in by_day.items():
+            by_start[DriverPeriodRollup.start_of(day, period)] |= user_ids
+        for start, user_ids in by_start.items():
+            _refresh_period(period, start, list(user_ids))
+
+    #raporty tygodniowe obejmujące zmienione dni są już nieaktualne (settlements.recompute)
+    WeeklyReport.mark_stale(changed)
+
+
+def _rebuild_periods(batch_size=5000):
+    """
+    Odbudowuje zestawienia miesięczne i roczne z zestawień dziennych.
+    Dni są czytane paczkami i sumowane po okresach w Pythonie (grupowanie po miesiącu
+    wymaga funkcji dat zależnych od bazy), zapis jednym wstawieniem na okres.
+    """
+    sums = {period: defaultdict(lambda: dict.fromkeys(TIMELINE_KEYS, Decimal('0'))) for period in PERIODS}
+    query = db.select(DriverDailyRollup.user_id, DriverDailyRollup.day, *[getattr(DriverDailyRollup, key) for key in TIMELINE_KEYS])
+    for row in db.session.execute(query.execution_options(yield_per=batch_size)):
+        for period in PERIODS:
+            cell = sums[period][row.user_id, DriverPeriodRollup.start_of(row.day, period)]
+            for key in TIMELINE_KEYS:
+                cell[key] += getattr(row, key)
+
+    db.session.execute(delete(DriverPeriodRollup))
+    for period, cells in sums.items():
+        rows = [
+            {'user_id': user_id, 'period': period, 'period_start': start, **values}
+            for (user_id, start), values in cells.items()
+        ]
+        if rows:
+            db.session.execute(insert(DriverPeriodRollup), rows)
+
+
+def rebuild():
+    """
+    Odbudowuje całą tabelę zestawień od zera (flask rebuild-rollups).
+    Sumy narastające są liczone funkcją okna SUM() OVER (PARTITION BY kierowca ORDER BY dzień),
+    zestawienia miesięczne i roczne są odbudowywane z nowych zestawień dziennych.
+
+    Returns:
+        int: liczba wierszy zestawień
+    """
+    daily = _daily_sums().subquery()
+    cumulative = [
+        func.sum(daily.c[key]).over(partition_by=daily.c.user_id, order_by=daily.c.day).label(cum)
+        for key, cum in CUM_KEYS.items()
+    ]
+    query = db.select(daily.c.user_id, daily.c.day, *[daily.c[key] for key in TIMELINE_KEYS], *cumulative)
+
+    db.session.execute(delete(DriverDailyRollup))
+    db.session.execute(
+        insert(DriverDailyRollup).from_select(['user_id', 'day', *TIMELINE_KEYS, *CUM_KEYS.values()], query)
+    )
+    _rebuild_periods()
+    db.session.commit()
+    return db.session.execute(db.select(func.count()).select_from(DriverDailyRollup)).scalar()
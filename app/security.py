@@ -0,0 +1,105 @@
+"""
+Polityka hashowania haseł: metoda hashowania (PASSWORD_HASH_METHOD) i limit jednoczesnych
+operacji hashowania w procesie (PASSWORD_HASH_CONCURRENCY).
+
+scrypt z parametrami Werkzeuga (n=32768, r=8) zajmuje ~32 MB pamięci na każde hashowanie -
+przy jednoczesnym logowaniu wielu kierowców pamięć procesu rosła razem z liczbą logowań.
+Semafor ogranicza liczbę hashowań wykonywanych naraz (pozostałe logowania czekają na swoją kolejkę),
+więc szczyt pamięci wynosi najwyżej: limit * koszt jednego hashowania.
+
+Hash zapisany według innej metody niż bieżąca jest przeliczany przy najbliższym udanym logowaniu
+(needs_rehash) - zmiana polityki nie wymaga resetu haseł.
+Pomiar: python benchmarks/login_hashing.py
+"""
+
+import threading
+from contextlib import nullcontext
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+
+#scrypt n=16384, r=8, p=1 - ok. 16 MB pamięci na hashowanie
+DEFAULT_METHOD = 'scrypt:16384:8:1'
+
+#ile hashowań naraz w jednym procesie (0 = bez limitu)
+DEFAULT_CONCURRENCY = 4
+
+
+def normalize_method(method):
+    """
+    Pełny zapis metody z parametrami (tak jak w zapisanym hashu), np. 'scrypt' -> 'scrypt:32768:8:1'
+
+    Raises:
+        ValueError: nieznana metoda lub błędne parametry
+    """
+    name, *args = method.split(':')
+    if name == 'scrypt':
+        if len(args) not in (0, 3):
+            raise ValueError("'scrypt' przyjmuje 3 parametry (n:r:p)")
+        n, r, p = map(int, args) if args else (2**15, 8, 1)
+        return f"scrypt:{n}:{r}:{p}"
+    if name == 'pbkdf2':
+        if len(args) > 2:
+            raise ValueError("'pbkdf2' przyjmuje najwyżej 2 parametry (hash:iteracje)")
+        hash_name = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) == 2 else DEFAULT_PBKDF2_ITERATIONS
+        return f"pbkdf2:{hash_name}:{iterations}"
+    raise ValueError(f"Nieznana metoda hashowania hasła: {method}")
+
+
+class PasswordPolicy:
+    """
+    Hashowanie i sprawdzanie haseł według metody, z limitem jednoczesnych operacji
+    """
+
+    def __init__(self, method=DEFAULT_METHOD, concurrency=DEFAULT_CONCURRENCY):
+        self.method = normalize_method(method)
+        self.concurrency = concurrency
+        self._slots = threading.BoundedSemaphore(concurrency) if concurrency else None
+
+    def _slot(self):
+        return self._slots if self._slots is not None else nullcontext()
+
+    def hash(self, password):
+        """
+        Hash hasła według bieżącej metody
+        """
+        with self._slot():
+            return generate_password_hash(password, self.method)
+
+    def verify(self, pwhash, password):
+        """
+        Sprawdza hasło (metoda odczytywana z hasha - działa też dla hashy według starej polityki)
+        """
+        if not pwhash:
+            return False
+        with self._slot():
+            return check_password_hash(pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """
+        Hash zapisany według innej metody niż bieżąca
+        """
+        return bool(pwhash) and pwhash.split('$', 1)[0] != self.method
+
+
+def init_app(app):
+    """
+    Tworzy politykę haseł aplikacji z konfiguracji
+    """
+    app.extensions['password_policy'] = PasswordPolicy(
+        app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD),
+        app.config.get('PASSWORD_HASH_CONCURRENCY', DEFAULT_CONCURRENCY)
+    )
+
+
+#polityka używana poza kontekstem aplikacji
+_default_policy = PasswordPolicy()
+
+
+def policy():
+    """
+    Polityka haseł bieżącej aplikacji (poza kontekstem aplikacji - domyślna)
+    """
+    if has_app_context() and 'password_policy' in current_app.extensions:
+        return current_app.extensions['password_policy']
+    return _default_policy
@@ -0,0 +1,262 @@
+"""
+Rozliczenia tygodniowe kierowców (WeeklyReport) - generowane dla całej floty naraz.
+Sumy z zakresu dat są liczone jednym zapytaniem jako różnica sum narastających dziennych zestawień (DriverDailyRollup),
+VAT do przeniesienia z poprzednich raportów wszystkich kierowców - jednym zapytaniem
+(WeeklyReport.get_last_vat_carryovers),
+a raporty są zapisywane jednym wstawieniem paczkowym.
+
+Wzór rozliczenia:
+- VAT wyliczony = VAT Bolt + VAT Uber - VAT do odliczenia z faktur + VAT przeniesiony (<= 0)
+- VAT do zapłaty = max(VAT wyliczony, 0), VAT do przeniesienia = min(VAT wyliczony, 0)
+- faktyczny zarobek = zarobek - VAT do zapłaty
+- do wypłaty = faktyczny zarobek - gotówka - odliczenia (opłata za rozliczenie, umowa zlecenie, paliwo)
+
+Zmiana wpisów z zakresu raportu (spóźniony import, korekta) oznacza raport jako nieaktualny
+(WeeklyReport.mark_stale). recompute() przelicza tylko nieaktualne raporty - chronologicznie dla każdego
+kierowcy, a późniejsze raporty tylko wtedy, gdy zmienił się przeniesiony do nich VAT.
+"""
+
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import and_, func, insert, update, delete
+from sqlalchemy.orm import aliased
+from app import db
+from app.models import User, WeeklyReport, DriverDailyRollup
+from app.earnings import TIMELINE_KEYS
+
+#kwoty odliczeń zaznaczanych w formularzu
+SETTLEMENT_FEE = Decimal('30.00')
+CONTRACT_FEE = Decimal('150.00')
+
+
+def default_report_name(date_from):
+    """
+    Nazwa raportu według tygodnia ISO daty początkowej (np. Tydzień 40/2024)
+    """
+    year, week, _ = date_from.isocalendar()
+    return f"Tydzień {week}/{year}"
+
+
+def _range_sums(date_from, date_to, user_ids=None):
+    """
+    Sumy zestawień dziennych w zakresie dat dla wszystkich kierowców (jedno zapytanie) jako różnica
+    sum narastających, jak earnings.range_totals: cum(ostatni dzień <= date_to) - cum(ostatni dzień < date_from).
+    Dwa odczyty po indeksie (user_id, day) na kierowcę niezależnie od szerokości zakresu.
+
+    Returns:
+        dict: {user_id: {klucz z TIMELINE_KEYS: Decimal}} - tylko kierowcy z wpisami w zakresie
+    """
+    end_day = (
+        db.select(func.max(DriverDailyRollup.day))
+        .where(DriverDailyRollup.user_id == User.id, DriverDailyRollup.day <= date_to)
+        .scalar_subquery()
+    )
+    start_day = (
+        db.select(func.max(DriverDailyRollup.day))
+        .where(DriverDailyRollup.user_id == User.id, DriverDailyRollup.day < date_from)
+        .scalar_subquery()
+    )
+    drivers = db.select(User.id.label('user_id'), end_day.label('end_day'), start_day.label('start_day')).where(User.role == 'driver')
+    if user_ids is not None:
+        drivers = drivers.where(User.id.in_(user_ids))
+    drivers = drivers.subquery()
+
+    end = aliased(DriverDailyRollup, name='end_rollup')
+    start = aliased(DriverDailyRollup, name='start_rollup')
+    query = (
+        db.select(
+            drivers.c.user_id,
+            *[getattr(end, f"cum_{key}") for key in TIMELINE_KEYS],
+            *[getattr(start, f"cum_{key}") for key in TIMELINE_KEYS]
+        )
+        .join(end, and_(end.user_id == drivers.c.user_id, end.day == drivers.c.end_day))
+        .outerjoin(start, and_(start.user_id == drivers.c.user_id, start.day == drivers.c.start_day))
+        .where(drivers.c.end_day >= date_from)
+    )
+
+    #odejmowanie w Pythonie na Decimal (SQLite liczyłby różnicę na liczbach zmiennoprzecinkowych)
+    sums = {}
+    for user_id, *values in db.session.execute(query):
+        ends, starts = values[:len(TIMELINE_KEYS)], values[len(TIMELINE_KEYS):]
+        sums[user_id] = {
+            key: Decimal(end_value) - Decimal(start_value or 0)
+            for key, end_value, start_value in zip(TIMELINE_KEYS, ends, starts)
+        }
+    return sums
+
+
+def settle(sums, carryover=Decimal('0'), settlement_fee=Decimal('0'), contract_fee=Decimal('0'), fuel_amount=Decimal('0')):
+    """
+    Wylicza pola raportu tygodniowego z sum zakresu dat
+
+    Args:
+        sums: {klucz z TIMELINE_KEYS: Decimal} - sumy kierowcy w zakresie
+        carryover: VAT przeniesiony z poprzedniego raportu (<= 0)
+        settlement_fee, contract_fee, fuel_amount: kwoty odliczeń
+    Returns:
+        dict: wartości kolumn WeeklyReport (bez metadanych raportu)
+    """
+    total_gross = sums['bolt_gross'] + sums['uber_gross']
+    total_cash = sums['bolt_cash'] + sums['uber_cash']
+    vat_calculated = sums['bolt_vat'] + sums['uber_vat'] - sums['expenses_vat_deductible'] + carryover
+    total_vat = max(vat_calculated, Decimal('0'))
+    total_actual = total_gross - total_vat
+
+    report = {
+        'total_gross': total_gross,
+        'total_cash': total_cash,
+        'total_vat_calculated': vat_calculated,
+        'total_vat': total_vat,
+        'vat_carryover': min(vat_calculated, Decimal('0')),
+        'total_actual': total_actual,
+        'expenses_net': sums['expenses_net'],
+        'expenses_vat': sums['expenses_vat'],
+        'expenses_vat_deductible': sums['expenses_vat_deductible'],
+        'expenses_deductible': sums['expenses_deductible'],
+        'settlement_fee': Decimal(settlement_fee or 0),
+        'contract_fee': Decimal(contract_fee or 0),
+        'fuel_amount': Decimal(fuel_amount or 0),
+    }
+    deductions = report['settlement_fee'] + report['contract_fee'] + report['fuel_amount']
+    report['final_amount'] = total_actual - total_cash - deductions
+    return report
+
+
+def generate(date_from, date_to, report_name=None, user_ids=None, settlement_fee=False, contract_fee=False, fuel_amounts=None):
+    """
+    Generuje raporty tygodniowe za zakres dat dla wszystkich kierowców z wpisami w zakresie
+    (lub tylko podanych). Wcześniej wygenerowane raporty kierowców za ten sam zakres są zastępowane,
+    więc ponowne uruchomienie (np. po korekcie importu) nie tworzy duplikatów. Zapis z commit.
+
+    Args:
+        date_from, date_to: zakres dat raportu (date, włącznie)
+        report_name: nazwa raportów (domyślnie według tygodnia ISO, np. Tydzień 40/2024)
+        user_ids: tylko podani kierowcy (None = cała flota)
+        settlement_fee, contract_fee: odliczenia dla wszystkich raportów
+        fuel_amounts: {user_id: kwota za paliwo}
+    Returns:
+        int: liczba wygenerowanych raportów
+    """
+    report_name = report_name or default_report_name(date_from)
+    fuel_amounts = fuel_amounts or {}
+
+    sums = _range_sums(date_from, date_to, user_ids)
+    carryovers = WeeklyReport.get_last_vat_carryovers(sums, before=date_from)
+
+    rows = [
+        {
+            'user_id': user_id,
+            'report_name': report_name,
+            'date_from': date_from,
+            'date_to': date_to,
+            **settle(
+                driver_sums, carryovers[user_id],
+                SETTLEMENT_FEE if settlement_fee else Decimal('0'),
+                CONTRACT_FEE if contract_fee else Decimal('0'),
+                fuel_amounts.get(user_id, Decimal('0'))
+            ),
+        }
+        for user_id, driver_sums in sums.items()
+    ]
+
+    if rows:
+        replaced = (WeeklyReport.user_id.in_(list(sums)), WeeklyReport.date_from == date_from, WeeklyReport.date_to == date_to)
+        previous = dict(db.session.execute(db.select(WeeklyReport.user_id, WeeklyReport.vat_carryover).where(*replaced)).all())
+        db.session.execute(delete(WeeklyReport).where(*replaced))
+        db.session.execute(insert(WeeklyReport), rows)
+
+        #późniejsze raporty kierowców, którym zmienił się VAT do przeniesienia, są nieaktualne
+        changed = [row['user_id'] for row in rows if previous.get(row['user_id']) != row['vat_carryover']]
+        if changed:
+            db.session.execute(
+                update(WeeklyReport)
+                .where(WeeklyReport.user_id.in_(changed), WeeklyReport.date_from > date_to)
+                .values(is_stale=True)
+            )
+    db.session.commit()
+    return len(rows)
+
+
+#kolumny raportu potrzebne do przeliczenia
+RECOMPUTE_COLUMNS = ('id', 'user_id', 'date_from', 'date_to', 'vat_carryover', 'is_stale',
+                     'settlement_fee', 'contract_fee', 'fuel_amount')
+
+
+def recompute(user_ids=None):
+    """
+    Przelicza nieaktualne raporty tygodniowe (is_stale) z bieżących zestawień dziennych.
+    Dla każdego kierowcy raporty od pierwszego nieaktualnego są przechodzone chronologicznie:
+    przeliczany jest raport nieaktualny oraz raport, do którego zmienił się przeniesiony VAT -
+    pozostałe zostają bez zmian. Odliczenia (opłaty, paliwo) zostają takie jak w raporcie. Zapis z commit.
+
+    Args:
+        user_ids: tylko podani kierowcy (None = wszyscy z nieaktualnymi raportami)
+    Returns:
+        int: liczba przeliczonych raportów
+    """
+    query = (
+        db.select(WeeklyReport.user_id, func.min(WeeklyReport.date_from))
+        .where(WeeklyReport.is_stale == db.true())
+        .group_by(WeeklyReport.user_id)
+    )
+    if user_ids is not None:
+        query = query.where(WeeklyReport.user_id.in_(user_ids))
+    first_stale = dict(db.session.execute(query).all())
+    if not first_stale:
+        return 0
+
+    #łańcuchy raportów kierowców od pierwszego nieaktualnego (krotki, zapis niżej z pominięciem sesji)
+    chains = defaultdict(list)
+    columns = [getattr(WeeklyReport, name) for name in RECOMPUTE_COLUMNS]
+    rows = db.session.execute(
+        db.select(*columns)
+        .where(WeeklyReport.user_id.in_(list(first_stale)), WeeklyReport.date_from >= min(first_stale.values()))
+        .order_by(WeeklyReport.user_id, WeeklyReport.date_to, WeeklyReport.id)
+    )
+    for row in rows:
+        if row.date_from >= first_stale[row.user_id]:
+            chains[row.user_id].append(row)
+
+    #VAT przeniesiony do pierwszego nieaktualnego raportu - jedno zapytanie na datę początkową
+    by_start = defaultdict(list)
+    for user_id, date_from in first_stale.items():
+        by_start[date_from].append(user_id)
+    carryovers = {}
+    for date_from, users in by_start.items():
+        carryovers.update(WeeklyReport.get_last_vat_carryovers(users, before=date_from))
+
+    #sumy zakresów - jedno zapytanie na zakres dat, pobierane dopiero gdy raport z tego zakresu jest przeliczany
+    range_users = defaultdict(list)
+    for user_id, chain in chains.items():
+        for report in chain:
+            range_users[report.date_from, report.date_to].append(user_id)
+    sums = {}
+    zero = dict.fromkeys(TIMELINE_KEYS, Decimal('0'))
+
+    generated_at = datetime.utcnow()
+    updates = []
+    for user_id, chain in chains.items():
+        carryover = carryovers[user_id]
+        carryover_changed = False
+        for report in chain:
+            if not (report.is_stale or carryover_changed):
+                carryover = min(report.vat_carryover, Decimal('0'))
+                continue
+
+            key = (report.date_from, report.date_to)
+            if key not in sums:
+                sums[key] = _range_sums(*key, range_users[key])
+            values = settle(
+                sums[key].get(user_id, zero), carryover,
+                report.settlement_fee, report.contract_fee, report.fuel_amount
+            )
+            updates.append({'id': report.id, **values, 'is_stale': False, 'generated_at': generated_at})
+
+            carryover_changed = values['vat_carryover'] != report.vat_carryover
+            carryover = values['vat_carryover']
+
+    if updates:
+        db.session.execute(update(WeeklyReport), updates)
+    db.session.commit()
+    return len(updates)
@@ -0,0 +1,121 @@
+"""
+Benchmark logowania przy jednoczesnym napływie kierowców (np. zmiana zmiany) dla różnych
+polityk hashowania haseł (PASSWORD_HASH_METHOD) i limitów jednoczesnych hashowań (PASSWORD_HASH_CONCURRENCY).
+
+Dla każdej kombinacji metody i limitu uruchamiany jest osobny proces: tymczasowa baza SQLite z kierowcami,
+a następnie --logins wątków wysyła naraz POST /login (każdy własnym klientem testowym).
+Wypisywane są czasy logowania (mediana, p95, maksimum), czas całej fali logowań
+i szczyt pamięci procesu (ru_maxrss) ponad stan sprzed logowań.
+
+Użycie (z katalogu projektu, Linux / macOS):
+    python benchmarks/login_hashing.py --logins 200 --methods scrypt:32768:8:1 scrypt:16384:8:1 --limits 0 4
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import text
+from werkzeug.security import generate_password_hash
+
+PASSWORD = 'haslo-kierowcy'
+
+
+def _max_rss_mb():
+    #Linux podaje ru_maxrss w KB, macOS w bajtach
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def run_wave(method, limit, logins, pwhash):
+    """
+    Fala jednoczesnych logowań w bieżącym procesie (uruchamiana w osobnym procesie)
+
+    Returns:
+        dict: czasy logowań (ms), czas całej fali (s), przyrost szczytu pamięci (MB), liczba nieudanych logowań
+    """
+    workdir = tempfile.mkdtemp(prefix='drivers-portal-login-')
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    os.environ['DATABASE_URI'] = 'sqlite:///' + os.path.join(workdir, 'benchmark.db')
+    os.environ['UPLOAD_FOLDER'] = os.path.join(workdir, 'uploads')
+    os.environ['PASSWORD_HASH_METHOD'] = method
+    os.environ['PASSWORD_HASH_CONCURRENCY'] = str(limit)
+
+    from app import create_app, db
+
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        db.create_all()
+        #hash policzony wcześniej w procesie głównym - przygotowanie bazy nie podnosi szczytu pamięci
+        db.session.execute(
+            text("INSERT INTO user (username, password_hash, role) VALUES (:username, :pwhash, 'driver')"),
+            [{'username': f'driver{i}', 'pwhash': pwhash} for i in range(logins)]
+        )
+        db.session.commit()
+
+    clients = [app.test_client() for _ in range(logins)]
+    start = threading.Barrier(logins)
+    timings = [None] * logins
+    failed = []
+
+    def login(index):
+        start.wait()
+        started = time.perf_counter()
+        response = clients[index].post('/login', data={'username': f'driver{index}', 'password': PASSWORD})
+        timings[index] = (time.perf_counter() - started) * 1000
+        if response.status_code != 302:
+            failed.append(index)
+
+    baseline = _max_rss_mb()
+    threads = [threading.Thread(target=login, args=(index,)) for index in range(logins)]
+    wave_started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wave = time.perf_counter() - wave_started
+
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+    shutil.rmtree(workdir, ignore_errors=True)
+    return {'timings': timings, 'wave': wave, 'peak_mb': _max_rss_mb() - baseline, 'failed': len(failed)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--logins', type=int, default=200, help='liczba jednoczesnych logowań')
+    parser.add_argument('--methods', nargs='+', default=['scrypt:32768:8:1', 'scrypt:16384:8:1'],
+                        help='metody hashowania (jak PASSWORD_HASH_METHOD)')
+    parser.add_argument('--limits', nargs='+', type=int, default=[0, 4],
+                        help='limity jednoczesnych hashowań (0 = bez limitu)')
+    args = parser.parse_args()
+
+    #każda kombinacja w świeżym procesie - ru_maxrss nie maleje w trakcie życia procesu
+    context = multiprocessing.get_context('spawn')
+    print(f"{args.logins} jednoczesnych logowań\n")
+    print(f"{'metoda':<22}{'limit':>6}{'mediana ms':>12}{'p95 ms':>10}{'max ms':>10}{'fala s':>9}{'pamięć MB':>11}")
+    for method in args.methods:
+        pwhash = generate_password_hash(PASSWORD, method)
+        for limit in args.limits:
+            with context.Pool(1) as pool:
+                result = pool.apply(run_wave, (method, limit, args.logins, pwhash))
+            timings = sorted(result['timings'])
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            print(f"{method:<22}{limit or '-':>6}{statistics.median(timings):>12.0f}{p95:>10.0f}{timings[-1]:>10.0f}"
+                  f"{result['wave']:>9.2f}{result['peak_mb']:>11.0f}"
+                  + (f"   nieudane: {result['failed']}" if result['failed'] else ''))
+
+
+if __name__ == '__main__':
+    main()
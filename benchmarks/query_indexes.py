@@ -0,0 +1,180 @@
+"""
+Benchmark indeksów dla najczęstszych zapytań (widok zarobków kierowcy, import CSV,
+przeniesienie VAT z ostatniego raportu).
+
+Skrypt tworzy tymczasową bazę SQLite ze schematem aplikacji, wypełnia ją danymi
+i wykonuje każde zapytanie dwa razy:
+- na tabelach z indeksami (schemat z modeli),
+- na kopiach tych tabel bez żadnych indeksów (CREATE TABLE ... AS SELECT),
+wypisując plan zapytania (EXPLAIN QUERY PLAN) i medianę czasu wykonania.
+
+Użycie (z katalogu projektu):
+    python benchmarks/query_indexes.py --drivers 2000 --days 1000    # ~2 mln wierszy na platformę
+"""
+
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import text
+
+
+TABLES = ['user', 'bolt_earnings', 'uber_earnings', 'expense', 'weekly_report']
+
+#zapytania odpowiadające tym z aplikacji; {tabela} jest podmieniana na kopię bez indeksów
+QUERIES = [
+    (
+        'zarobki Bolt kierowcy w zakresie dat (driver_earnings)',
+        'SELECT * FROM {bolt_earnings} WHERE user_id = :user_id AND report_date BETWEEN :date_from AND :date_to',
+    ),
+    (
+        'zarobki Uber kierowcy w zakresie dat (driver_earnings)',
+        'SELECT * FROM {uber_earnings} WHERE user_id = :user_id AND report_date BETWEEN :date_from AND :date_to',
+    ),
+    (
+        'faktury kierowcy w zakresie dat (driver_earnings)',
+        'SELECT * FROM {expense} WHERE user_id = :user_id AND issue_date BETWEEN :date_from AND :date_to',
+    ),
+    (
+        'istniejące wpisy z dnia raportu (import CSV)',
+        'SELECT user_id, id, source_hash FROM {bolt_earnings} WHERE report_date = :date_to',
+    ),
+    (
+        'ostatni raport kierowcy (get_last_vat_carryover)',
+        'SELECT * FROM {weekly_report} WHERE user_id = :user_id ORDER BY date_to DESC LIMIT 1',
+    ),
+    (
+        'kierowca po identyfikatorze Bolt',
+        'SELECT id FROM {user} WHERE bolt_id = :bolt_id',
+    ),
+]
+
+
+def seed(db, drivers, days):
+    """
+    Wypełnia bazę danymi: kierowcy, dzienne zarobki Bolt i Uber,
+    kilka faktur w miesiącu i raport tygodniowy na kierowcę
+    """
+    start = date(2020, 1, 1)
+    rng = random.Random(0)
+
+    db.session.execute(
+        text("INSERT INTO user (username, role, bolt_id, uber_id) VALUES (:username, 'driver', :bolt_id, :uber_id)"),
+        [{'username': f'driver{i}', 'bolt_id': f'B{i:06d}', 'uber_id': f'U{i:06d}'} for i in range(1, drivers + 1)]
+    )
+
+    for table, id_column in (('bolt_earnings', 'bolt_id'), ('uber_earnings', 'uber_id')):
+        statement = text(
+            f"INSERT INTO {table} (user_id, {id_column}, report_date, gross_total, expenses_total, net_income, "
+            f"cash_collected, vat_due, actual_income) "
+            f"VALUES (:user_id, :platform_id, :report_date, :gross, 0, :gross, 0, :vat, :gross - :vat)"
+        )
+        # dzień po dniu - tak jak przychodzą pliki CSV
+        for day in range(days):
+            report_date = start + timedelta(days=day)
+            db.session.execute(statement, [
+                {'user_id': user_id, 'platform_id': f'X{user_id}', 'report_date': report_date,
+                 'gross': round(rng.uniform(50, 600), 2), 'vat': round(rng.uniform(5, 60), 2)}
+                for user_id in range(1, drivers + 1)
+            ])
+
+    db.session.execute(
+        text("INSERT INTO expense (user_id, document_number, description, issue_date, net_amount, vat_amount, "
+             "vat_deductible, deductible_amount, created_at) "
+             "VALUES (:user_id, :number, 'paliwo', :issue_date, 100, 23, 11.5, 75, :issue_date)"),
+        [{'user_id': user_id, 'number': f'FV/{user_id}/{day}', 'issue_date': start + timedelta(days=day)}
+         for user_id in range(1, drivers + 1) for day in range(0, days, 10)]
+    )
+
+    db.session.execute(
+        text("INSERT INTO weekly_report (user_id, report_name, date_from, date_to, generated_at, total_gross, total_cash, "
+             "total_vat_calculated, total_vat, vat_carryover, total_actual, expenses_net, expenses_vat, "
+             "expenses_vat_deductible, expenses_deductible, settlement_fee, contract_fee, fuel_amount, final_amount) "
+             "VALUES (:user_id, 'raport', :date_from, :date_to, :date_to, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0)"),
+        [{'user_id': user_id, 'date_from': start + timedelta(days=day), 'date_to': start + timedelta(days=day + 6)}
+         for user_id in range(1, drivers + 1) for day in range(0, days - 6, 7)]
+    )
+    db.session.commit()
+
+
+def copy_without_indexes(db):
+    """
+    Kopie tabel bez indeksów i ograniczeń - punkt odniesienia (stan sprzed migracji)
+    """
+    for table in TABLES:
+        db.session.execute(text(f'DROP TABLE IF EXISTS "plain_{table}"'))
+        db.session.execute(text(f'CREATE TABLE "plain_{table}" AS SELECT * FROM "{table}"'))
+    db.session.commit()
+
+
+def measure(db, sql, params, repeat):
+    """
+    Plan zapytania i mediana czasu wykonania (ms)
+    """
+    plan = [row[-1] for row in db.session.execute(text('EXPLAIN QUERY PLAN ' + sql), params)]
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        db.session.execute(text(sql), params).fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    return plan, statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--drivers', type=int, default=500, help='liczba kierowców')
+    parser.add_argument('--days', type=int, default=730, help='liczba dni z zarobkami na kierowcę')
+    parser.add_argument('--repeat', type=int, default=20, help='liczba powtórzeń każdego zapytania')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='drivers-portal-bench-')
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    os.environ['DATABASE_URI'] = 'sqlite:///' + os.path.join(workdir, 'benchmark.db')
+    os.environ['UPLOAD_FOLDER'] = os.path.join(workdir, 'uploads')
+
+    from app import create_app, db
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+
+        started = time.perf_counter()
+        seed(db, args.drivers, args.days)
+        copy_without_indexes(db)
+        db.session.execute(text('ANALYZE'))
+        rows = db.session.execute(text('SELECT count(*) FROM bolt_earnings')).scalar()
+        print(f"Dane: {args.drivers} kierowców, {rows} wierszy na platformę "
+              f"(przygotowanie {time.perf_counter() - started:.1f}s)\n")
+
+        last_day = date(2020, 1, 1) + timedelta(days=args.days - 1)
+        params = {
+            'user_id': args.drivers // 2,
+            'date_from': last_day - timedelta(days=30),
+            'date_to': last_day,
+            'bolt_id': f'B{args.drivers // 2:06d}',
+        }
+
+        for name, sql in QUERIES:
+            plain, plain_ms = measure(db, sql.format(**{t: f'plain_{t}' for t in TABLES}), params, args.repeat)
+            indexed, indexed_ms = measure(db, sql.format(**{t: f'"{t}"' for t in TABLES}), params, args.repeat)
+
+            print(name)
+            print(f"  bez indeksów: {plain_ms:9.3f} ms   {'; '.join(plain)}")
+            print(f"  z indeksami:  {indexed_ms:9.3f} ms   {'; '.join(indexed)}")
+            print(f"  przyspieszenie: x{plain_ms / max(indexed_ms, 1e-6):.0f}\n")
+
+        db.session.remove()
+        db.engine.dispose()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
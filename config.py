@@ -26,4 +26,11 @@ class TestingConfig(Config):
     WTF_CSRF_ENABLED = False
     SECRET_KEY = 'test-secret-key'
     UPLOAD_FOLDER = '/tmp/test_uploads'
-    MAX_CONTENT_LENGTH = 16777216
\ No newline at end of file
+    MAX_CONTENT_LENGTH = 16777216
+    CSV_CHUNKSIZE = 5000
+    USER_CACHE_TTL = 60
+    IMPORT_JOB_TIMEOUT = 3600
+    IMPORT_ZIP_MAX_FILES = 200
+    IMPORT_ZIP_MAX_SIZE = 524288000
+    PASSWORD_HASH_METHOD = 'scrypt:16384:8:1'
+    PASSWORD_HASH_CONCURRENCY = 4
\ No newline at end of file
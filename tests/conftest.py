@@ -1,7 +1,7 @@
 import pytest
-from app import create_app, db
+from app import create_app, db, rollups
 from app.models import User, BoltEarnings, UberEarnings, Expense
-from datetime import date
+from datetime import date, timedelta
 
 @pytest.fixture(scope='function')
 def app():
@@ -80,6 +80,36 @@ def bolt_earnings(app, driver_user):
     with app.app_context():
         yield BoltEarnings.query.get(earnings_id)
 
+class FleetFactory:
+    """Kierowcy i dzienne zarobki Bolt z zestawieniami dziennymi (wymaga kontekstu aplikacji)"""
+
+    def driver(self, username, bolt_id=None, uber_id=None, role='driver', password='driver123'):
+        """Użytkownik w bazie (commit)"""
+        user = User(username=username, role=role, bolt_id=bolt_id, uber_id=uber_id)
+        user.set_password(password)
+        db.session.add(user)
+        db.session.commit()
+        return user
+
+    def bolt_days(self, driver, start, days=1, net=100, vat=0, cash=0, gross=None):
+        """Zarobki Bolt przez days kolejnych dni od start (kwoty dzienne) + zestawienia dzienne (commit)"""
+        dates = [start + timedelta(days=offset) for offset in range(days)]
+        for day in dates:
+            db.session.add(BoltEarnings(
+                user_id=driver.id, bolt_id=driver.bolt_id, report_date=day,
+                gross_total=net if gross is None else gross, net_income=net,
+                cash_collected=cash, vat_due=vat, actual_income=net - vat
+            ))
+        db.session.flush()
+        rollups.refresh((driver.id, day) for day in dates)
+        db.session.commit()
+
+
+@pytest.fixture
+def fleet_factory(app):
+    """Fabryka kierowców i zarobków (FleetFactory)"""
+    return FleetFactory()
+
 @pytest.fixture
 def expense(app, driver_user):
     """Expense w bazie"""
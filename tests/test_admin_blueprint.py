@@ -1,7 +1,10 @@
 """
 Testy blueprintu Admin (panel administratora)
 """
+import re
 import pytest
+from datetime import date
+from app import db, rollups
 from app.models import User, BoltEarnings, UberEarnings, Expense
 
 class TestAdminDashboard:
@@ -345,6 +348,53 @@ class TestDriverEarnings:
         assert 'Powrót do panelu' in response.data.decode('utf-8')
         assert '/admin/dashboard' in response.data.decode('utf-8')
 
+    def test_driver_earnings_paginates_rows(self, client, admin_user, driver_user):
+        """
+        TEST: Wpisy są stronicowane (per_page) - link "Starsze" prowadzi do kolejnej strony
+        """
+        with client.application.app_context():
+            for day in range(1, 6):
+                db.session.add(BoltEarnings(
+                    user_id=driver_user.id, bolt_id=driver_user.bolt_id, report_date=date(2025, 1, day),
+                    gross_total=100 + day, net_income=100, cash_collected=0, vat_due=8, actual_income=92
+                ))
+            db.session.commit()
+            rollups.rebuild()
+
+        client.post('/login', data={
+            'username': 'admin',
+            'password': 'admin123'
+        })
+
+        first = client.get(f'/admin/driver/{driver_user.id}/earnings?per_page=2').data.decode('utf-8')
+        assert '105.00' in first and '104.00' in first
+        assert '103.00' not in first
+        assert 'Starsze' in first
+        assert '500.00 PLN' in first # suma z całego zakresu, nie tylko ze strony
+
+        #przejdź na drugą stronę
+        next_url = re.search(r'href="([^"]*bolt_after=[^"]*)"', first).group(1).replace('&amp;', '&')
+        second = client.get(next_url).data.decode('utf-8')
+        assert '103.00' in second and '102.00' in second
+        assert '105.00' not in second
+        assert 'Najnowsze' in second
+
+    def test_driver_earnings_all_streams_every_row(self, client, admin_user, driver_user, bolt_earnings):
+        """
+        TEST: Widok wszystkich wpisów (renderowany strumieniowo) pokazuje wpisy i sumy
+        """
+        client.post('/login', data={
+            'username': 'admin',
+            'password': 'admin123'
+        })
+
+        response = client.get(f'/admin/driver/{driver_user.id}/earnings/all')
+
+        assert response.status_code == 200
+        assert response.is_streamed
+        assert '1000.00' in response.data.decode('utf-8')
+        assert 'Bolt - Podsumowanie' in response.data.decode('utf-8')
+
 class TestUploadCSV:
     """
     Testy uploadu CSV z zarobkami
@@ -68,14 +68,106 @@ class TestDateExtraction:
         assert extracted_date == date.today()
 
 
+class TestCSVParsing:
+    """Testy wczytywania pliku (separator, kodowanie, wybór kolumn)"""
+
+    def test_sniffs_semicolon_and_prunes_columns(self):
+        """TEST: Rozpoznaje średnik i wczytuje tylko kolumny z konfiguracji"""
+        content = (
+            "Kierowca;Identyfikator kierowcy;Zarobki netto|ZŁ;Nieużywana kolumna\n"
+            "Jan;B1;100.5;x\n"
+            "Anna;B2;;y\n"
+        ).encode('utf-8-sig')
+        processor = CSVProcessor(BytesIO(content), "zarobki_01_01_2024.csv")
+
+        df = processor._load_csv()
+
+        assert list(df.columns) == ["Kierowca", "Identyfikator kierowcy", "Zarobki netto|ZŁ"]
+        assert df["Zarobki netto|ZŁ"].dtype == 'float64'
+        assert df["Identyfikator kierowcy"].tolist() == ['B1', 'B2']
+
+    def test_pipe_in_bolt_headers_is_not_delimiter(self):
+        """TEST: Znak '|' w nagłówkach Bolt nie jest brany za separator"""
+        content = bolt_csv([('Jan', 'B1', 100), ('Anna', 'B2', 200)]).getvalue()
+        processor = CSVProcessor(BytesIO(content), "zarobki_01_01_2024.csv")
+
+        encoding, delimiter, header = processor._sniff_format()
+
+        assert delimiter == ','
+        assert encoding == 'utf-8'
+        assert "Zarobki netto|ZŁ" in header
+
+    def test_inconsistent_line_does_not_disqualify_delimiter(self):
+        """TEST: Separator spójny w większości linii wygrywa mimo jednej niespójnej linii (stopka eksportu)"""
+        content = (
+            "Kierowca;Identyfikator kierowcy;Zarobki netto|ZŁ\n"
+            "Jan;B1;100,5\n"
+            "Anna;B2;200\n"
+            "Razem;;300;\n"
+        ).encode('utf-8')
+        processor = CSVProcessor(BytesIO(content), "zarobki_01_01_2024.csv")
+
+        encoding, delimiter, header = processor._sniff_format()
+
+        assert delimiter == ';'
+        assert header == ["Kierowca", "Identyfikator kierowcy", "Zarobki netto|ZŁ"]
+
+    def test_header_without_platform_columns(self):
+        """TEST: Nagłówek bez żadnej kolumny platformy -> ValueError z czytelnym komunikatem"""
+        content = "Imię;Nazwisko;Kwota\nJan;Kowalski;100\n".encode('utf-8')
+        processor = CSVProcessor(BytesIO(content), "zarobki_01_01_2024.csv")
+
+        with pytest.raises(ValueError, match="nie zawiera żadnej z kolumn"):
+            processor._load_csv()
+
+    def test_cp1250_fallback(self):
+        """TEST: Plik zapisany w cp1250 jest poprawnie odczytany"""
+        content = "Kierowca,Identyfikator kierowcy,Opłaty ogółem|ZŁ\nŁukasz,B1,12.5\n".encode('cp1250')
+        processor = CSVProcessor(BytesIO(content), "zarobki_01_01_2024.csv")
+
+        df = processor._map_columns(processor._load_csv())
+
+        assert df['driver_name'].tolist() == ['Łukasz']
+        assert df['expenses_total'].tolist() == [12.5]
+
+
+def compute(filename, row):
+    """Wartości rekordu z _compute_values dla jednego wiersza (brakujące kolumny liczbowe = 0)"""
+    import pandas as pd
+
+    processor = CSVProcessor(BytesIO(b"dummy"), filename)
+    df = pd.DataFrame([{col: row.get(col, 0.0) for col in processor.config['numeric_columns']}])
+    return processor._compute_values(df).to_dict('records')[0]
+
+
+def reference_values(platform, row):
+    """Wzorcowe obliczenie wartości rekordu dla jednego wiersza (wzory z eksportów Bolt i Uber)"""
+    if platform == 'bolt':
+        vat_due = (
+            row['brutto_app'] * 0.08 + row['brutto_cash'] * 0.08 +
+            row['campaign'] * 0.23 + row['refunds'] * 0.23 + row['cancellations'] * 0.23
+        ) - row['expenses_total'] * 0.23
+        values = {
+            'gross_total': row['gross_total'], 'expenses_total': row['expenses_total'],
+            'net_income': row['net_income'], 'cash_collected': row['cash_collected'], 'vat_due': vat_due
+        }
+    else:
+        values = {
+            'gross_total': row['gross_net_income'],
+            'expenses_total': abs(row['service_fee'] + row['tax_on_service_fee']),
+            'net_income': row['gross_net_income'],
+            'cash_collected': abs(row['cash_collected']),
+            'vat_due': row['tax_on_fee'] + row['tax_general'] + row['tax_on_service_fee'],
+        }
+    values['actual_income'] = values['net_income'] - values['vat_due']
+    return values
+
+
 class TestVATCalculations:
     """Testy obliczeń VAT"""
 
     def test_calculate_bolt_vat(self):
         """TEST: Oblicza VAT dla Bolt"""
-        file = BytesIO(b"dummy")
-        processor = CSVProcessor(file, "zarobki_01_01_2024.csv")
-        
         row = {
             'brutto_app': 1000.0,      # 1000 * 0.08 = 80
             'brutto_cash': 500.0,       # 500 * 0.08 = 40
@@ -84,26 +176,46 @@ class TestVATCalculations:
             'cancellations': 30.0,      # 30 * 0.23 = 6.9
             'expenses_total': 200.0     # 200 * 0.23 = 46 (odejmujemy)
         }
-        
-        vat = processor._calculate_bolt_vat(row)
+
+        vat = compute("zarobki_01_01_2024.csv", row)['vat_due']
         expected = 80 + 40 + 23 + 11.5 + 6.9 - 46
         assert abs(vat - expected) < 0.01
 
     def test_calculate_uber_vat(self):
         """TEST: Oblicza VAT dla Uber"""
-        file = BytesIO(b"dummy")
-        processor = CSVProcessor(file, "payments_20240101.csv")
-        
         row = {
             'tax_on_fee': 50.0,
             'tax_general': 30.0,
             'tax_on_service_fee': 20.0
         }
-        
-        vat = processor._calculate_uber_vat(row)
+
+        vat = compute("payments_20240101.csv", row)['vat_due']
         assert vat == 100.0
 
 
+class TestVectorizedCalculations:
+    """Testy obliczeń na całym DataFrame (porównanie z obliczeniem wzorcowym dla pojedynczych wierszy)"""
+
+    @pytest.mark.parametrize('filename', ["zarobki_01_01_2024.csv", "payments_20240101.csv"])
+    def test_vectorized_values_match_reference(self, filename):
+        """TEST: Wyniki kolumnowe są identyczne z obliczeniem wzorcowym dla każdego wiersza"""
+        import numpy as np
+        import pandas as pd
+
+        processor = CSVProcessor(BytesIO(b"dummy"), filename)
+        rng = np.random.default_rng(2024)
+        columns = processor.config['numeric_columns']
+        df = pd.DataFrame(
+            rng.uniform(-5000, 5000, size=(500, len(columns))).round(2),
+            columns=columns
+        )
+
+        computed = processor._compute_values(df)
+
+        for row, values in zip(df.to_dict('records'), computed.to_dict('records')):
+            assert values == reference_values(processor.platform, row)
+
+
 class TestUserLookup:
     """Testy wyszukiwania użytkowników"""
 
@@ -171,74 +283,97 @@ class TestUserLookup:
             
             assert found_user is None
 
-
-class TestBoltRecordCreation:
-    """Testy tworzenia rekordów Bolt"""
-
-    def test_create_bolt_record(self, app, driver_user):
-        """TEST: Tworzy rekord BoltEarnings"""
+    def test_find_user_by_uber_full_name_fallback(self, app, driver_user):
+        """TEST: Uber fallback - znajduje po imieniu i nazwisku (znormalizowanych)"""
         with app.app_context():
-            driver_user.bolt_id = "BOLT123"
             from app import db
+            from app.models import User
+
+            user = User(username='Jan Kowalski', role='driver')
+            user.set_password('haslo123')
+            db.session.add(user)
             db.session.commit()
-            
+
             file = BytesIO(b"dummy")
-            processor = CSVProcessor(file, "zarobki_01_01_2024.csv")
-            
-            row = {
-                'gross_total': 1500.0,
-                'expenses_total': 300.0,
-                'net_income': 1200.0,
-                'cash_collected': 500.0,
-                'brutto_app': 1000.0,
-                'brutto_cash': 500.0,
-                'campaign': 0.0,
-                'refunds': 0.0,
-                'cancellations': 0.0
-            }
-            
-            report_date = date(2024, 1, 1)
-            record = processor._create_bolt_record(driver_user, row, report_date)
-            
-            assert record.user_id == driver_user.id
-            assert record.bolt_id == "BOLT123"
-            assert record.gross_total == 1500.0
-            assert record.net_income == 1200.0
-            assert record.cash_collected == 500.0
-            assert record.report_date == report_date
+            processor = CSVProcessor(file, "payments_20240101.csv")
 
+            row = {'platform_id': 'nan', 'first_name': ' jan ', 'last_name': 'KOWALSKI'}
+            found_user = processor._find_user(row)
 
-class TestUberRecordCreation:
-    """Testy tworzenia rekordów Uber"""
+            assert found_user is not None
+            assert found_user.username == 'Jan Kowalski'
 
-    def test_create_uber_record(self, app, driver_user):
-        """TEST: Tworzy rekord UberEarnings"""
+    def test_user_index_uses_single_query(self, app, driver_user):
+        """TEST: Wyszukiwanie wielu wierszy wykonuje tylko jedno zapytanie do bazy"""
         with app.app_context():
-            driver_user.uber_id = "UBER456"
             from app import db
-            db.session.commit()
-            
+            from sqlalchemy import event
+
+            statements = []
+
+            def count_statement(conn, cursor, statement, *args):
+                statements.append(statement)
+
             file = BytesIO(b"dummy")
-            processor = CSVProcessor(file, "payments_20240101.csv")
-            
-            row = {
-                'gross_net_income': 1200.0,
-                'service_fee': -200.0,
-                'tax_on_service_fee': -50.0,
-                'cash_collected': -300.0,
-                'tax_on_fee': 30.0,
-                'tax_general': 20.0
-            }
-            
-            report_date = date(2024, 1, 1)
-            record = processor._create_uber_record(driver_user, row, report_date)
-            
-            assert record.user_id == driver_user.id
-            assert record.uber_id == "UBER456"
-            assert record.gross_total == 1200.0
-            assert record.net_income == 1200.0
-            assert record.cash_collected == 300.0  # abs value
-            assert record.report_date == report_date
+            processor = CSVProcessor(file, "zarobki_01_01_2024.csv")
+
+            event.listen(db.engine, 'before_cursor_execute', count_statement)
+            try:
+                for i in range(50):
+                    processor._find_user({'platform_id': 'test-bolt-456'})
+                    processor._find_user({'platform_id': f'UNKNOWN{i}', 'driver_name': 'testdriver'})
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', count_statement)
+
+            assert len(statements) == 1
+
+
+class TestBoltRecordValues:
+    """Testy wartości rekordów Bolt"""
+
+    def test_bolt_record_values(self):
+        """TEST: Wartości rekordu BoltEarnings przepisane z raportu, rzeczywisty zarobek pomniejszony o VAT"""
+        row = {
+            'gross_total': 1500.0,
+            'expenses_total': 300.0,
+            'net_income': 1200.0,
+            'cash_collected': 500.0,
+            'brutto_app': 1000.0,
+            'brutto_cash': 500.0,
+        }
+
+        values = compute("zarobki_01_01_2024.csv", row)
+
+        assert values['gross_total'] == 1500.0
+        assert values['expenses_total'] == 300.0
+        assert values['net_income'] == 1200.0
+        assert values['cash_collected'] == 500.0
+        assert abs(values['vat_due'] - 51.0) < 0.01  # 1500 * 0.08 - 300 * 0.23
+        assert abs(values['actual_income'] - 1149.0) < 0.01
+
+
+class TestUberRecordValues:
+    """Testy wartości rekordów Uber"""
+
+    def test_uber_record_values(self):
+        """TEST: Wartości rekordu UberEarnings - opłaty i gotówka jako wartości bezwzględne"""
+        row = {
+            'gross_net_income': 1200.0,
+            'service_fee': -200.0,
+            'tax_on_service_fee': -50.0,
+            'cash_collected': -300.0,
+            'tax_on_fee': 30.0,
+            'tax_general': 20.0
+        }
+
+        values = compute("payments_20240101.csv", row)
+
+        assert values['gross_total'] == 1200.0
+        assert values['net_income'] == 1200.0
+        assert values['expenses_total'] == 250.0  # abs value
+        assert values['cash_collected'] == 300.0  # abs value
+        assert values['vat_due'] == 0.0  # 30 + 20 - 50
+        assert values['actual_income'] == 1200.0
 
 
 class TestConfig:
@@ -258,4 +393,194 @@ class TestConfig:
         assert config['platform'] == 'uber'
         assert 'column_mapping' in config
         assert 'numeric_columns' in config
-        assert config['user_lookup_field'] == 'uber_id'
\ No newline at end of file
+        assert config['user_lookup_field'] == 'uber_id'
+
+def bolt_csv(rows):
+    """Buduje plik CSV w formacie Bolt z listy (nazwa, id, netto)"""
+    header = "Kierowca,Identyfikator kierowcy,Zarobki brutto (ogółem)|ZŁ,Opłaty ogółem|ZŁ,Zarobki netto|ZŁ,Pobrana gotówka|ZŁ\n"
+    lines = [f"{name},{platform_id},{net + 50},50,{net},10\n" for name, platform_id, net in rows]
+    return BytesIO((header + ''.join(lines)).encode('utf-8'))
+
+
+class TestProcess:
+    """Testy pełnego importu (upsert po user_id + report_date)"""
+
+    def test_process_creates_records(self, app, driver_user):
+        """TEST: Import tworzy rekordy dla znalezionych kierowców i pomija nieznanych"""
+        with app.app_context():
+            file = bolt_csv([('testdriver', 'test-bolt-456', 100), ('Nieznany', 'X1', 80)])
+            result = CSVProcessor(file, "zarobki_01_01_2024.csv").process()
+
+            assert result == {'created': 1, 'updated': 0, 'unchanged': 0, 'skipped': 1, 'platform': 'bolt', 'duplicate': False}
+            record = BoltEarnings.query.one()
+            assert record.user_id == driver_user.id
+            assert record.bolt_id == 'test-bolt-456'
+            assert float(record.net_income) == 100.0
+
+    def test_reimport_updates_existing_records(self, app, driver_user):
+        """TEST: Ponowny import tego samego dnia aktualizuje rekord zamiast go duplikować"""
+        with app.app_context():
+            CSVProcessor(bolt_csv([('testdriver', 'test-bolt-456', 100)]), "zarobki_01_01_2024.csv").process()
+            result = CSVProcessor(bolt_csv([('testdriver', 'test-bolt-456', 120)]), "zarobki_01_01_2024.csv").process()
+
+            assert result['created'] == 0
+            assert result['updated'] == 1
+            record = BoltEarnings.query.one()
+            assert float(record.net_income) == 120.0
+
+    def test_duplicate_driver_in_file_keeps_last_row(self, app, driver_user):
+        """TEST: Kierowca powtórzony w pliku - jeden rekord z wartościami z ostatniego wiersza"""
+        with app.app_context():
+            file = bolt_csv([('testdriver', 'test-bolt-456', 100), ('testdriver', 'test-bolt-456', 90)])
+            result = CSVProcessor(file, "zarobki_01_01_2024.csv").process()
+
+            assert result['created'] == 1
+            assert result['updated'] == 1
+            assert float(BoltEarnings.query.one().net_income) == 90.0
+
+    def test_unique_constraint_on_user_and_date(self, app, driver_user):
+        """TEST: Baza nie pozwala na dwa rekordy kierowcy z tego samego dnia"""
+        from sqlalchemy.exc import IntegrityError
+        from app import db
+
+        with app.app_context():
+            for _ in range(2):
+                db.session.add(BoltEarnings(
+                    user_id=driver_user.id,
+                    bolt_id='test-bolt-456',
+                    report_date=date(2024, 1, 1)
+                ))
+            with pytest.raises(IntegrityError):
+                db.session.commit()
+            db.session.rollback()
+
+    def test_chunked_import_matches_whole_file(self, app, driver_user):
+        """TEST: Import fragmentami (chunksize) daje ten sam wynik co import całego pliku"""
+        with app.app_context():
+            rows = [('Nieznany', 'X1', 80), ('testdriver', 'test-bolt-456', 100), ('testdriver', 'test-bolt-456', 90)]
+            result = CSVProcessor(bolt_csv(rows), "zarobki_01_01_2024.csv", chunksize=1).process()
+
+            assert result == {'created': 1, 'updated': 1, 'unchanged': 0, 'skipped': 1, 'platform': 'bolt', 'duplicate': False}
+            assert float(BoltEarnings.query.one().net_income) == 90.0
+
+    def test_reimport_skips_unchanged_rows(self, app, driver_user):
+        """TEST: Korekta pliku aktualizuje tylko zmienione wiersze, reszta liczona jako bez zmian"""
+        from app import db
+        from app.models import User
+
+        with app.app_context():
+            other = User(username='drugi', role='driver', bolt_id='B2')
+            other.set_password('haslo123')
+            db.session.add(other)
+            db.session.commit()
+
+            CSVProcessor(
+                bolt_csv([('testdriver', 'test-bolt-456', 100), ('drugi', 'B2', 70)]), "zarobki_01_01_2024.csv"
+            ).process()
+            result = CSVProcessor(
+                bolt_csv([('testdriver', 'test-bolt-456', 100), ('drugi', 'B2', 75)]), "zarobki_01_01_2024.csv"
+            ).process()
+
+            assert (result['created'], result['updated'], result['unchanged']) == (0, 1, 1)
+            record = BoltEarnings.query.filter_by(user_id=other.id).one()
+            assert float(record.net_income) == 75.0
+            assert record.source_hash is not None
+
+
+class TestDuplicateFiles:
+    """Testy rozpoznawania ponownie wysłanych, identycznych plików"""
+
+    def test_identical_file_is_short_circuited(self, app, driver_user):
+        """TEST: Identyczny plik nie jest ponownie przetwarzany"""
+        from app.models import ImportedFile
+
+        with app.app_context():
+            content = bolt_csv([('testdriver', 'test-bolt-456', 100)]).getvalue()
+            CSVProcessor(BytesIO(content), "zarobki_01_01_2024.csv").process()
+
+            result = CSVProcessor(BytesIO(content), "zarobki_01_01_2024.csv").process()
+
+            assert result['duplicate'] is True
+            assert result['updated'] == 0
+            imported = ImportedFile.query.one()
+            assert imported.report_date == date(2024, 1, 1)
+            assert (imported.created, imported.updated, imported.skipped) == (1, 0, 0)
+
+    def test_forced_reimport(self, app, driver_user):
+        """TEST: Wymuszony import przetwarza plik ponownie i aktualizuje rejestr"""
+        from app.models import ImportedFile
+
+        with app.app_context():
+            content = bolt_csv([('testdriver', 'test-bolt-456', 100)]).getvalue()
+            CSVProcessor(BytesIO(content), "zarobki_01_01_2024.csv").process()
+
+            result = CSVProcessor(BytesIO(content), "zarobki_01_01_2024.csv").process(force=True)
+
+            assert result['duplicate'] is False
+            assert result['unchanged'] == 1
+            imported = ImportedFile.query.one()
+            assert (imported.created, imported.updated, imported.unchanged) == (0, 0, 1)
+
+    def test_changed_file_is_imported(self, app, driver_user):
+        """TEST: Plik o innej zawartości jest importowany normalnie"""
+        with app.app_context():
+            CSVProcessor(bolt_csv([('testdriver', 'test-bolt-456', 100)]), "zarobki_01_01_2024.csv").process()
+            result = CSVProcessor(bolt_csv([('testdriver', 'test-bolt-456', 110)]), "zarobki_01_01_2024.csv").process()
+
+            assert result['duplicate'] is False
+            assert float(BoltEarnings.query.one().net_income) == 110.0
+
+
+    def test_same_content_under_other_date_is_imported(self, app, driver_user):
+        """TEST: Ta sama zawartość pod nazwą z inną datą to osobny raport - zapisany, a nie pominięty jako duplikat"""
+        from app.models import ImportedFile
+
+        with app.app_context():
+            content = bolt_csv([('testdriver', 'test-bolt-456', 100)]).getvalue()
+            CSVProcessor(BytesIO(content), "zarobki_01_01_2024.csv").process()
+
+            result = CSVProcessor(BytesIO(content), "zarobki_02_01_2024.csv").process()
+
+            assert result['duplicate'] is False
+            assert result['created'] == 1
+            assert [record.report_date for record in BoltEarnings.query.order_by(BoltEarnings.report_date)] == [
+                date(2024, 1, 1), date(2024, 1, 2)
+            ]
+            assert ImportedFile.query.count() == 2
+
+class TestPlatformAccounts:
+    """Testy dopasowania wierszy po kontach kierowców na platformach (DriverPlatformAccount)"""
+
+    def test_previous_account_still_matches(self, app, driver_user):
+        """TEST: Po zmianie konta Bolt wiersze z poprzedniego i nowego konta trafiają do tego samego kierowcy"""
+        from app import db
+        from app.models import User
+
+        with app.app_context():
+            db.session.get(User, driver_user.id).bolt_id = 'bolt-new'
+            db.session.commit()
+
+            old = CSVProcessor(bolt_csv([('Inna nazwa', 'test-bolt-456', 100)]), "zarobki_01_01_2024.csv").process()
+            new = CSVProcessor(bolt_csv([('Inna nazwa', 'bolt-new', 120)]), "zarobki_02_01_2024.csv").process()
+
+            assert (old['created'], new['created']) == (1, 1)
+            records = BoltEarnings.query.filter_by(user_id=driver_user.id).order_by(BoltEarnings.report_date).all()
+            assert [record.bolt_id for record in records] == ['test-bolt-456', 'bolt-new']
+
+    def test_several_accounts_per_driver(self, app, driver_user):
+        """TEST: Dwa konta Bolt kierowcy w jednym pliku - ten sam kierowca, ostatni wiersz wygrywa"""
+        from app import db
+        from app.models import DriverPlatformAccount
+
+        with app.app_context():
+            db.session.add(DriverPlatformAccount(
+                platform='bolt', external_id='bolt-second', user_id=driver_user.id, valid_from=date(2023, 1, 1)
+            ))
+            db.session.commit()
+
+            result = CSVProcessor(
+                bolt_csv([('a', 'test-bolt-456', 100), ('b', 'bolt-second', 90)]), "zarobki_01_01_2024.csv"
+            ).process()
+
+            assert (result['created'], result['updated'], result['skipped']) == (1, 1, 0)
+            assert float(BoltEarnings.query.one().net_income) == 90.0
@@ -0,0 +1,299 @@
+"""
+Testy zapytań dla widoku zarobków kierowcy (sumy liczone przez bazę)
+"""
+from datetime import date
+from decimal import Decimal
+from app import db, earnings, rollups
+from app.models import BoltEarnings, UberEarnings, Expense
+
+#dzienne zarobki Bolt po 0.10 zł netto (kwota, która nie sumuje się dokładnie na float)
+DAILY = {'gross': 0.12, 'net': 0.10, 'cash': 0.03, 'vat': 0.01}
+START = date(2025, 1, 1)
+
+
+class TestTotals:
+    """Testy sum w zakresie dat"""
+
+    def test_totals_without_rows_are_zero(self, app, driver_user):
+        """
+        TEST: Kierowca bez wpisów -> wszystkie sumy równe 0 (Decimal)
+        """
+        with app.app_context():
+            bolt = earnings.totals(BoltEarnings, driver_user.id)
+            expenses = earnings.totals(Expense, driver_user.id)
+
+        assert bolt == {'gross': 0, 'cash': 0, 'vat': 0, 'actual': 0}
+        assert set(expenses) == {'net', 'vat', 'vat_deductible', 'deductible'}
+        assert all(isinstance(value, Decimal) for value in bolt.values())
+
+    def test_totals_are_exact_decimals(self, app, driver_user, fleet_factory):
+        """
+        TEST: Suma wielu kwot groszowych jest dokładna (bez błędów zaokrągleń float)
+        """
+        with app.app_context():
+            fleet_factory.bolt_days(driver_user, START, days=30, **DAILY)
+            bolt = earnings.totals(BoltEarnings, driver_user.id)
+
+        assert bolt['gross'] == Decimal('3.00') # zarobek Bolt = zarobki netto
+        assert bolt['cash'] == Decimal('0.90')
+        assert bolt['vat'] == Decimal('0.30')
+        assert bolt['actual'] == Decimal('2.70')
+
+    def test_totals_respect_date_range_and_driver(self, app, driver_user, admin_user, fleet_factory):
+        """
+        TEST: Sumy obejmują tylko wpisy kierowcy z wybranego zakresu dat (włącznie)
+        """
+        with app.app_context():
+            fleet_factory.bolt_days(driver_user, START, days=10, **DAILY)
+            db.session.add(UberEarnings(
+                user_id=admin_user.id, uber_id='other', report_date=date(2025, 1, 5),
+                gross_total=500, net_income=400, cash_collected=0, vat_due=40, actual_income=460
+            ))
+            db.session.commit()
+            rollups.rebuild()
+
+            bolt = earnings.totals(BoltEarnings, driver_user.id, '2025-01-03', '2025-01-07')
+            uber = earnings.totals(UberEarnings, driver_user.id)
+
+        assert bolt['gross'] == Decimal('0.50') # 5 dni po 0.10
+        assert uber['gross'] == 0
+
+
+class TestPage:
+    """Testy pobierania wpisów do wyświetlenia"""
+
+    def test_page_returns_newest_rows_up_to_limit(self, app, driver_user, fleet_factory):
+        """
+        TEST: Pobierane są tylko najnowsze wpisy (limit), od najnowszej daty
+        """
+        with app.app_context():
+            fleet_factory.bolt_days(driver_user, START, days=10, **DAILY)
+            rows, next_cursor = earnings.page(BoltEarnings, driver_user.id, limit=3)
+
+            assert [row.report_date.day for row in rows] == [10, 9, 8]
+            assert next_cursor == f"2025-01-08.{rows[-1].id}"
+
+    def test_page_cursor_walks_all_rows_once(self, app, driver_user, fleet_factory):
+        """
+        TEST: Kolejne strony (kursor) obejmują każdy wpis dokładnie raz, także przy kilku wpisach z tą samą datą
+        """
+        with app.app_context():
+            fleet_factory.bolt_days(driver_user, START, days=7, **DAILY)
+            #faktury z tego samego dnia - kolejność rozstrzyga id
+            for number in range(5):
+                db.session.add(Expense(
+                    user_id=driver_user.id, document_number=f'FV/{number}', description='Paliwo',
+                    issue_date=date(2025, 1, 1), net_amount=100, vat_amount=23, vat_deductible=11.5, deductible_amount=75
+                ))
+            db.session.commit()
+
+            for Model, expected in ((BoltEarnings, 7), (Expense, 5)):
+                seen, after = [], None
+                while True:
+                    rows, next_cursor = earnings.page(Model, driver_user.id, limit=2, after=after)
+                    seen.extend(row.id for row in rows)
+                    if next_cursor is None:
+                        break
+                    after = earnings.parse_cursor(next_cursor)
+
+                assert len(seen) == expected
+                assert len(set(seen)) == expected
+
+    def test_parse_cursor_ignores_invalid_values(self):
+        """
+        TEST: Pusty lub błędny kursor = pierwsza strona
+        """
+        assert earnings.parse_cursor('2025-01-08.15') == (date(2025, 1, 8), 15)
+        assert earnings.parse_cursor(None) is None
+        assert earnings.parse_cursor('') is None
+        assert earnings.parse_cursor('2025-13-01.1') is None
+        assert earnings.parse_cursor('abc') is None
+
+    def test_stream_yields_all_rows(self, app, driver_user, fleet_factory):
+        """
+        TEST: Strumień zwraca wszystkie wpisy z zakresu (od najnowszej daty)
+        """
+        with app.app_context():
+            fleet_factory.bolt_days(driver_user, START, days=12, **DAILY)
+            rows = list(earnings.stream(BoltEarnings, driver_user.id, '2025-01-03', None, batch_size=5))
+
+            assert len(rows) == 10
+            assert rows[0].report_date == date(2025, 1, 12)
+
+
+class TestTimeline:
+    """Testy dziennej osi czasu (Bolt, Uber i faktury w jednym zapytaniu)"""
+
+    def test_timeline_merges_platforms_by_day(self, app, driver_user, fleet_factory):
+        """
+        TEST: Wpisy z trzech tabel z tego samego dnia są w jednym wierszu, brakujące wartości = 0
+        """
+        with app.app_context():
+            fleet_factory.bolt_days(driver_user, START, days=2, **DAILY)
+            db.session.add(UberEarnings(
+                user_id=driver_user.id, uber_id=driver_user.uber_id, report_date=date(2025, 1, 2),
+                gross_total=50, net_income=40, cash_collected=10, vat_due=4, actual_income=46
+            ))
+            db.session.add(Expense(
+                user_id=driver_user.id, document_number='FV/1', description='Paliwo', issue_date=date(2025, 1, 3),
+                net_amount=100, vat_amount=23, vat_deductible=11.5, deductible_amount=75
+            ))
+            db.session.commit()
+            rollups.rebuild()
+
+            rows = earnings.timeline(driver_user.id)
+
+        assert [row['day'] for row in rows] == [date(2025, 1, 1), date(2025, 1, 2), date(2025, 1, 3)]
+        assert rows[0]['bolt_gross'] == Decimal('0.10')
+        assert rows[0]['uber_gross'] == 0
+        assert rows[1]['bolt_gross'] == Decimal('0.10')
+        assert rows[1]['uber_gross'] == Decimal('50.00')
+        assert rows[2]['bolt_gross'] == 0
+        assert rows[2]['expenses_vat_deductible'] == Decimal('11.50')
+
+    def test_timeline_respects_date_range(self, app, driver_user, fleet_factory):
+        """
+        TEST: Oś czasu obejmuje tylko dni z wybranego zakresu
+        """
+        with app.app_context():
+            fleet_factory.bolt_days(driver_user, START, days=10, **DAILY)
+            rows = earnings.timeline(driver_user.id, date(2025, 1, 4), date(2025, 1, 6))
+
+        assert [row['day'].day for row in rows] == [4, 5, 6]
+
+    def test_timeline_endpoint_returns_columns(self, client, admin_user, driver_user, fleet_factory):
+        """
+        TEST: Endpoint JSON zwraca dni i serie wartości (układ kolumnowy)
+        """
+        with client.application.app_context():
+            fleet_factory.bolt_days(driver_user, START, days=3, **DAILY)
+
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        response = client.get(f'/admin/driver/{driver_user.id}/timeline.json?date_from=2025-01-01&date_to=2025-01-31')
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['days'] == ['2025-01-01', '2025-01-02', '2025-01-03']
+        assert data['bolt_gross'] == [0.1, 0.1, 0.1]
+        assert data['uber_gross'] == [0, 0, 0]
+        assert set(earnings.TIMELINE_KEYS) <= set(data)
+
+    def test_timeline_endpoint_rejects_invalid_date(self, client, admin_user, driver_user):
+        """
+        TEST: Błędna data w parametrach -> 400
+        """
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        response = client.get(f'/admin/driver/{driver_user.id}/timeline.json?date_to=abc')
+
+        assert response.status_code == 400
+
+
+class TestRangeTotals:
+    """Testy sum z zakresu liczonych z sum narastających"""
+
+    def test_range_totals_match_direct_sum(self, app, driver_user, fleet_factory):
+        """
+        TEST: Różnica sum narastających = suma wpisów z zakresu (także gdy granice wypadają w dni bez wpisów)
+        """
+        with app.app_context():
+            fleet_factory.bolt_days(driver_user, date(2025, 1, 1), days=20, **DAILY)
+            fleet_factory.bolt_days(driver_user, date(2025, 3, 1), days=5, **DAILY)
+
+            for date_from, date_to, expected in (
+                ('2025-01-05', '2025-01-10', '0.60'),
+                ('2024-12-01', '2025-01-31', '2.00'),  #granice bez wpisów
+                ('2025-02-01', '2025-02-28', '0.00'),  #zakres bez wpisów
+                ('2025-01-20', '2025-03-02', '0.30'),
+                ('', '', '2.50'),
+                ('2025-01-10', '2025-01-05', '0.00'),  #odwrócony zakres
+            ):
+                assert earnings.range_totals(driver_user.id, date_from, date_to)['bolt_gross'] == Decimal(expected)
+
+
+class TestSeries:
+    """Testy osi czasu w rozdzielczości dobranej do zakresu"""
+
+    def test_pick_resolution_by_range_length(self):
+        """
+        TEST: Do roku - dni, do 10 lat - miesiące, dłużej - lata
+        """
+        assert earnings.pick_resolution(date(2025, 1, 1), date(2025, 12, 31)) == 'day'
+        assert earnings.pick_resolution(date(2024, 1, 1), date(2025, 12, 31)) == 'month'
+        assert earnings.pick_resolution(date(2016, 1, 1), date(2025, 12, 31)) == 'month'
+        assert earnings.pick_resolution(date(2015, 12, 1), date(2025, 12, 31)) == 'year'
+
+    def test_monthly_series_clips_edge_months(self, app, driver_user, fleet_factory):
+        """
+        TEST: Miesiące w całości w zakresie z zestawień miesięcznych, brzegowe - tylko dni z zakresu
+        """
+        with app.app_context():
+            fleet_factory.bolt_days(driver_user, date(2025, 1, 1), days=90, **DAILY)  #styczeń - marzec
+
+            resolution, rows = earnings.series(driver_user.id, date(2025, 1, 11), date(2025, 3, 5), 'month')
+
+        assert resolution == 'month'
+        assert [row['day'] for row in rows] == [date(2025, 1, 11), date(2025, 2, 1), date(2025, 3, 1)]
+        assert [row['bolt_gross'] for row in rows] == [Decimal('2.10'), Decimal('2.80'), Decimal('0.50')]
+
+    def test_yearly_series_matches_range_totals(self, app, driver_user, fleet_factory):
+        """
+        TEST: Suma okresów osi rocznej = suma z całego zakresu
+        """
+        with app.app_context():
+            fleet_factory.bolt_days(driver_user, date(2023, 12, 20), days=30, **DAILY)
+            fleet_factory.bolt_days(driver_user, date(2025, 6, 1), days=10, **DAILY)
+
+            resolution, rows = earnings.series(driver_user.id, date(2013, 1, 1), date(2025, 6, 5))
+            expected = earnings.range_totals(driver_user.id, date(2013, 1, 1), date(2025, 6, 5))
+
+        assert resolution == 'year'
+        assert [row['day'] for row in rows] == [date(2023, 1, 1), date(2024, 1, 1), date(2025, 1, 1)]
+        assert sum(row['bolt_gross'] for row in rows) == expected['bolt_gross'] == Decimal('3.50')
+
+    def test_timeline_endpoint_uses_coarser_resolution(self, client, admin_user, driver_user, fleet_factory):
+        """
+        TEST: Endpoint JSON dla wieloletniego zakresu zwraca punkty miesięczne
+        """
+        with client.application.app_context():
+            fleet_factory.bolt_days(driver_user, date(2025, 1, 1), days=40, **DAILY)
+
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        data = client.get(f'/admin/driver/{driver_user.id}/timeline.json?date_from=2023-01-01&date_to=2025-12-31').get_json()
+        invalid = client.get(f'/admin/driver/{driver_user.id}/timeline.json?resolution=week')
+
+        assert data['resolution'] == 'month'
+        assert data['days'] == ['2025-01-01', '2025-02-01']
+        assert data['bolt_gross'] == [3.1, 0.9]
+        assert invalid.status_code == 400
+
+
+class TestMonthlyVat:
+    """Testy miesięcznego zestawienia VAT"""
+
+    def test_monthly_vat_per_driver(self, client, admin_user, driver_user, fleet_factory):
+        """
+        TEST: Zestawienie VAT ma wiersz na kierowcę i miesiąc, saldo = VAT należny - VAT do odliczenia
+        """
+        with client.application.app_context():
+            fleet_factory.bolt_days(driver_user, date(2025, 1, 1), days=40, **DAILY)
+            db.session.add(Expense(
+                user_id=driver_user.id, document_number='FV/1', description='Paliwo', issue_date=date(2025, 2, 3),
+                net_amount=100, vat_amount=23, vat_deductible=11.5, deductible_amount=75
+            ))
+            db.session.flush()
+            rollups.refresh([(driver_user.id, date(2025, 2, 3))])
+            db.session.commit()
+
+            rows = earnings.monthly_vat(2025)
+
+        assert [(row['username'], row['month']) for row in rows] == [
+            ('testdriver', date(2025, 1, 1)), ('testdriver', date(2025, 2, 1)),
+        ]
+        assert rows[0]['vat_due'] == Decimal('0.31')
+        assert rows[1]['vat_deductible'] == Decimal('11.50')
+        assert rows[1]['vat_balance'] == Decimal('0.09') - Decimal('11.50')
+
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        response = client.get('/admin/vat-monthly?year=2025')
+        assert response.status_code == 200
+        assert '02.2025' in response.get_data(as_text=True)
@@ -0,0 +1,184 @@
+"""
+Testy eksportu rozliczeń i zarobków (CSV / XLSX, strumieniowo)
+"""
+import csv
+import io
+import zipfile
+import xml.etree.ElementTree as ET
+from datetime import date
+from decimal import Decimal
+from app import db, exports, settlements
+from app.models import WeeklyReport
+
+
+WEEK = (date(2025, 1, 6), date(2025, 1, 12))
+SHEET_NS = {'s': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+
+
+def read_csv(content):
+    """Wiersze CSV eksportu (bez BOM)"""
+    return list(csv.reader(io.StringIO(content.decode('utf-8-sig')), delimiter=';'))
+
+
+def read_xlsx(content):
+    """Wiersze arkusza XLSX eksportu jako listy tekstów komórek"""
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        assert {'[Content_Types].xml', 'xl/workbook.xml', 'xl/worksheets/sheet1.xml'} <= set(archive.namelist())
+        sheet = ET.fromstring(archive.read('xl/worksheets/sheet1.xml'))
+    return [
+        [''.join(cell.itertext()) for cell in row.findall('s:c', SHEET_NS)]
+        for row in sheet.findall('s:sheetData/s:row', SHEET_NS)
+    ]
+
+
+class TestStreams:
+    """Testy zapisu plików kawałkami"""
+
+    def test_csv_is_written_in_batches(self, monkeypatch):
+        """
+        TEST: CSV jest wysyłany kawałkami co BATCH_SIZE wierszy, a cały plik zawiera wszystkie wiersze
+        """
+        monkeypatch.setattr(exports, 'BATCH_SIZE', 10)
+
+        chunks = list(exports.stream_csv(('a', 'b'), ((i, Decimal('1.5')) for i in range(25))))
+
+        assert len(chunks) == 3
+        rows = read_csv(b''.join(chunks))
+        assert rows[0] == ['a', 'b']
+        assert rows[-1] == ['24', '1.50']
+        assert len(rows) == 26
+
+    def test_xlsx_starts_before_rows_are_read(self):
+        """
+        TEST: Pierwszy kawałek XLSX powstaje, zanim zostanie odczytany pierwszy wiersz danych
+        """
+        consumed = []
+
+        def data():
+            for i in range(3):
+                consumed.append(i)
+                yield (f'kierowca <{i}>', Decimal('10.50'), date(2025, 1, i + 1))
+
+        stream = exports.stream_xlsx(('kierowca', 'kwota', 'dzien'), data())
+        first = next(stream)
+
+        assert first.startswith(b'PK')
+        assert consumed == []
+        rows = read_xlsx(first + b''.join(stream))
+        assert rows[0] == ['kierowca', 'kwota', 'dzien']
+        assert rows[1] == ['kierowca <0>', '10.50', '2025-01-01']
+        assert len(rows) == 4
+
+
+class TestExportRoute:
+    """Testy endpointu eksportu"""
+
+    def test_settlements_csv(self, client, admin_user, driver_user, fleet_factory):
+        """
+        TEST: Eksport rozliczeń CSV zawiera raport kierowcy z kwotą do wypłaty
+        """
+        with client.application.app_context():
+            fleet_factory.bolt_days(driver_user, WEEK[0], days=7, net=100, vat=8)
+            settlements.generate(*WEEK)
+
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        response = client.get('/admin/export?kind=settlements&format=csv&date_from=2025-01-06&date_to=2025-01-12')
+
+        assert response.status_code == 200
+        assert response.is_streamed
+        assert 'settlements_2025-01-06_2025-01-12.csv' in response.headers['Content-Disposition']
+        header, row = read_csv(response.data)
+        assert dict(zip(header, row))['kierowca'] == 'testdriver'
+        assert dict(zip(header, row))['final_amount'] == '644.00'
+
+    def test_bank_layout(self, client, admin_user, driver_user, fleet_factory):
+        """
+        TEST: Lista przelewów: odbiorca, rachunek, kwota i tytuł; raporty bez kwoty do wypłaty są pominięte
+        """
+        with client.application.app_context():
+            db.session.get(type(driver_user), driver_user.id).bank_account = 'PL61109010140000071219812874'
+            db.session.commit()
+            fleet_factory.bolt_days(driver_user, WEEK[0], days=7, net=100, vat=8)
+            settlements.generate(*WEEK)
+
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        rows = read_csv(client.get('/admin/export?kind=bank&date_from=2025-01-01&date_to=2025-01-31').data)
+        empty = read_csv(client.get('/admin/export?kind=bank&date_from=2025-02-01&date_to=2025-02-28').data)
+
+        assert rows == [
+            ['nazwa_odbiorcy', 'rachunek_odbiorcy', 'kwota', 'tytul'],
+            ['testdriver', 'PL61109010140000071219812874', '644.00', 'Wypłata - Tydzień 2/2025'],
+        ]
+        assert len(empty) == 1
+
+    def test_earnings_xlsx(self, client, admin_user, driver_user, fleet_factory):
+        """
+        TEST: Eksport zarobków dziennych XLSX ma wiersz na kierowcę i dzień
+        """
+        with client.application.app_context():
+            fleet_factory.bolt_days(driver_user, WEEK[0], days=7, net=100, vat=8)
+            settlements.generate(*WEEK)
+
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        response = client.get('/admin/export?kind=earnings&format=xlsx&date_from=2025-01-06&date_to=2025-01-08')
+
+        assert response.mimetype == exports.FORMATS['xlsx']
+        rows = read_xlsx(response.data)
+        assert rows[0][:3] == ['kierowca', 'dzien', 'bolt_gross']
+        assert [row[1] for row in rows[1:]] == ['2025-01-06', '2025-01-07', '2025-01-08']
+        assert rows[1][2] == '100.00'
+
+    def test_invalid_parameters(self, client, admin_user):
+        """
+        TEST: Nieznany rodzaj / format lub błędna data -> 400
+        """
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+
+        assert client.get('/admin/export?kind=all&date_from=2025-01-01&date_to=2025-01-31').status_code == 400
+        assert client.get('/admin/export?format=pdf&date_from=2025-01-01&date_to=2025-01-31').status_code == 400
+        assert client.get('/admin/export?date_from=abc&date_to=2025-01-31').status_code == 400
+
+    def test_stale_report_blocks_bank_export(self, client, admin_user, driver_user, fleet_factory):
+        """
+        TEST: Nieaktualny raport w zakresie -> 400 z prośbą o przeliczenie, kwota nie trafia do pliku przelewów
+        """
+        with client.application.app_context():
+            fleet_factory.bolt_days(driver_user, WEEK[0], days=7, net=100, vat=8)
+            settlements.generate(*WEEK)
+            db.session.execute(db.update(WeeklyReport).values(is_stale=True))
+            db.session.commit()
+
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        response = client.get('/admin/export?kind=bank&date_from=2025-01-01&date_to=2025-01-31')
+        earnings = client.get('/admin/export?kind=earnings&date_from=2025-01-01&date_to=2025-01-31')
+
+        assert response.status_code == 400
+        assert 'recompute-reports' in response.data.decode('utf-8')
+        assert b'644.00' not in response.data
+        assert earnings.status_code == 200
+
+        with client.application.app_context():
+            settlements.recompute()
+        rows = read_csv(client.get('/admin/export?kind=bank&date_from=2025-01-01&date_to=2025-01-31').data)
+        assert rows[1][2] == '644.00'
+
+
+class TestExportCommand:
+    """Testy komendy flask export"""
+
+    def test_stale_report_blocks_export(self, app, runner, driver_user, fleet_factory):
+        """
+        TEST: Nieaktualny raport w zakresie -> komunikat błędu zamiast pliku
+        """
+        with app.app_context():
+            fleet_factory.bolt_days(driver_user, WEEK[0], days=7, net=100, vat=8)
+            settlements.generate(*WEEK)
+            db.session.execute(db.update(WeeklyReport).values(is_stale=True))
+            db.session.commit()
+            from app.commands import export
+
+        result = runner.invoke(export, ['settlements', '2025-01-06', '2025-01-12'])
+
+        assert result.exit_code == 1
+        assert 'recompute-reports' in result.output
+        assert 'testdriver' not in result.output
@@ -0,0 +1,142 @@
+"""
+Testy listy kierowców w panelu administratora (statystyki, wyszukiwanie, sortowanie, stronicowanie)
+"""
+from datetime import date
+from decimal import Decimal
+from sqlalchemy import event
+from app import db, fleet
+from app.models import WeeklyReport
+
+
+TODAY = date(2025, 1, 15) #środa, tydzień od 13.01
+
+
+class TestDriverList:
+    """Testy fleet.driver_list"""
+
+    def test_stats_in_single_query(self, app, fleet_factory):
+        """
+        TEST: Ostatni dzień, zarobek tygodnia i VAT do przeniesienia są liczone jednym zapytaniem
+        """
+        with app.app_context():
+            anna = fleet_factory.driver('anna', bolt_id='bolt-anna')
+            fleet_factory.driver('bartek')
+            fleet_factory.bolt_days(anna, date(2025, 1, 10), net=300) #poprzedni tydzień
+            fleet_factory.bolt_days(anna, date(2025, 1, 13), net=100)
+            fleet_factory.bolt_days(anna, date(2025, 1, 14), net=50)
+            fleet_factory.bolt_days(anna, date(2025, 1, 20), net=500) #następny tydzień (np. w raporcie dla daty z przeszłości)
+            db.session.add(WeeklyReport(
+                user_id=anna.id, report_name='Tydzień 2/2025',
+                date_from=date(2025, 1, 6), date_to=date(2025, 1, 12), vat_carryover=Decimal('-12.50')
+            ))
+            db.session.commit()
+
+            statements = []
+            listener = lambda *args: statements.append(args[2])
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                drivers, total = fleet.driver_list(today=TODAY)
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', listener)
+
+            assert len(statements) == 1
+            assert total == 2
+            assert [driver['username'] for driver in drivers] == ['anna', 'bartek']
+            assert drivers[0]['last_day'] == date(2025, 1, 20)
+            assert drivers[0]['week_gross'] == Decimal('150')
+            assert drivers[0]['carryover'] == Decimal('-12.50')
+            assert drivers[1]['last_day'] is None
+            assert drivers[1]['week_gross'] == 0
+            assert drivers[1]['carryover'] == 0
+
+    def test_search(self, app, fleet_factory):
+        """
+        TEST: Wyszukiwanie po fragmencie nazwy, Uber ID lub Bolt ID (bez rozróżniania wielkości liter)
+        """
+        with app.app_context():
+            fleet_factory.driver('anna', uber_id='uber-a1')
+            fleet_factory.driver('bartek', bolt_id='BOLT-B2')
+            fleet_factory.driver('celina')
+            db.session.commit()
+
+            assert [d['username'] for d in fleet.driver_list(search='ART')[0]] == ['bartek']
+            assert [d['username'] for d in fleet.driver_list(search='a1')[0]] == ['anna']
+            assert [d['username'] for d in fleet.driver_list(search='bolt-b')[0]] == ['bartek']
+            assert fleet.driver_list(search='xyz') == ([], 0)
+
+    def test_search_wildcards_are_literal(self, app, fleet_factory):
+        """
+        TEST: Znaki % i _ w wyszukiwaniu są zwykłymi znakami, nie symbolami wieloznacznymi
+        """
+        with app.app_context():
+            fleet_factory.driver('anna_k')
+            fleet_factory.driver('annak')
+            fleet_factory.driver('bartek', bolt_id='100%-bolt')
+            db.session.commit()
+
+            assert [d['username'] for d in fleet.driver_list(search='a_k')[0]] == ['anna_k']
+            assert [d['username'] for d in fleet.driver_list(search='%')[0]] == ['bartek']
+            assert fleet.driver_list(search='an%k') == ([], 0)
+
+    def test_sort_and_pages(self, app, fleet_factory):
+        """
+        TEST: Sortowanie malejąco po zarobku tygodnia i stronicowanie z liczbą wszystkich kierowców
+        """
+        with app.app_context():
+            for index, gross in enumerate([40, 10, 30, 20]):
+                driver = fleet_factory.driver(f'kierowca{index}', bolt_id=f'bolt-{index}')
+                fleet_factory.bolt_days(driver, TODAY, net=gross)
+
+            first, total = fleet.driver_list(sort='week_gross', descending=True, per_page=3, today=TODAY)
+            second, _ = fleet.driver_list(sort='week_gross', descending=True, page=2, per_page=3, today=TODAY)
+
+            assert total == 4
+            assert [d['week_gross'] for d in first] == [40, 30, 20]
+            assert [d['week_gross'] for d in second] == [10]
+            assert fleet.driver_list(page=3, per_page=3, today=TODAY) == ([], 4)
+
+
+    def test_sort_by_displayed_carryover(self, app, fleet_factory):
+        """
+        TEST: Sortowanie po VAT do przeniesienia według wyświetlanej wartości min(kwota, 0)
+        """
+        with app.app_context():
+            for username, carryover in (('anna', '25.00'), ('bartek', '-10.00'), ('celina', '5.00'), ('dawid', '-30.00')):
+                driver = fleet_factory.driver(username)
+                db.session.add(WeeklyReport(
+                    user_id=driver.id, report_name='Tydzień 2/2025',
+                    date_from=date(2025, 1, 6), date_to=date(2025, 1, 12), vat_carryover=Decimal(carryover)
+                ))
+            db.session.commit()
+
+            drivers, _ = fleet.driver_list(sort='carryover', today=TODAY)
+
+            assert [(d['username'], d['carryover']) for d in drivers] == [
+                ('dawid', Decimal('-30.00')), ('bartek', Decimal('-10.00')), ('anna', 0), ('celina', 0)
+            ]
+
+
+class TestDashboardList:
+    """Testy listy kierowców na dashboardzie"""
+
+    def test_dashboard_shows_stats_and_pages(self, client, admin_user, monkeypatch, fleet_factory):
+        """
+        TEST: Dashboard pokazuje statystyki kierowców, wyszukiwanie i nawigację między stronami
+        """
+        from app.blueprints.admin import routes
+        monkeypatch.setattr(routes, 'DASHBOARD_PAGE_SIZE', 2)
+        with client.application.app_context():
+            for index in range(3):
+                fleet_factory.driver(f'kierowca{index}')
+
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        first = client.get('/admin/dashboard').data.decode('utf-8')
+        last = client.get('/admin/dashboard?page=2').data.decode('utf-8')
+        found = client.get('/admin/dashboard?q=kierowca2').data.decode('utf-8')
+
+        assert 'Zarobek w tym tygodniu' in first
+        assert 'VAT do przeniesienia' in first
+        assert 'Strona 1 z 2' in first
+        assert 'kierowca1' in first and 'kierowca2' not in first
+        assert 'kierowca2' in last
+        assert 'Kierowców: 1' in found
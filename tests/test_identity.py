@@ -0,0 +1,145 @@
+"""
+Testy pamięci tożsamości zalogowanych użytkowników (load_user)
+"""
+from sqlalchemy import event
+from app import db
+from app.identity import UserSnapshot, user_cache
+from app.models import User
+
+
+def user_selects(app, action):
+    """Liczba zapytań SELECT do tabeli user wykonanych przez action()"""
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        action()
+    finally:
+        with app.app_context():
+            event.remove(db.engine, 'before_cursor_execute', listener)
+    return sum(1 for sql in statements if sql.lstrip().upper().startswith('SELECT') and 'FROM user' in sql)
+
+
+def get(app, client, url):
+    """
+    Żądanie GET we własnym kontekście aplikacji - pytest-flask trzyma kontekst przez cały test,
+    więc żądania współdzieliłyby g, a w nim użytkownika wczytanego już przez Flask-Login
+    """
+    with app.app_context():
+        return client.get(url)
+
+
+class TestUserCache:
+    """Testy pamięci tożsamości"""
+
+    def test_identity_is_loaded_once(self, app, client, fleet_factory):
+        """
+        TEST: Kolejne żądania zalogowanego kierowcy nie pobierają użytkownika z bazy
+        """
+        with app.app_context():
+            driver_id = fleet_factory.driver('testdriver', uber_id='test-uber-123', bolt_id='test-bolt-456').id
+        client.post('/login', data={'username': 'testdriver', 'password': 'driver123'})
+        get(app, client, '/driver/dashboard')
+
+        count = user_selects(app, lambda: [get(app, client, '/driver/dashboard') for _ in range(3)])
+
+        assert count == 0
+        with app.app_context():
+            snapshot = user_cache().get(driver_id)
+        assert isinstance(snapshot, UserSnapshot)
+        assert (snapshot.role, snapshot.uber_id, snapshot.bolt_id) == ('driver', 'test-uber-123', 'test-bolt-456')
+
+    def test_edit_invalidates_identity(self, app, client, fleet_factory):
+        """
+        TEST: Zmiana roli użytkownika jest widoczna przy następnym żądaniu (mimo ważnego wpisu)
+        """
+        with app.app_context():
+            driver_id = fleet_factory.driver('testdriver', uber_id='test-uber-123', bolt_id='test-bolt-456').id
+        client.post('/login', data={'username': 'testdriver', 'password': 'driver123'})
+        assert get(app, client, '/driver/dashboard').status_code == 200
+
+        with app.app_context():
+            db.session.get(User, driver_id).role = 'admin'
+            db.session.commit()
+
+        assert get(app, client, '/driver/dashboard').status_code == 302
+        assert get(app, client, '/admin/dashboard').status_code == 200
+
+    def test_deleted_user_is_logged_out(self, app, client, fleet_factory):
+        """
+        TEST: Usunięty użytkownik nie jest już zalogowany
+        """
+        with app.app_context():
+            driver_id = fleet_factory.driver('testdriver', uber_id='test-uber-123', bolt_id='test-bolt-456').id
+        client.post('/login', data={'username': 'testdriver', 'password': 'driver123'})
+
+        with app.app_context():
+            db.session.delete(db.session.get(User, driver_id))
+            db.session.commit()
+
+        response = get(app, client, '/driver/dashboard')
+        assert response.status_code == 302
+        assert '/login' in response.location
+
+    def test_entry_expires(self, app, monkeypatch, fleet_factory):
+        """
+        TEST: Po upływie TTL tożsamość jest pobierana z bazy ponownie
+        """
+        with app.app_context():
+            driver_id = fleet_factory.driver('testdriver', uber_id='test-uber-123', bolt_id='test-bolt-456').id
+        clock = [1000.0]
+        monkeypatch.setattr('app.identity.time.monotonic', lambda: clock[0])
+
+        with app.app_context():
+            cache = user_cache()
+            cache.get(driver_id)
+            db.session.execute(db.update(User).where(User.id == driver_id).values(bolt_id='bolt-new'))
+            db.session.commit()
+
+            assert cache.get(driver_id).bolt_id == 'test-bolt-456'
+            clock[0] += cache.ttl + 1
+            assert cache.get(driver_id).bolt_id == 'bolt-new'
+
+    def test_invalidated_only_after_commit(self, app, fleet_factory):
+        """
+        TEST: Wpis jest usuwany dopiero po commit - po samym flush i po rollback zostaje
+        """
+        with app.app_context():
+            driver_id = fleet_factory.driver('testdriver', uber_id='test-uber-123', bolt_id='test-bolt-456').id
+
+        with app.app_context():
+            cache = user_cache()
+            cache.get(driver_id)
+
+            db.session.get(User, driver_id).role = 'admin'
+            db.session.flush()
+            assert driver_id in cache._entries
+            db.session.rollback()
+            assert cache.get(driver_id).role == 'driver'
+            assert driver_id in cache._entries
+
+            db.session.get(User, driver_id).role = 'admin'
+            db.session.commit()
+            assert driver_id not in cache._entries
+            assert cache.get(driver_id).role == 'admin'
+
+    def test_identity_loaded_before_invalidation_is_not_stored(self, app, monkeypatch, fleet_factory):
+        """
+        TEST: Tożsamość wczytana równolegle z unieważnieniem (stary wiersz) nie trafia do pamięci
+        """
+        with app.app_context():
+            driver_id = fleet_factory.driver('testdriver', uber_id='test-uber-123', bolt_id='test-bolt-456').id
+
+        with app.app_context():
+            cache = user_cache()
+            load = UserSnapshot.load
+
+            def load_during_commit(user_id):
+                snapshot = load(user_id)
+                cache.invalidate(user_id)
+                return snapshot
+
+            monkeypatch.setattr(UserSnapshot, 'load', load_during_commit)
+            assert cache.get(driver_id) is not None
+            assert driver_id not in cache._entries
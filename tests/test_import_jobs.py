@@ -0,0 +1,281 @@
+"""
+Testy kolejki importów CSV (zadania w tle)
+"""
+import os
+import zipfile
+import pytest
+from datetime import datetime, timedelta
+from io import BytesIO
+from werkzeug.datastructures import FileStorage
+from app import db
+from app.models import ImportJob, BoltEarnings
+from app.import_jobs import (
+    enqueue_import, enqueue_batch, claim_next_job, run_import_job, run_worker, import_files,
+    DuplicateImportError, ArchiveLimitError
+)
+
+BOLT_CSV = (
+    "Kierowca,Identyfikator kierowcy,Zarobki netto|ZŁ\n"
+    "testdriver,test-bolt-456,100\n"
+    "Nieznany,X1,50\n"
+).encode('utf-8')
+
+
+def upload(content, filename):
+    """Plik jak z formularza"""
+    return FileStorage(stream=BytesIO(content), filename=filename)
+
+
+class TestImportJobs:
+    """Testy zadań importu"""
+
+    def test_enqueue_spools_file_and_creates_job(self, app):
+        """TEST: Dodanie pliku zapisuje go na dysk i tworzy zadanie w kolejce"""
+        with app.app_context():
+            job = enqueue_import(upload(BOLT_CSV, "zarobki_01_01_2024.csv"), "zarobki_01_01_2024.csv")
+
+            assert job.status == 'queued'
+            assert job.platform == 'bolt'
+            assert os.path.exists(job.file_path)
+
+    def test_enqueue_unknown_platform_raises(self, app):
+        """TEST: Plik nieznanej platformy nie trafia do kolejki"""
+        with app.app_context():
+            with pytest.raises(ValueError):
+                enqueue_import(upload(BOLT_CSV, "plik.csv"), "plik.csv")
+            assert ImportJob.query.count() == 0
+
+    def test_enqueue_already_imported_file_raises(self, app, driver_user):
+        """TEST: Plik już zaimportowany nie trafia ponownie do kolejki (chyba że wymuszono)"""
+        with app.app_context():
+            enqueue_import(upload(BOLT_CSV, "zarobki_01_01_2024.csv"), "zarobki_01_01_2024.csv")
+            run_worker(once=True)
+
+            with pytest.raises(DuplicateImportError):
+                enqueue_import(upload(BOLT_CSV, "zarobki_01_01_2024.csv"), "zarobki_01_01_2024.csv")
+
+            job = enqueue_import(upload(BOLT_CSV, "zarobki_01_01_2024.csv"), "zarobki_01_01_2024.csv", force=True)
+            run_worker(once=True)
+            assert db.session.get(ImportJob, job.id).status == 'done'
+
+    def test_duplicate_queued_twice_is_marked(self, app, driver_user):
+        """TEST: Ten sam plik dodany dwa razy przed importem - drugie zadanie oznaczone jako duplikat"""
+        with app.app_context():
+            first = enqueue_import(upload(BOLT_CSV, "zarobki_01_01_2024.csv"), "zarobki_01_01_2024.csv")
+            second = enqueue_import(upload(BOLT_CSV, "zarobki_01_01_2024.csv"), "zarobki_01_01_2024.csv")
+            run_worker(once=True)
+
+            assert db.session.get(ImportJob, first.id).status == 'done'
+            assert db.session.get(ImportJob, second.id).status == 'duplicate'
+
+    def test_claim_job_only_once(self, app):
+        """TEST: Zadanie może przejąć tylko jeden proces roboczy"""
+        with app.app_context():
+            enqueue_import(upload(BOLT_CSV, "zarobki_01_01_2024.csv"), "zarobki_01_01_2024.csv")
+
+            job = claim_next_job()
+            assert job is not None
+            assert job.status == 'running'
+            assert claim_next_job() is None
+
+    def test_stale_running_job_is_reclaimed(self, app):
+        """TEST: Zadanie porzucone przez proces roboczy (bez znaku życia dłużej niż IMPORT_JOB_TIMEOUT) jest przejmowane ponownie"""
+        with app.app_context():
+            job = enqueue_import(upload(BOLT_CSV, "zarobki_01_01_2024.csv"), "zarobki_01_01_2024.csv")
+            claim_next_job()
+            assert claim_next_job() is None
+
+            job.heartbeat_at = datetime.utcnow() - timedelta(seconds=app.config['IMPORT_JOB_TIMEOUT'] + 1)
+            db.session.commit()
+
+            reclaimed = claim_next_job()
+            assert reclaimed.id == job.id
+            assert reclaimed.status == 'running'
+            assert reclaimed.heartbeat_at > datetime.utcnow() - timedelta(minutes=1)
+            assert claim_next_job() is None
+
+    def test_long_running_job_with_heartbeat_is_not_reclaimed(self, app):
+        """TEST: Długi import z niedawnym znakiem życia (zapisany fragment) nie jest przejmowany przez inny proces"""
+        with app.app_context():
+            job = enqueue_import(upload(BOLT_CSV, "zarobki_01_01_2024.csv"), "zarobki_01_01_2024.csv")
+            claim_next_job()
+
+            job.started_at = datetime.utcnow() - timedelta(seconds=app.config['IMPORT_JOB_TIMEOUT'] * 3)
+            job.heartbeat_at = datetime.utcnow() - timedelta(seconds=5)
+            db.session.commit()
+
+            assert claim_next_job() is None
+
+    def test_run_job_imports_and_reports_progress(self, app, driver_user):
+        """TEST: Wykonanie zadania importuje dane i zapisuje postęp oraz wynik"""
+        with app.app_context():
+            job = enqueue_import(upload(BOLT_CSV, "zarobki_01_01_2024.csv"), "zarobki_01_01_2024.csv")
+            file_path = job.file_path
+
+            assert run_worker(once=True) == 1
+
+            job = db.session.get(ImportJob, job.id)
+            assert job.status == 'done'
+            assert (job.created, job.updated, job.skipped) == (1, 0, 1)
+            assert (job.rows_parsed, job.rows_matched, job.rows_written) == (2, 1, 1)
+            assert job.heartbeat_at >= job.started_at
+            assert BoltEarnings.query.count() == 1
+            assert not os.path.exists(file_path)
+
+    def test_failed_job_stores_error(self, app):
+        """TEST: Błąd importu oznacza zadanie jako failed z komunikatem"""
+        with app.app_context():
+            job = enqueue_import(upload(b"", "zarobki_01_01_2024.csv"), "zarobki_01_01_2024.csv")
+
+            run_import_job(claim_next_job())
+
+            job = db.session.get(ImportJob, job.id)
+            assert job.status == 'failed'
+            assert job.error
+            assert not os.path.exists(job.file_path)
+
+
+def zip_archive(files):
+    """Archiwum ZIP w pamięci z plikami {nazwa: zawartość}"""
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+class TestBatchImport:
+    """Testy importu wielu plików i archiwów ZIP"""
+
+    def test_enqueue_batch_expands_zip(self, app):
+        """TEST: Każdy plik CSV z archiwum ZIP to osobne zadanie w tej samej paczce"""
+        with app.app_context():
+            archive = zip_archive({
+                'wrzesien/zarobki_01_09_2024.csv': BOLT_CSV,
+                'wrzesien/zarobki_02_09_2024.csv': BOLT_CSV,
+                'wrzesien/opis.txt': b'x',
+            })
+            files = [
+                upload(archive, 'wrzesien.zip'),
+                upload(BOLT_CSV, 'zarobki_03_09_2024.csv'),
+                upload(BOLT_CSV, 'nieznany.csv'),
+            ]
+
+            batch_id, jobs, errors = enqueue_batch(files)
+
+            assert [job.filename for job in jobs] == [
+                'zarobki_01_09_2024.csv', 'zarobki_02_09_2024.csv', 'zarobki_03_09_2024.csv'
+            ]
+            assert {job.batch_id for job in jobs} == {batch_id}
+            assert len(errors) == 1
+
+    def test_import_files_in_process_pool(self, app, driver_user, tmp_path):
+        """TEST: Import katalogu i archiwum ZIP - wynik dla każdego pliku"""
+        (tmp_path / 'zarobki_01_09_2024.csv').write_bytes(BOLT_CSV)
+        (tmp_path / 'paczka.zip').write_bytes(zip_archive({'zarobki_02_09_2024.csv': BOLT_CSV + b"Inny,X2,10\n"}))
+
+        with app.app_context():
+            results = import_files([str(tmp_path)], workers=2)
+
+            assert results == {
+                f'{tmp_path}/paczka.zip/zarobki_02_09_2024.csv': {'created': 1, 'updated': 0, 'unchanged': 0, 'skipped': 2, 'platform': 'bolt', 'duplicate': False},
+                f'{tmp_path}/zarobki_01_09_2024.csv': {'created': 1, 'updated': 0, 'unchanged': 0, 'skipped': 1, 'platform': 'bolt', 'duplicate': False},
+            }
+            assert BoltEarnings.query.count() == 2
+
+            results = import_files([str(tmp_path)], workers=2)
+            assert all(result['duplicate'] for result in results.values())
+
+    def test_import_files_same_name_in_order(self, app, driver_user, tmp_path):
+        """TEST: Pliki o tej samej nazwie z różnych katalogów mają osobne wyniki, zapis w kolejności plików"""
+        for folder, amount in (('a', b'100'), ('b', b'200')):
+            (tmp_path / folder).mkdir()
+            (tmp_path / folder / 'zarobki_01_09_2024.csv').write_bytes(BOLT_CSV.replace(b'100', amount))
+
+        with app.app_context():
+            results = import_files([str(tmp_path / 'a'), str(tmp_path / 'b')], workers=2)
+
+            assert list(results) == [f'{tmp_path}/a/zarobki_01_09_2024.csv', f'{tmp_path}/b/zarobki_01_09_2024.csv']
+            assert [result['created'] for result in results.values()] == [1, 0]
+            assert BoltEarnings.query.one().net_income == 200
+
+
+    def test_import_files_rejects_zip_over_limit(self, app, tmp_path, monkeypatch):
+        """TEST: Archiwum ponad limit rozmiaru po rozpakowaniu nie jest rozpakowywane"""
+        monkeypatch.setitem(app.config, 'IMPORT_ZIP_MAX_SIZE', 10)
+        (tmp_path / 'paczka.zip').write_bytes(zip_archive({'zarobki_02_09_2024.csv': BOLT_CSV}))
+
+        with app.app_context():
+            with pytest.raises(ArchiveLimitError):
+                import_files([str(tmp_path)], workers=1)
+
+class TestImportJobRoutes:
+    """Testy widoków zadań importu"""
+
+    def test_upload_creates_job_and_redirects(self, client, admin_user, app):
+        """TEST: Upload pliku dodaje zadanie i przekierowuje na stronę postępu"""
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+
+        response = client.post('/admin/upload-csv', data={
+            'file': (BytesIO(BOLT_CSV), 'zarobki_01_01_2024.csv')
+        }, content_type='multipart/form-data')
+
+        assert response.status_code == 302
+        with app.app_context():
+            job = ImportJob.query.one()
+            assert response.location.endswith(f'/admin/import-jobs/{job.id}')
+
+    def test_job_status_endpoint(self, client, admin_user, app):
+        """TEST: Endpoint z postępem zwraca stan zadania w JSON"""
+        with app.app_context():
+            job = enqueue_import(upload(BOLT_CSV, "zarobki_01_01_2024.csv"), "zarobki_01_01_2024.csv")
+            job_id = job.id
+
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        response = client.get(f'/admin/import-jobs/{job_id}/status')
+
+        assert response.status_code == 200
+        assert response.json['status'] == 'queued'
+        assert response.json['finished'] is False
+
+    def test_upload_many_files_redirects_to_batch(self, client, admin_user, app):
+        """TEST: Upload kilku plików przekierowuje na stronę paczki z podsumowaniem"""
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+
+        response = client.post('/admin/upload-csv', data={
+            'file': [
+                (BytesIO(BOLT_CSV), 'zarobki_01_01_2024.csv'),
+                (BytesIO(BOLT_CSV), 'zarobki_02_01_2024.csv'),
+            ]
+        }, content_type='multipart/form-data')
+
+        assert response.status_code == 302
+        assert '/admin/import-batches/' in response.location
+
+        response = client.get(response.location + '/status')
+        assert len(response.json['jobs']) == 2
+        assert response.json['totals'] == {'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0}
+
+    def test_upload_zip_over_limits_is_rejected(self, client, admin_user, app, monkeypatch):
+        """TEST: Archiwum ponad limit plików lub rozmiaru po rozpakowaniu -> cała paczka odrzucona z błędem formularza"""
+        monkeypatch.setitem(app.config, 'IMPORT_ZIP_MAX_FILES', 1)
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        archive = zip_archive({'zarobki_01_09_2024.csv': BOLT_CSV, 'zarobki_02_09_2024.csv': BOLT_CSV})
+
+        response = client.post('/admin/upload-csv', data={
+            'file': [(BytesIO(BOLT_CSV), 'zarobki_03_09_2024.csv'), (BytesIO(archive), 'wrzesien.zip')]
+        }, content_type='multipart/form-data')
+
+        assert response.status_code == 400
+        assert 'wrzesien.zip: liczba plików CSV w archiwum 2 (limit 1)' in response.data.decode('utf-8')
+        with app.app_context():
+            assert ImportJob.query.count() == 0
+
+        monkeypatch.setitem(app.config, 'IMPORT_ZIP_MAX_FILES', 10)
+        monkeypatch.setitem(app.config, 'IMPORT_ZIP_MAX_SIZE', len(BOLT_CSV))
+        response = client.post('/admin/upload-csv', data={
+            'file': (BytesIO(archive), 'wrzesien.zip')
+        }, content_type='multipart/form-data')
+
+        assert response.status_code == 400
+        assert 'po rozpakowaniu' in response.data.decode('utf-8')
@@ -43,4 +43,134 @@ def test_expense_gross_amount_property(app, driver_user):
     # ACT
     gross = expense.gross_amount
     # ASSERT
-    assert gross == 123.00 # 100 + 23 = 123
\ No newline at end of file
+    assert gross == 123.00 # 100 + 23 = 123
+
+def test_hot_queries_use_indexes(app):
+    """
+    TEST: Sprawdza czy zapytania po kierowcy i dacie korzystają z indeksów (a nie skanują tabeli)
+    """
+    from app import db
+    from sqlalchemy import text
+
+    queries = {
+        'ix_expense_user_issue_date': "SELECT * FROM expense WHERE user_id = 1 AND issue_date BETWEEN '2025-01-01' AND '2025-01-31'",
+        'ix_weekly_report_user_date_to': "SELECT * FROM weekly_report WHERE user_id = 1 ORDER BY date_to DESC LIMIT 1",
+        'ix_bolt_earnings_report_date': "SELECT id FROM bolt_earnings WHERE report_date = '2025-01-01'",
+        'ix_user_bolt_id': "SELECT id FROM user WHERE bolt_id = 'B1'",
+    }
+
+    with app.app_context():
+        for index, sql in queries.items():
+            # ACT
+            plan = ' '.join(row[-1] for row in db.session.execute(text('EXPLAIN QUERY PLAN ' + sql)))
+
+            # ASSERT
+            assert index in plan, plan
+
+def test_get_last_vat_carryovers_batch(app, driver_user):
+    """
+    TEST: VAT do przeniesienia z ostatniego raportu wielu kierowców naraz (Decimal, 0 gdy brak raportu lub dodatni)
+    """
+    from app import db
+    from app.models import WeeklyReport
+    from decimal import Decimal
+
+    with app.app_context():
+        # ARRANGE
+        second = User(username='second', role='driver')
+        third = User(username='third', role='driver')
+        db.session.add_all([second, third])
+        db.session.flush()
+        for user_id, day, carryover in (
+            (driver_user.id, date(2025, 1, 12), Decimal('-5.00')),
+            (driver_user.id, date(2025, 1, 19), Decimal('-12.50')),
+            (second.id, date(2025, 1, 12), Decimal('3.00')),
+        ):
+            db.session.add(WeeklyReport(
+                user_id=user_id, report_name='Tydzień', date_from=day, date_to=day, vat_carryover=carryover
+            ))
+        db.session.commit()
+
+        # ACT
+        carryovers = WeeklyReport.get_last_vat_carryovers([driver_user.id, second.id, third.id])
+        before = WeeklyReport.get_last_vat_carryovers([driver_user.id], before=date(2025, 1, 19))
+
+        # ASSERT
+        assert carryovers == {driver_user.id: Decimal('-12.50'), second.id: Decimal('0'), third.id: Decimal('0')}
+        assert before == {driver_user.id: Decimal('-5.00')} # raport kończący się przed datą
+        assert WeeklyReport.get_last_vat_carryover(driver_user.id) == Decimal('-12.50')
+        assert isinstance(WeeklyReport.get_last_vat_carryover(driver_user.id), Decimal)
+
+def test_platform_accounts_follow_user_ids(app, driver_user):
+    """
+    TEST: Zmiana User.bolt_id zamyka poprzednie konto Bolt i dodaje nowe, powrót otwiera stare konto,
+    a konto innego kierowcy nie może zostać przypisane (unikalne (platform, external_id))
+    """
+    import pytest
+    from app import db
+    from app.models import DriverPlatformAccount
+    from sqlalchemy.exc import IntegrityError
+
+    def accounts(platform):
+        return {
+            account.external_id: account.valid_to is None
+            for account in DriverPlatformAccount.query.filter_by(user_id=driver_user.id, platform=platform)
+        }
+
+    with app.app_context():
+        # ASSERT - konta z fixture (zapis przez ORM)
+        assert accounts('bolt') == {'test-bolt-456': True}
+        assert accounts('uber') == {'test-uber-123': True}
+
+        # ACT - zmiana konta Bolt
+        user = db.session.get(User, driver_user.id)
+        user.bolt_id = 'bolt-new'
+        db.session.commit()
+        assert accounts('bolt') == {'test-bolt-456': False, 'bolt-new': True}
+
+        # ACT - powrót do poprzedniego konta
+        user.bolt_id = 'test-bolt-456'
+        db.session.commit()
+        assert accounts('bolt') == {'test-bolt-456': True, 'bolt-new': False}
+        assert accounts('uber') == {'test-uber-123': True}
+
+        # ACT - konto innego kierowcy
+        other = User(username='drugi', role='driver', bolt_id='bolt-new')
+        db.session.add(other)
+        with pytest.raises(IntegrityError):
+            db.session.commit()
+        db.session.rollback()
+
+def test_platform_account_lookup_uses_index(app):
+    """
+    TEST: Wyszukiwanie konta po (platform, external_id) korzysta z unikalnego indeksu
+    """
+    from app import db
+    from sqlalchemy import text
+
+    with app.app_context():
+        sql = "SELECT user_id FROM driver_platform_account WHERE platform = 'bolt' AND external_id = 'B1'"
+        plan = ' '.join(row[-1] for row in db.session.execute(text('EXPLAIN QUERY PLAN ' + sql)))
+
+        # SQLite nadaje indeksowi ograniczenia UNIQUE własną nazwę
+        assert 'USING INDEX sqlite_autoindex_driver_platform_account' in plan, plan
+        assert '(platform=? AND external_id=?)' in plan, plan
+
+def test_weekly_report_is_stale_server_default(app, driver_user):
+    """
+    TEST: Wstawienie raportu z pominięciem ORM (np. benchmarki, skrypty SQL) bez kolumny is_stale - domyślnie aktualny
+    """
+    from app import db
+    from sqlalchemy import text
+
+    with app.app_context():
+        # ACT
+        db.session.execute(text(
+            "INSERT INTO weekly_report (user_id, report_name, date_from, date_to, generated_at, total_gross, total_cash, "
+            "total_vat_calculated, total_vat, vat_carryover, total_actual, expenses_net, expenses_vat, "
+            "expenses_vat_deductible, expenses_deductible, settlement_fee, contract_fee, fuel_amount, final_amount) "
+            "VALUES (:user_id, 'raport', '2025-01-06', '2025-01-12', '2025-01-13', 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0)"
+        ), {'user_id': driver_user.id})
+
+        # ASSERT
+        assert db.session.execute(text("SELECT is_stale FROM weekly_report")).scalar() == 0
@@ -0,0 +1,153 @@
+"""
+Testy zakładania kont wielu kierowców z pliku CSV
+"""
+import io
+import pytest
+from sqlalchemy.exc import IntegrityError
+from app import db, onboarding
+from app.models import User, DriverPlatformAccount
+
+
+CSV = (
+    "username;password;bolt_id;uber_id\n"
+    "kierowca1;haslo123;bolt-1;\n"
+    "kierowca2;haslo456;;uber-2\n"
+    "kr;haslo789;;\n"
+    "kierowca3;abc;;\n"
+    "kierowca1;haslo000;;\n"
+)
+
+
+class TestReadDrivers:
+    """Testy wczytywania pliku z kierowcami"""
+
+    def test_valid_and_invalid_rows(self):
+        """
+        TEST: Poprawne wiersze są wczytane, błędne (za krótka nazwa / hasło, powtórzenie) opisane numerem wiersza
+        """
+        drivers, errors = onboarding.read_drivers(io.BytesIO(CSV.encode('utf-8')))
+
+        assert drivers == [
+            {'username': 'kierowca1', 'password': 'haslo123', 'bolt_id': 'bolt-1', 'uber_id': None},
+            {'username': 'kierowca2', 'password': 'haslo456', 'bolt_id': None, 'uber_id': 'uber-2'},
+        ]
+        assert [error.split(':')[0] for error in errors] == ['Wiersz 4', 'Wiersz 5', 'Wiersz 6']
+
+    def test_comma_separated_with_bom(self):
+        """
+        TEST: Plik z separatorem ',' i BOM (zapis z Excela), kolumny platform opcjonalne
+        """
+        content = '\ufeffUsername,Password\nkierowca1,haslo123\n'.encode('utf-8')
+
+        drivers, errors = onboarding.read_drivers(io.BytesIO(content))
+
+        assert drivers == [{'username': 'kierowca1', 'password': 'haslo123', 'bolt_id': None, 'uber_id': None}]
+        assert errors == []
+
+    def test_missing_columns(self):
+        """
+        TEST: Brak kolumny password -> ValueError
+        """
+        with pytest.raises(ValueError, match='password'):
+            onboarding.read_drivers(io.BytesIO(b'username;bolt_id\nkierowca1;b-1\n'))
+
+
+class TestImportDrivers:
+    """Testy zakładania kont"""
+
+    def test_creates_accounts_in_process_pool(self, app, driver_user):
+        """
+        TEST: Nowe konta mają hasła sprawdzalne przez check_password, istniejący użytkownik jest pominięty
+        """
+        with app.app_context():
+            drivers = [
+                {'username': f'kierowca{i}', 'password': f'haslo{i}00', 'bolt_id': f'bolt-{i}', 'uber_id': None}
+                for i in range(5)
+            ]
+            drivers.append({'username': 'testdriver', 'password': 'innehaslo', 'bolt_id': None, 'uber_id': None})
+
+            result = onboarding.import_drivers(drivers, workers=2)
+
+            assert result == {'created': 5, 'existing': ['testdriver'], 'errors': []}
+            created = User.query.filter(User.username.like('kierowca%')).order_by(User.username).all()
+            assert [user.bolt_id for user in created] == [f'bolt-{i}' for i in range(5)]
+            assert all(user.role == 'driver' for user in created)
+            assert created[3].check_password('haslo300')
+            assert not created[3].password_needs_rehash()
+            assert User.query.filter_by(username='testdriver').one().check_password('driver123')
+            accounts = DriverPlatformAccount.query.filter(DriverPlatformAccount.external_id.like('bolt-%')).all()
+            assert {(account.external_id, account.user_id) for account in accounts} == {(user.bolt_id, user.id) for user in created}
+
+    def test_platform_id_conflicts(self, app, driver_user):
+        """
+        TEST: Identyfikator innego kierowcy lub powtórzony w pliku -> wiersz pominięty z opisem, pozostałe konta założone
+        """
+        with app.app_context():
+            drivers = [
+                {'username': 'kierowca1', 'password': 'haslo123', 'bolt_id': 'test-bolt-456', 'uber_id': None},
+                {'username': 'kierowca2', 'password': 'haslo123', 'bolt_id': 'bolt-2', 'uber_id': 'uber-2'},
+                {'username': 'kierowca3', 'password': 'haslo123', 'bolt_id': None, 'uber_id': 'uber-2'},
+                {'username': 'kierowca4', 'password': 'haslo123', 'bolt_id': 'bolt-4', 'uber_id': None},
+            ]
+
+            result = onboarding.import_drivers(drivers, workers=1)
+
+            assert result['created'] == 2
+            assert result['errors'] == [
+                'Użytkownik kierowca1: identyfikator bolt test-bolt-456 należy już do innego kierowcy',
+                'Użytkownik kierowca3: identyfikator uber uber-2 powtarza się w pliku',
+            ]
+            assert {user.username for user in User.query.filter(User.username.like('kierowca%'))} == {'kierowca2', 'kierowca4'}
+
+    def test_upload(self, client, admin_user):
+        """
+        TEST: Upload pliku w panelu administratora zakłada konta i wypisuje pominięte wiersze
+        """
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+
+        response = client.post('/admin/import-drivers', data={
+            'file': (io.BytesIO(CSV.encode('utf-8')), 'kierowcy.csv')
+        }, content_type='multipart/form-data')
+
+        html = response.data.decode('utf-8')
+        assert response.status_code == 200
+        assert 'Utworzono konta kierowców: 2' in html
+        assert 'Wiersz 4' in html
+        with client.application.app_context():
+            assert db.session.query(User).filter_by(role='driver').count() == 2
+
+    def test_cli(self, app, runner, tmp_path):
+        """
+        TEST: flask import-drivers zakłada konta z pliku
+        """
+        path = tmp_path / 'kierowcy.csv'
+        path.write_text(CSV, encoding='utf-8')
+        with app.app_context():
+            from app.commands import import_drivers
+
+        result = runner.invoke(import_drivers, [str(path), '--workers', '1'])
+
+        assert result.exit_code == 0
+        assert 'Utworzono konta kierowców: 2' in result.output
+        with app.app_context():
+            assert User.query.filter_by(username='kierowca2').one().uber_id == 'uber-2'
+
+    def test_cli_integrity_error(self, app, runner, tmp_path, monkeypatch):
+        """
+        TEST: Konflikt zapisu (np. równoległe zakładanie kont) -> czytelny komunikat zamiast wyjątku
+        """
+        path = tmp_path / 'kierowcy.csv'
+        path.write_text(CSV, encoding='utf-8')
+
+        def conflict(drivers, workers=None):
+            raise IntegrityError('INSERT', {}, Exception('UNIQUE constraint failed'))
+
+        monkeypatch.setattr(onboarding, 'import_drivers', conflict)
+        with app.app_context():
+            from app.commands import import_drivers
+
+        result = runner.invoke(import_drivers, [str(path), '--workers', '1'])
+
+        assert result.exit_code == 1
+        assert 'należy już do innego kierowcy' in result.output
+        assert not isinstance(result.exception, IntegrityError)
@@ -0,0 +1,268 @@
+"""
+Testy dziennych zestawień kierowców (DriverDailyRollup)
+"""
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO
+from app import db, rollups
+from app.csv_processor import CSVProcessor
+from app.models import BoltEarnings, UberEarnings, Expense, DriverDailyRollup, DriverPeriodRollup
+
+
+BOLT_HEADER = "Kierowca,Identyfikator kierowcy,Zarobki netto|ZŁ,Pobrana gotówka|ZŁ\n"
+UBER_HEADER = ("Identyfikator UUID kierowcy,Imię kierowcy,Nazwisko kierowcy,Wypłacono Ci : Twój przychód,"
+               "Wypłacono Ci : Bilans przejazdu : Wypłaty : Odebrana gotówka\n")
+
+
+def rollup_row(user_id, day):
+    """Wiersz zestawienia kierowcy z danego dnia (lub None)"""
+    return DriverDailyRollup.query.filter_by(user_id=user_id, day=day).one_or_none()
+
+
+class TestRollupMaintenance:
+    """Testy aktualizacji zestawień przy imporcie i dodaniu faktury"""
+
+    def test_import_creates_rollup_for_imported_day(self, app, driver_user):
+        """
+        TEST: Import CSV tworzy wiersz zestawienia dla kierowcy i dnia raportu
+        """
+        with app.app_context():
+            file = BytesIO((BOLT_HEADER + "testdriver,test-bolt-456,100,30\n").encode('utf-8'))
+            CSVProcessor(file, "zarobki_01_01_2025.csv").process()
+
+            row = rollup_row(driver_user.id, date(2025, 1, 1))
+            record = BoltEarnings.query.one()
+
+            assert row.bolt_gross == Decimal('100.00')
+            assert row.bolt_cash == Decimal('30.00')
+            assert row.bolt_vat == record.vat_due
+            assert row.uber_gross == 0
+
+    def test_reimport_and_second_platform_update_same_cell(self, app, driver_user):
+        """
+        TEST: Ponowny import ze zmianą i import drugiej platformy aktualizują ten sam wiersz dnia
+        """
+        with app.app_context():
+            CSVProcessor(BytesIO((BOLT_HEADER + "testdriver,test-bolt-456,100,0\n").encode('utf-8')), "zarobki_01_01_2025.csv").process()
+            CSVProcessor(BytesIO((BOLT_HEADER + "testdriver,test-bolt-456,150,0\n").encode('utf-8')), "zarobki_01_01_2025.csv").process()
+            CSVProcessor(BytesIO((UBER_HEADER + "test-uber-123,Jan,Kowalski,200,-20\n").encode('utf-8')), "payments_20250101.csv").process()
+
+            assert DriverDailyRollup.query.count() == 1
+            row = rollup_row(driver_user.id, date(2025, 1, 1))
+            assert row.bolt_gross == Decimal('150.00')
+            assert row.uber_gross == UberEarnings.query.one().gross_total
+
+    def test_add_expense_updates_rollup(self, client, admin_user, driver_user):
+        """
+        TEST: Dodanie faktury przez formularz aktualizuje zestawienie dnia faktury
+        """
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        client.post('/admin/add-expense', data={
+            'driver_id': driver_user.id,
+            'document_number': 'FV/1',
+            'description': 'Paliwo',
+            'issue_date': date.today().isoformat(),
+            'net_amount': '100.00',
+            'vat_amount': '23.00',
+        })
+
+        with client.application.app_context():
+            assert Expense.query.count() == 1
+            row = rollup_row(driver_user.id, date.today())
+            assert row.expenses_vat_deductible == Decimal('11.50')
+            assert row.expenses_deductible == Decimal('75.00')
+            assert row.bolt_gross == 0
+
+    def test_refresh_removes_cells_without_entries(self, app, driver_user, bolt_earnings):
+        """
+        TEST: Odświeżenie dnia, w którym nie ma już wpisów, usuwa wiersz zestawienia
+        """
+        with app.app_context():
+            rollups.rebuild()
+            assert rollup_row(driver_user.id, bolt_earnings.report_date) is not None
+
+            db.session.delete(db.session.get(BoltEarnings, bolt_earnings.id))
+            rollups.refresh([(driver_user.id, bolt_earnings.report_date)])
+            db.session.commit()
+
+            assert rollup_row(driver_user.id, bolt_earnings.report_date) is None
+
+
+class TestRebuild:
+    """Testy odbudowy zestawień od zera"""
+
+    def test_rebuild_matches_incremental_refresh(self, app, driver_user, bolt_earnings, expense):
+        """
+        TEST: Odbudowa daje te same wartości co odświeżanie przy zapisie
+        """
+        with app.app_context():
+            rollups.refresh([(driver_user.id, bolt_earnings.report_date)])
+            db.session.commit()
+            incremental = rollup_row(driver_user.id, bolt_earnings.report_date)
+            incremental = {key: getattr(incremental, key) for key in ('bolt_gross', 'bolt_vat', 'expenses_vat_deductible')}
+
+            assert rollups.rebuild() == 1
+            rebuilt = rollup_row(driver_user.id, bolt_earnings.report_date)
+
+            assert incremental == {key: getattr(rebuilt, key) for key in incremental}
+            assert rebuilt.bolt_gross == Decimal('800.00') # zarobek Bolt = zarobki netto
+            assert rebuilt.expenses_vat_deductible == Decimal('11.50')
+
+
+def add_bolt(driver, day, net):
+    """Wpis Bolt kierowcy z danego dnia (bez odświeżenia zestawień)"""
+    record = BoltEarnings(
+        user_id=driver.id, bolt_id=driver.bolt_id, report_date=day,
+        gross_total=net, net_income=net, cash_collected=0, vat_due=0, actual_income=net
+    )
+    db.session.add(record)
+    db.session.flush()
+    return record
+
+
+def cumulative(user_id):
+    """{dzień: (bolt_gross, cum_bolt_gross)} z zestawień kierowcy"""
+    rows = DriverDailyRollup.query.filter_by(user_id=user_id).order_by(DriverDailyRollup.day)
+    return {row.day: (row.bolt_gross, row.cum_bolt_gross) for row in rows}
+
+
+class TestCumulativeSums:
+    """Testy sum narastających (suma z zakresu = różnica dwóch wierszy)"""
+
+    def test_new_days_continue_cumulative_sum(self, app, driver_user):
+        """
+        TEST: Kolejne dni dopisują się do sumy narastającej poprzedniego dnia
+        """
+        with app.app_context():
+            for day, net in ((1, 100), (2, 50), (5, 25)):
+                add_bolt(driver_user, date(2025, 1, day), net)
+                rollups.refresh([(driver_user.id, date(2025, 1, day))])
+            db.session.commit()
+
+            assert cumulative(driver_user.id) == {
+                date(2025, 1, 1): (100, 100),
+                date(2025, 1, 2): (50, 150),
+                date(2025, 1, 5): (25, 175),
+            }
+
+    def test_late_change_shifts_later_days(self, app, driver_user):
+        """
+        TEST: Spóźniony wpis i zmiana dnia z przeszłości przesuwają sumy narastające późniejszych dni
+        """
+        with app.app_context():
+            for day, net in ((1, 100), (5, 25)):
+                add_bolt(driver_user, date(2025, 1, day), net)
+            db.session.commit()
+            rollups.rebuild()
+
+            #spóźniony import dnia pomiędzy
+            add_bolt(driver_user, date(2025, 1, 3), 40)
+            rollups.refresh([(driver_user.id, date(2025, 1, 3))])
+            #korekta pierwszego dnia
+            first = BoltEarnings.query.filter_by(report_date=date(2025, 1, 1)).one()
+            first.net_income = 90
+            db.session.flush()
+            rollups.refresh([(driver_user.id, date(2025, 1, 1))])
+            db.session.commit()
+
+            assert cumulative(driver_user.id) == {
+                date(2025, 1, 1): (90, 90),
+                date(2025, 1, 3): (40, 130),
+                date(2025, 1, 5): (25, 155),
+            }
+
+    def test_removed_day_shifts_later_days_back(self, app, driver_user):
+        """
+        TEST: Usunięcie wszystkich wpisów dnia usuwa wiersz i zmniejsza sumy narastające późniejszych dni
+        """
+        with app.app_context():
+            for day, net in ((1, 100), (2, 50), (3, 25)):
+                add_bolt(driver_user, date(2025, 1, day), net)
+            db.session.commit()
+            rollups.rebuild()
+
+            db.session.delete(BoltEarnings.query.filter_by(report_date=date(2025, 1, 2)).one())
+            rollups.refresh([(driver_user.id, date(2025, 1, 2))])
+            db.session.commit()
+
+            assert cumulative(driver_user.id) == {
+                date(2025, 1, 1): (100, 100),
+                date(2025, 1, 3): (25, 125),
+            }
+
+    def test_incremental_matches_rebuild_in_any_order(self, app, driver_user):
+        """
+        TEST: Odświeżanie dni w dowolnej kolejności daje te same sumy narastające co odbudowa od zera
+        """
+        rng = random.Random(1)
+        days = [date(2025, 1, 1) + timedelta(days=offset) for offset in range(30)]
+        with app.app_context():
+            for day in rng.sample(days, len(days)):
+                add_bolt(driver_user, day, rng.randint(1, 500))
+                rollups.refresh([(driver_user.id, day)])
+            db.session.commit()
+            incremental = cumulative(driver_user.id)
+
+            rollups.rebuild()
+
+            assert cumulative(driver_user.id) == incremental
+
+
+def period_rows(user_id, period):
+    """{początek okresu: bolt_gross} z zestawień miesięcznych / rocznych kierowcy"""
+    rows = DriverPeriodRollup.query.filter_by(user_id=user_id, period=period).order_by(DriverPeriodRollup.period_start)
+    return {row.period_start: row.bolt_gross for row in rows}
+
+
+class TestPeriodRollups:
+    """Testy zestawień miesięcznych i rocznych"""
+
+    def test_refresh_updates_month_and_year(self, app, driver_user):
+        """
+        TEST: Odświeżenie dni aktualizuje miesiące i lata, do których należą (rok = suma miesięcy)
+        """
+        with app.app_context():
+            for day, net in ((date(2024, 12, 31), 5), (date(2025, 1, 3), 100), (date(2025, 1, 20), 50), (date(2025, 2, 1), 25)):
+                add_bolt(driver_user, day, net)
+                rollups.refresh([(driver_user.id, day)])
+            db.session.commit()
+
+            assert period_rows(driver_user.id, 'month') == {
+                date(2024, 12, 1): 5, date(2025, 1, 1): 150, date(2025, 2, 1): 25,
+            }
+            assert period_rows(driver_user.id, 'year') == {date(2024, 1, 1): 5, date(2025, 1, 1): 175}
+
+    def test_removed_month_disappears(self, app, driver_user):
+        """
+        TEST: Usunięcie ostatnich wpisów miesiąca usuwa wiersz miesiąca i zmniejsza rok
+        """
+        with app.app_context():
+            add_bolt(driver_user, date(2025, 1, 3), 100)
+            record = add_bolt(driver_user, date(2025, 2, 1), 25)
+            db.session.commit()
+            rollups.rebuild()
+
+            db.session.delete(db.session.get(BoltEarnings, record.id))
+            rollups.refresh([(driver_user.id, date(2025, 2, 1))])
+            db.session.commit()
+
+            assert period_rows(driver_user.id, 'month') == {date(2025, 1, 1): 100}
+            assert period_rows(driver_user.id, 'year') == {date(2025, 1, 1): 100}
+
+    def test_rebuild_matches_incremental_periods(self, app, driver_user):
+        """
+        TEST: Odbudowa daje te same zestawienia okresów co odświeżanie przy zapisie
+        """
+        rng = random.Random(2)
+        days = [date(2024, 11, 1) + timedelta(days=offset) for offset in range(0, 120, 3)]
+        with app.app_context():
+            for day in rng.sample(days, len(days)):
+                add_bolt(driver_user, day, rng.randint(1, 500))
+                rollups.refresh([(driver_user.id, day)])
+            db.session.commit()
+            incremental = {period: period_rows(driver_user.id, period) for period in rollups.PERIODS}
+
+            rollups.rebuild()
+
+            assert {period: period_rows(driver_user.id, period) for period in rollups.PERIODS} == incremental
@@ -0,0 +1,102 @@
+"""
+Testy polityki hashowania haseł (metoda, limit jednoczesnych hashowań, przeliczenie hasha przy logowaniu)
+"""
+import threading
+import time
+import pytest
+from werkzeug.security import generate_password_hash
+from app import db, security
+from app.models import User
+
+
+class TestPasswordPolicy:
+    """Testy PasswordPolicy"""
+
+    def test_normalize_method(self):
+        """
+        TEST: Metoda bez parametrów dostaje parametry domyślne Werkzeuga, błędna metoda -> ValueError
+        """
+        assert security.normalize_method('scrypt') == 'scrypt:32768:8:1'
+        assert security.normalize_method('scrypt:16384:8:1') == 'scrypt:16384:8:1'
+        assert security.normalize_method('pbkdf2:sha256:1000') == 'pbkdf2:sha256:1000'
+        with pytest.raises(ValueError):
+            security.normalize_method('md5')
+        with pytest.raises(ValueError):
+            security.normalize_method('scrypt:16384')
+
+    def test_needs_rehash(self):
+        """
+        TEST: Hash według innej metody wymaga przeliczenia, hash według bieżącej - nie
+        """
+        policy = security.PasswordPolicy('pbkdf2:sha256:1000')
+
+        assert not policy.needs_rehash(policy.hash('haslo123'))
+        assert policy.needs_rehash(generate_password_hash('haslo123', 'pbkdf2:sha256:2000'))
+        assert policy.verify(generate_password_hash('haslo123', 'pbkdf2:sha256:2000'), 'haslo123')
+        assert not policy.verify(None, 'haslo123')
+
+    def test_concurrency_limit(self, monkeypatch):
+        """
+        TEST: Naraz wykonuje się najwyżej PASSWORD_HASH_CONCURRENCY sprawdzeń hasła
+        """
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def slow_check(pwhash, password):
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.02)
+            with lock:
+                running.pop()
+            return True
+
+        monkeypatch.setattr(security, 'check_password_hash', slow_check)
+        policy = security.PasswordPolicy('pbkdf2:sha256:1000', concurrency=2)
+
+        threads = [threading.Thread(target=policy.verify, args=('hash', 'haslo')) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(peak) == 8
+        assert max(peak) == 2
+
+
+class TestRehashOnLogin:
+    """Testy przeliczenia hasha przy logowaniu"""
+
+    def add_driver(self, app, pwhash):
+        with app.app_context():
+            user = User(username='testdriver', role='driver', password_hash=pwhash)
+            db.session.add(user)
+            db.session.commit()
+            return user.id
+
+    def test_old_hash_is_replaced(self, app, client):
+        """
+        TEST: Udane logowanie z hashem według starej polityki zapisuje hash według bieżącej
+        """
+        driver_id = self.add_driver(app, generate_password_hash('driver123', 'pbkdf2:sha256:1000'))
+
+        response = client.post('/login', data={'username': 'testdriver', 'password': 'driver123'})
+
+        assert response.status_code == 302
+        with app.app_context():
+            user = db.session.get(User, driver_id)
+            assert user.password_hash.startswith(app.config['PASSWORD_HASH_METHOD'] + '$')
+            assert user.check_password('driver123')
+
+    def test_failed_login_keeps_hash(self, app, client):
+        """
+        TEST: Nieudane logowanie nie zmienia hasha
+        """
+        old_hash = generate_password_hash('driver123', 'pbkdf2:sha256:1000')
+        driver_id = self.add_driver(app, old_hash)
+
+        client.post('/login', data={'username': 'testdriver', 'password': 'zlehaslo'})
+
+        with app.app_context():
+            assert db.session.get(User, driver_id).password_hash == old_hash
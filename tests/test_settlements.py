@@ -0,0 +1,334 @@
+"""
+Testy rozliczeń tygodniowych (settlements)
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+from sqlalchemy import event
+from app import db, rollups, settlements
+from app.models import BoltEarnings, Expense, WeeklyReport
+
+
+WEEK = (date(2025, 1, 6), date(2025, 1, 12))
+NEXT_WEEK = (date(2025, 1, 13), date(2025, 1, 19))
+
+
+def add_invoice(driver, day, vat_deductible):
+    """Faktura kosztowa z podanym VAT do odliczenia + zestawienie dnia"""
+    db.session.add(Expense(
+        user_id=driver.id, document_number=f'FV/{day}', description='Serwis', issue_date=day,
+        net_amount=vat_deductible * 4, vat_amount=vat_deductible * 2,
+        vat_deductible=vat_deductible, deductible_amount=vat_deductible * 3
+    ))
+    db.session.flush()
+    rollups.refresh([(driver.id, day)])
+    db.session.commit()
+
+
+class TestSettle:
+    """Testy wzoru rozliczenia"""
+
+    def test_settle_formula(self):
+        """
+        TEST: VAT do zapłaty, faktyczny zarobek i kwota do wypłaty z sum zakresu i odliczeń
+        """
+        sums = dict.fromkeys(settlements.TIMELINE_KEYS, Decimal('0'))
+        sums.update(bolt_gross=Decimal('700'), uber_gross=Decimal('300'), bolt_cash=Decimal('100'),
+                    bolt_vat=Decimal('56'), uber_vat=Decimal('24'), expenses_vat_deductible=Decimal('30'))
+
+        report = settlements.settle(sums, carryover=Decimal('-20'), settlement_fee=settlements.SETTLEMENT_FEE, fuel_amount=Decimal('50'))
+
+        assert report['total_vat_calculated'] == Decimal('30')
+        assert report['total_vat'] == Decimal('30')
+        assert report['vat_carryover'] == 0
+        assert report['total_actual'] == Decimal('970')
+        assert report['final_amount'] == Decimal('970') - 100 - 30 - 50
+
+    def test_settle_negative_vat_is_carried_over(self):
+        """
+        TEST: Nadwyżka VAT do odliczenia -> VAT do zapłaty 0, reszta przechodzi na następny raport
+        """
+        sums = dict.fromkeys(settlements.TIMELINE_KEYS, Decimal('0'))
+        sums.update(bolt_gross=Decimal('100'), bolt_vat=Decimal('8'), expenses_vat_deductible=Decimal('20'))
+
+        report = settlements.settle(sums)
+
+        assert report['total_vat'] == 0
+        assert report['vat_carryover'] == Decimal('-12')
+        assert report['total_actual'] == Decimal('100')
+
+
+class TestGenerate:
+    """Testy generowania raportów dla całej floty"""
+
+    def test_generates_report_for_every_driver_with_earnings(self, app, driver_user, fleet_factory):
+        """
+        TEST: Jeden przebieg tworzy raporty wszystkich kierowców z zarobkami w zakresie (bez kierowców bez wpisów)
+        """
+        with app.app_context():
+            second = fleet_factory.driver('second', bolt_id='bolt-2')
+            fleet_factory.driver('idle', bolt_id='bolt-3')
+            fleet_factory.bolt_days(driver_user, WEEK[0], days=7, net=100, vat=8, cash=10)
+            fleet_factory.bolt_days(second, WEEK[0], days=7, net=50, vat=4)
+
+            assert settlements.generate(*WEEK) == 2
+
+            reports = {report.user_id: report for report in WeeklyReport.query.all()}
+            assert set(reports) == {driver_user.id, second.id}
+            assert reports[driver_user.id].report_name == 'Tydzień 2/2025'
+            assert reports[driver_user.id].total_gross == Decimal('700.00')
+            assert reports[driver_user.id].total_vat == Decimal('56.00')
+            assert reports[driver_user.id].final_amount == Decimal('700') - 56 - 70
+            assert reports[second.id].total_gross == Decimal('350.00')
+
+    def test_range_sums_from_cumulative_totals(self, app, driver_user, fleet_factory):
+        """
+        TEST: Sumy zakresu jako różnica sum narastających - wpisy przed i po zakresie nie są liczone, jedno zapytanie
+        """
+        with app.app_context():
+            second = fleet_factory.driver('second', bolt_id='bolt-2')
+            fleet_factory.bolt_days(driver_user, WEEK[0] - timedelta(days=7), days=7, net=10, vat=1)
+            fleet_factory.bolt_days(driver_user, WEEK[0], days=7, net=100, vat=8)
+            fleet_factory.bolt_days(driver_user, NEXT_WEEK[0], days=7, net=1000, vat=80)
+            fleet_factory.bolt_days(second, NEXT_WEEK[0], days=7, net=50, vat=4)
+
+            statements = []
+            listener = lambda *args: statements.append(args[2])
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                sums = settlements._range_sums(*WEEK)
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', listener)
+
+            assert len(statements) == 1
+            assert set(sums) == {driver_user.id}
+            assert sums[driver_user.id]['bolt_gross'] == Decimal('700.00')
+            assert sums[driver_user.id]['bolt_vat'] == Decimal('56.00')
+            assert sums[driver_user.id]['expenses_vat_deductible'] == 0
+
+    def test_carryover_from_previous_report(self, app, driver_user, fleet_factory):
+        """
+        TEST: Nadwyżka VAT z poprzedniego raportu zmniejsza VAT następnego tygodnia
+        """
+        with app.app_context():
+            fleet_factory.bolt_days(driver_user, WEEK[0], days=7, net=100, vat=1)
+            add_invoice(driver_user, WEEK[0], vat_deductible=Decimal('20'))
+            fleet_factory.bolt_days(driver_user, NEXT_WEEK[0], days=7, net=100, vat=8)
+
+            settlements.generate(*WEEK)
+            settlements.generate(*NEXT_WEEK)
+
+            first = WeeklyReport.query.filter_by(date_from=WEEK[0]).one()
+            second = WeeklyReport.query.filter_by(date_from=NEXT_WEEK[0]).one()
+            assert first.vat_carryover == Decimal('-13.00')
+            assert second.total_vat_calculated == Decimal('56') - 13
+            assert second.total_vat == Decimal('43.00')
+            assert second.vat_carryover == 0
+
+    def test_regenerating_replaces_reports(self, app, driver_user, fleet_factory):
+        """
+        TEST: Ponowne wygenerowanie tego samego zakresu zastępuje raporty (bez duplikatów, z nowymi kwotami)
+        """
+        with app.app_context():
+            fleet_factory.bolt_days(driver_user, WEEK[0], days=7, net=100, vat=8)
+            settlements.generate(*WEEK)
+            record = BoltEarnings.query.filter_by(report_date=WEEK[0]).one()
+            record.net_income = 170
+            db.session.flush()
+            rollups.refresh([(driver_user.id, WEEK[0])])
+            db.session.commit()
+
+            settlements.generate(*WEEK, report_name='Korekta')
+
+            report = WeeklyReport.query.one()
+            assert report.report_name == 'Korekta'
+            assert report.total_gross == Decimal('770.00')
+
+    def test_generate_reports_route_for_whole_fleet(self, client, admin_user, driver_user, fleet_factory):
+        """
+        TEST: Formularz z opcją "Wszyscy kierowcy" generuje raporty i przekierowuje na listę raportów
+        """
+        with client.application.app_context():
+            fleet_factory.bolt_days(driver_user, WEEK[0], days=7, net=100, vat=8)
+
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        response = client.post('/admin/generate-reports', data={
+            'driver_id': 0,
+            'report_name': 'Tydzień 2/2025',
+            'date_from': '2025-01-06',
+            'date_to': '2025-01-12',
+            'settlement_fee': 'y',
+        }, follow_redirects=True)
+
+        assert response.status_code == 200
+        html = response.get_data(as_text=True)
+        assert 'Wygenerowano raportów: 1' in html
+        assert 'testdriver' in html
+        with client.application.app_context():
+            assert WeeklyReport.query.one().settlement_fee == Decimal('30.00')
+
+    def test_fuel_only_for_single_driver(self, client, admin_user, driver_user):
+        """
+        TEST: Kwota paliwa przy generowaniu dla wszystkich kierowców -> błąd walidacji
+        """
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        response = client.post('/admin/generate-reports', data={
+            'driver_id': 0,
+            'report_name': 'Tydzień 2/2025',
+            'date_from': '2025-01-06',
+            'date_to': '2025-01-12',
+            'fuel_amount': '50',
+        })
+
+        assert 'tylko dla jednego kierowcy' in response.get_data(as_text=True)
+        with client.application.app_context():
+            assert WeeklyReport.query.count() == 0
+
+    def test_cli_generates_reports(self, app, runner, driver_user, fleet_factory):
+        """
+        TEST: flask generate-weekly-reports generuje raporty za podany zakres
+        """
+        with app.app_context():
+            fleet_factory.bolt_days(driver_user, WEEK[0], days=7, net=100, vat=8)
+            #komendy są rejestrowane tylko w pierwszej utworzonej aplikacji - wywołanie bezpośrednio
+            from app.commands import generate_weekly_reports
+
+        result = runner.invoke(generate_weekly_reports, ['2025-01-06', '2025-01-12', '--contract-fee'])
+
+        assert 'Wygenerowano raportów: 1' in result.output
+        with app.app_context():
+            assert WeeklyReport.query.one().contract_fee == Decimal('150.00')
+
+
+def change_day(driver, day, net, vat):
+    """Korekta wpisu Bolt z danego dnia (jak ponowny import) + odświeżenie zestawień"""
+    record = BoltEarnings.query.filter_by(user_id=driver.id, report_date=day).one()
+    record.net_income, record.vat_due = net, vat
+    db.session.flush()
+    rollups.refresh([(driver.id, day)])
+    db.session.commit()
+
+
+def stale_reports():
+    """{data początkowa: is_stale} wszystkich raportów"""
+    return {report.date_from: report.is_stale for report in WeeklyReport.query.all()}
+
+
+class TestStaleReports:
+    """Testy oznaczania i przeliczania nieaktualnych raportów"""
+
+    def test_changed_day_marks_covering_report_stale(self, app, driver_user, fleet_factory):
+        """
+        TEST: Zmiana wpisu oznacza jako nieaktualny tylko raport kierowcy obejmujący ten dzień
+        """
+        with app.app_context():
+            second = fleet_factory.driver('second', bolt_id='bolt-2')
+            fleet_factory.bolt_days(driver_user, WEEK[0], days=7, net=100, vat=8)
+            fleet_factory.bolt_days(driver_user, NEXT_WEEK[0], days=7, net=100, vat=8)
+            fleet_factory.bolt_days(second, WEEK[0], days=7, net=50, vat=4)
+            settlements.generate(*WEEK)
+            settlements.generate(*NEXT_WEEK)
+
+            change_day(driver_user, WEEK[0] + timedelta(days=2), net=150, vat=12)
+
+            stale = {(report.user_id, report.date_from): report.is_stale for report in WeeklyReport.query.all()}
+            assert stale == {
+                (driver_user.id, WEEK[0]): True,
+                (driver_user.id, NEXT_WEEK[0]): False,
+                (second.id, WEEK[0]): False,
+            }
+
+    def test_csv_import_marks_report_stale(self, app, driver_user, fleet_factory):
+        """
+        TEST: Spóźniony import CSV dnia z zakresu raportu oznacza raport jako nieaktualny
+        """
+        from io import BytesIO
+        from app.csv_processor import CSVProcessor
+
+        with app.app_context():
+            fleet_factory.bolt_days(driver_user, WEEK[0], days=7, net=100, vat=8)
+            settlements.generate(*WEEK)
+
+            csv = "Kierowca,Identyfikator kierowcy,Zarobki netto|ZŁ,Pobrana gotówka|ZŁ\ntestdriver,test-bolt-456,300,0\n"
+            CSVProcessor(BytesIO(csv.encode('utf-8')), "zarobki_08_01_2025.csv").process()
+
+            assert stale_reports() == {WEEK[0]: True}
+
+    def test_recompute_propagates_changed_carryover(self, app, driver_user, fleet_factory):
+        """
+        TEST: Przeliczenie nieaktualnego raportu przelicza też następny, gdy zmienił się przeniesiony VAT
+        """
+        with app.app_context():
+            fleet_factory.bolt_days(driver_user, WEEK[0], days=7, net=100, vat=1)
+            fleet_factory.bolt_days(driver_user, NEXT_WEEK[0], days=7, net=100, vat=8)
+            settlements.generate(*WEEK)
+            settlements.generate(*NEXT_WEEK)
+            assert WeeklyReport.query.filter_by(date_from=NEXT_WEEK[0]).one().total_vat == Decimal('56.00')
+
+            #spóźniona faktura z pierwszego tygodnia -> nadwyżka VAT przechodzi na drugi tydzień
+            add_invoice(driver_user, WEEK[0], vat_deductible=Decimal('20'))
+            assert stale_reports() == {WEEK[0]: True, NEXT_WEEK[0]: False}
+
+            assert settlements.recompute() == 2
+
+            first = WeeklyReport.query.filter_by(date_from=WEEK[0]).one()
+            second = WeeklyReport.query.filter_by(date_from=NEXT_WEEK[0]).one()
+            assert first.vat_carryover == Decimal('-13.00')
+            assert second.total_vat == Decimal('43.00')
+            assert stale_reports() == {WEEK[0]: False, NEXT_WEEK[0]: False}
+
+    def test_recompute_stops_when_carryover_unchanged(self, app, driver_user, fleet_factory):
+        """
+        TEST: Raport po przeliczonym nie jest przeliczany, jeśli przeniesiony VAT się nie zmienił
+        (opłaty z raportu zostają bez zmian)
+        """
+        with app.app_context():
+            fleet_factory.bolt_days(driver_user, WEEK[0], days=7, net=100, vat=8)
+            fleet_factory.bolt_days(driver_user, NEXT_WEEK[0], days=7, net=100, vat=8)
+            settlements.generate(*WEEK, settlement_fee=True)
+            settlements.generate(*NEXT_WEEK)
+            second_generated = WeeklyReport.query.filter_by(date_from=NEXT_WEEK[0]).one().generated_at
+
+            change_day(driver_user, WEEK[0], net=200, vat=16)
+
+            assert settlements.recompute() == 1
+            first = WeeklyReport.query.filter_by(date_from=WEEK[0]).one()
+            assert first.total_gross == Decimal('800.00')
+            assert first.total_vat == Decimal('64.00')
+            assert first.settlement_fee == Decimal('30.00')
+            assert WeeklyReport.query.filter_by(date_from=NEXT_WEEK[0]).one().generated_at == second_generated
+
+    def test_regenerating_earlier_week_marks_later_reports(self, app, driver_user, fleet_factory):
+        """
+        TEST: Ponowne wygenerowanie wcześniejszego tygodnia ze zmienionym VAT do przeniesienia
+        oznacza późniejsze raporty kierowcy jako nieaktualne
+        """
+        with app.app_context():
+            fleet_factory.bolt_days(driver_user, WEEK[0], days=7, net=100, vat=1)
+            fleet_factory.bolt_days(driver_user, NEXT_WEEK[0], days=7, net=100, vat=8)
+            settlements.generate(*WEEK)
+            settlements.generate(*NEXT_WEEK)
+            add_invoice(driver_user, WEEK[0], vat_deductible=Decimal('20'))
+
+            settlements.generate(*WEEK)
+
+            assert stale_reports() == {WEEK[0]: False, NEXT_WEEK[0]: True}
+            assert settlements.recompute() == 1
+            assert WeeklyReport.query.filter_by(date_from=NEXT_WEEK[0]).one().total_vat == Decimal('43.00')
+
+    def test_recompute_route(self, client, admin_user, driver_user, fleet_factory):
+        """
+        TEST: Lista raportów pokazuje nieaktualne raporty, przycisk przelicza je
+        """
+        with client.application.app_context():
+            fleet_factory.bolt_days(driver_user, WEEK[0], days=7, net=100, vat=8)
+            settlements.generate(*WEEK)
+            change_day(driver_user, WEEK[0], net=200, vat=16)
+
+        client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+        assert 'nieaktualny' in client.get('/admin/reports').get_data(as_text=True)
+
+        response = client.post('/admin/reports/recompute', follow_redirects=True)
+
+        assert 'Przeliczono raportów: 1' in response.get_data(as_text=True)
+        with client.application.app_context():
+            assert stale_reports() == {WEEK[0]: False}